@@ -1,7 +1,21 @@
-from django.contrib import admin
+import tempfile
+import zipfile
+
+from django.conf import settings
+from django.contrib import admin, messages
 from django import forms
+from django.db.models import Count, OuterRef, Q, Subquery
+from django.http import FileResponse, StreamingHttpResponse
+from django.template.defaultfilters import filesizeformat
+
+from liga_life.metricas import TRANSICIONES_ESTADO
 
-from .models import Tournament, Team, Player, PaymentProof
+from .exportacion import credenciales_generadas
+from .forms import FotoJugadorField
+from .reportes import csv_inscripciones, xlsx_inscripciones
+from .servicios import expirar_equipos_vencidos
+from .models import Tournament, Team, Player, PaymentProof, PdfJob
+from .trabajos import encolar_credenciales
 
 
 # ===========================
@@ -21,6 +35,7 @@ class PlayerInlineForm(forms.ModelForm):
             "is_reinforcement",
             "photo",
         )
+        field_classes = {"photo": FotoJugadorField}
         widgets = {
             "jersey_number": forms.NumberInput(
                 attrs={"style": "width: 60px;"}
@@ -83,6 +98,93 @@ class PaymentProofInline(admin.TabularInline):
 class TournamentAdmin(admin.ModelAdmin):
     list_display = ("name", "season", "is_open", "start_date", "end_date")
     list_filter = ("is_open",)
+    actions = ["exportar_credenciales", "exportar_inscripciones_csv", "exportar_inscripciones_xlsx"]
+
+    @admin.action(description="Exportar inscripciones: equipos y jugadores (CSV)")
+    def exportar_inscripciones_csv(self, request, queryset):
+        """Se genera mientras se descarga: memoria constante con cualquier tamaño."""
+        response = StreamingHttpResponse(
+            csv_inscripciones(list(queryset.values_list("pk", flat=True))),
+            content_type="text/csv; charset=utf-8",
+        )
+        response["Content-Disposition"] = 'attachment; filename="inscripciones.csv"'
+        return response
+
+    @admin.action(description="Exportar inscripciones: equipos y jugadores (Excel)")
+    def exportar_inscripciones_xlsx(self, request, queryset):
+        """El XLSX es un ZIP y se arma completo antes de enviarlo (en disco, no en memoria)."""
+        buffer = tempfile.SpooledTemporaryFile(
+            max_size=settings.CREDENCIALES_PDF_SPOOL_MAX_SIZE
+        )
+        xlsx_inscripciones(list(queryset.values_list("pk", flat=True)), buffer)
+        tamano = buffer.tell()
+        buffer.seek(0)
+        response = FileResponse(
+            buffer,
+            as_attachment=True,
+            filename="inscripciones.xlsx",
+            content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        )
+        response["Content-Length"] = str(tamano)
+        return response
+
+    @admin.action(description="Exportar credenciales ya generadas de equipos aprobados (ZIP)")
+    def exportar_credenciales(self, request, queryset):
+        """
+        ZIP con los PDFs que ya están en el cache de credenciales. No dibuja
+        nada dentro de la petición: los que faltan se encolan para el worker
+        (con CREDENCIALES_PDF_ASYNC) y el torneo completo, con el PDF combinado
+        para imprenta, lo genera el comando exportar_credenciales.
+        """
+        generados, pendientes = credenciales_generadas(queryset)
+
+        if pendientes:
+            comando = "python manage.py exportar_credenciales <id_torneo>"
+            if settings.CREDENCIALES_PDF_ASYNC:
+                for team, huella in pendientes:
+                    encolar_credenciales(team, huella)
+                siguiente = (
+                    "Ya se encolaron: vuelve a exportar en unos minutos o genera "
+                    f"el torneo completo con `{comando}`."
+                )
+            else:
+                siguiente = f"Genéralos con `{comando}`."
+            self.message_user(
+                request,
+                f"{len(pendientes)} equipos aún no tienen su PDF de credenciales. {siguiente}",
+                messages.WARNING,
+            )
+
+        if not generados:
+            if not pendientes:
+                self.message_user(
+                    request,
+                    "Los torneos seleccionados no tienen equipos aprobados con jugadores.",
+                    messages.WARNING,
+                )
+            return None
+
+        buffer = tempfile.SpooledTemporaryFile(
+            max_size=settings.CREDENCIALES_PDF_SPOOL_MAX_SIZE
+        )
+        with zipfile.ZipFile(buffer, "w") as zf:
+            for team, ruta in generados:
+                try:
+                    zf.write(ruta, f"torneo_{team.tournament_id}/{team.folio}.pdf")
+                except FileNotFoundError:
+                    # Se invalidó mientras armábamos el ZIP: sale en la siguiente exportación
+                    continue
+
+        tamano = buffer.tell()
+        buffer.seek(0)
+        response = FileResponse(
+            buffer,
+            as_attachment=True,
+            filename="credenciales.zip",
+            content_type="application/zip",
+        )
+        response["Content-Length"] = str(tamano)
+        return response
 
 
 # ===========================
@@ -92,6 +194,24 @@ class TournamentAdmin(admin.ModelAdmin):
 class TeamAdmin(admin.ModelAdmin):
     inlines = [PlayerInline, PaymentProofInline]
 
+    # Conteos y último comprobante salen de la misma consulta del listado
+    # (ver anotar_listado): el número de queries no crece con el tamaño de página.
+    list_display = (
+        "name",
+        "folio",
+        "tournament",
+        "category",
+        "status",
+        "jugadores",
+        "refuerzos",
+        "ultimo_comprobante",
+        "payment_deadline",
+    )
+    list_select_related = ("tournament",)
+    list_filter = ("status", "tournament", "category")
+    search_fields = ("name", "folio", "company_name", "delegate_name")
+    actions = ["expirar_vencidos"]
+
     # botones de guardar también arriba
     save_on_top = True
 
@@ -131,6 +251,69 @@ class TeamAdmin(admin.ModelAdmin):
         }),
     )
 
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        # Las anotaciones solo las lee el listado (columnas y orden); el
+        # formulario de edición, el borrado, etc. usan el queryset simple.
+        # Sin petición (request=None, p. ej. indices.py) tampoco se anota.
+        listado = f"{self.opts.app_label}_{self.opts.model_name}_changelist"
+        if request is None or getattr(request.resolver_match, "url_name", None) != listado:
+            return queryset
+        return self.anotar_listado(queryset)
+
+    @staticmethod
+    def anotar_listado(queryset):
+        """Jugadores, refuerzos y último comprobante en la misma consulta del listado."""
+        ultimo = (
+            PaymentProof.objects
+            .filter(team=OuterRef("pk"))
+            .order_by("-uploaded_at")
+            .values("uploaded_at")[:1]
+        )
+        return queryset.annotate(
+            num_jugadores=Count("players", distinct=True),
+            num_refuerzos=Count(
+                "players",
+                filter=Q(players__is_reinforcement=True),
+                distinct=True,
+            ),
+            ultimo_comprobante_at=Subquery(ultimo),
+        )
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        # Aprobaciones y rechazos del comité (métrica de transiciones)
+        if change and "status" in form.changed_data:
+            TRANSICIONES_ESTADO.inc(desde=form.initial.get("status", ""), hacia=obj.status)
+
+    @admin.action(description="Expirar los seleccionados con fecha límite vencida")
+    def expirar_vencidos(self, request, queryset):
+        """
+        Mismo UPDATE por torneo que el comando `expirar_equipos`: solo cambia
+        los PRE_REGISTRADOS con la fecha límite ya pasada, el resto se ignora.
+        """
+        expirados = sum(expirar_equipos_vencidos(queryset).values())
+        if expirados:
+            self.message_user(request, f"{expirados} equipos pasaron a EXPIRADO.")
+        else:
+            self.message_user(
+                request,
+                "Ningún equipo seleccionado está pre-registrado con la fecha límite vencida.",
+                messages.WARNING,
+            )
+
+    @admin.display(description="Jugadores", ordering="num_jugadores")
+    def jugadores(self, obj):
+        return obj.num_jugadores
+
+    @admin.display(description="Refuerzos", ordering="num_refuerzos")
+    def refuerzos(self, obj):
+        return obj.num_refuerzos
+
+    @admin.display(description="Último comprobante", ordering="ultimo_comprobante_at")
+    def ultimo_comprobante(self, obj):
+        return obj.ultimo_comprobante_at
+
     class Media:
         css = {
             "all": ("css/admin_team.css",)
@@ -143,7 +326,38 @@ class TeamAdmin(admin.ModelAdmin):
 # ===========================
 @admin.register(PaymentProof)
 class PaymentProofAdmin(admin.ModelAdmin):
-    list_display = ("team", "uploaded_at", "file")
-    readonly_fields = ("uploaded_at",)
+    list_display = ("team", "folio", "estado_equipo", "uploaded_at", "file", "tamano")
+    # team.__str__ usa el torneo: lo traemos en el mismo JOIN
+    list_select_related = ("team", "team__tournament")
+    readonly_fields = ("uploaded_at", "original_size", "stored_size")
     search_fields = ("team__name", "team__folio")
-    list_filter = ("uploaded_at",)
+    list_filter = ("uploaded_at", "team__status", "team__tournament")
+
+    @admin.display(description="Folio", ordering="team__folio")
+    def folio(self, obj):
+        return obj.team.folio
+
+    @admin.display(description="Estado del equipo", ordering="team__status")
+    def estado_equipo(self, obj):
+        return obj.team.get_status_display()
+
+    @admin.display(description="Tamaño", ordering="stored_size")
+    def tamano(self, obj):
+        if obj.stored_size is None:
+            return "—"
+        return filesizeformat(obj.stored_size)
+
+
+# ===========================
+#  COLA DE PDFs
+# ===========================
+@admin.register(PdfJob)
+class PdfJobAdmin(admin.ModelAdmin):
+    list_display = ("team", "status", "attempts", "created_at", "finished_at")
+    list_filter = ("status",)
+    list_select_related = ("team", "team__tournament")
+    search_fields = ("team__name", "team__folio")
+    readonly_fields = (
+        "team", "fingerprint", "status", "attempts", "error",
+        "created_at", "started_at", "finished_at",
+    )
@@ -0,0 +1,110 @@
+# inscripciones/almacenamiento.py
+"""
+Storage de media direccionado por contenido.
+
+Cada archivo se guarda con el hash de sus bytes como nombre, repartido en
+subcarpetas por los primeros caracteres del hash:
+
+    comprobantes/3f/a2/3fa2c9...e1.jpg
+
+- El mismo archivo subido dos veces (el delegado reenvía el comprobante) se
+  escribe una sola vez: los registros comparten el nombre.
+- Las carpetas de upload_to se conservan; las subcarpetas del hash evitan
+  directorios con miles de archivos.
+- Un nombre siempre corresponde al mismo contenido, así que se puede cachear
+  por nombre (huella de credenciales, navegador).
+
+Como varios registros pueden apuntar al mismo archivo, nunca se debe borrar
+uno sin revisar antes archivo_en_uso().
+"""
+import hashlib
+import os
+
+from django.apps import apps
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.db import models
+
+
+# 40 hex = 160 bits: sin colisiones prácticas y el nombre completo cabe en
+# los 100 caracteres de un FileField (jugadores_fotos/credencial/ab/cd/<hash>.jpeg)
+LARGO_HASH = 40
+NIVELES = 2
+MAX_EXTENSION = 5
+
+
+def hash_contenido(content):
+    h = hashlib.sha256()
+    if hasattr(content, "seek"):
+        content.seek(0)
+    for chunk in content.chunks():
+        h.update(chunk)
+    if hasattr(content, "seek"):
+        content.seek(0)
+    return h.hexdigest()[:LARGO_HASH]
+
+
+def es_nombre_por_contenido(nombre):
+    """¿`nombre` ya tiene la forma <carpeta>/ab/cd/<hash>.<ext>?"""
+    partes = nombre.replace("\\", "/").split("/")
+    if len(partes) < NIVELES + 1:
+        return False
+    base = os.path.splitext(partes[-1])[0]
+    if len(base) != LARGO_HASH or any(c not in "0123456789abcdef" for c in base):
+        return False
+    return all(
+        partes[-2 - i] == base[2 * (NIVELES - 1 - i):2 * (NIVELES - i)]
+        for i in range(NIVELES)
+    )
+
+
+class AlmacenamientoPorContenido(FileSystemStorage):
+    def nombre_por_contenido(self, nombre, content):
+        """'comprobantes/pago.JPG' -> 'comprobantes/3f/a2/3fa2...e1.jpg'"""
+        carpeta = os.path.dirname(nombre)
+        extension = os.path.splitext(nombre)[1].lower()[:MAX_EXTENSION]
+        h = hash_contenido(content)
+        subcarpetas = [h[2 * i:2 * i + 2] for i in range(NIVELES)]
+        return "/".join(filter(None, [carpeta, *subcarpetas, h + extension]))
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, "chunks"):
+            content = File(content, name)
+
+        nombre = self.nombre_por_contenido(name, content)
+        if self.exists(nombre):
+            # Ya está guardado: no se escribe otra copia
+            return nombre
+        return super().save(nombre, content, max_length=max_length)
+
+
+def campos_de_archivo():
+    """(modelo, nombre del campo) de todos los FileField/ImageField de la app."""
+    for modelo in apps.get_app_config("inscripciones").get_models():
+        for campo in modelo._meta.get_fields():
+            if isinstance(campo, models.FileField):
+                yield modelo, campo.name
+
+
+def archivo_en_uso(nombre, excluir=None):
+    """
+    ¿Algún registro apunta a `nombre`? `excluir` = (modelo, pk) que no cuenta
+    (el registro que está dejando de usarlo).
+    """
+    for modelo, campo in campos_de_archivo():
+        qs = modelo.objects.filter(**{campo: nombre})
+        if excluir is not None and excluir[0] is modelo:
+            qs = qs.exclude(pk=excluir[1])
+        if qs.exists():
+            return True
+    return False
+
+
+def borrar_si_huerfano(nombre, excluir=None, storage=default_storage):
+    """Borra `nombre` del storage solo si ningún registro lo usa."""
+    if nombre and not archivo_en_uso(nombre, excluir=excluir):
+        storage.delete(nombre)
+        return True
+    return False
@@ -0,0 +1,186 @@
+# inscripciones/exportacion.py
+"""
+Exportación masiva de credenciales de un torneo (todos los equipos APROBADOS).
+"""
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.db import connections
+from django.db.models import Prefetch
+from pypdf import PdfWriter
+
+from liga_life import metricas
+
+from .models import Player, Team
+from .utils import (
+    generar_credenciales_lote_pdf,
+    generar_credenciales_pdf,
+    huella_credenciales,
+    obtener_pdf_credenciales,
+    ruta_cache_credenciales,
+)
+
+
+def _iniciar_worker():
+    # En Windows/macOS los procesos arrancan con "spawn" y necesitan cargar Django
+    django.setup()
+    # Procesos de vida corta: no dejan archivos de métricas en METRICAS_DIR
+    metricas.desactivar()
+
+
+def _renderizar_equipo(tarea):
+    """
+    Corre dentro de un proceso del pool: no toca la BD, solo dibuja.
+    Si el PDF ya estaba en el cache de credenciales solo se copia.
+    """
+    team, jugadores, destino = tarea
+    inicio = time.perf_counter()
+
+    ruta = obtener_pdf_credenciales(team, jugadores)
+    if ruta:
+        shutil.copyfile(ruta, destino)
+    else:
+        generar_credenciales_pdf(team, jugadores, destino)
+
+    return {
+        "folio": team.folio,
+        "equipo": team.name,
+        "jugadores": len(jugadores),
+        "segundos": time.perf_counter() - inicio,
+        "bytes": os.path.getsize(destino),
+        "ruta": destino,
+    }
+
+
+def _renderizar_lote(tarea):
+    """Un tramo del PDF combinado: varios equipos en un mismo documento."""
+    equipos, destino = tarea
+    generar_credenciales_lote_pdf(equipos, destino)
+    return destino
+
+
+def _partir(lista, partes):
+    """Divide `lista` en `partes` tramos contiguos de tamaño parecido."""
+    partes = max(1, min(partes, len(lista)))
+    tamano, sobra = divmod(len(lista), partes)
+    tramos, inicio = [], 0
+    for i in range(partes):
+        fin = inicio + tamano + (1 if i < sobra else 0)
+        tramos.append(lista[inicio:fin])
+        inicio = fin
+    return tramos
+
+
+def credenciales_generadas(torneos):
+    """
+    Separa los equipos APROBADOS con jugadores de esos torneos en los que ya
+    tienen su PDF vigente en el cache y los que no. No genera nada: sirve al
+    admin, que no debe dibujar un torneo entero dentro de una petición.
+
+    Regresa (generados, pendientes): generados es [(team, ruta)] y pendientes
+    [(team, huella)], ordenados por torneo y nombre. Con el cache apagado
+    todos quedan pendientes.
+    """
+    equipos = (
+        Team.objects.filter(tournament__in=torneos, status='APROBADO')
+        .prefetch_related(
+            Prefetch('players', queryset=Player.objects.order_by('jersey_number'))
+        )
+        .order_by('tournament_id', 'name')
+    )
+
+    generados, pendientes = [], []
+    for team in equipos:
+        jugadores = list(team.players.all())
+        if not jugadores:
+            continue
+        huella = huella_credenciales(team, jugadores)
+        ruta = ruta_cache_credenciales(team, huella)
+        if ruta is not None and os.path.exists(ruta):
+            generados.append((team, ruta))
+        else:
+            pendientes.append((team, huella))
+    return generados, pendientes
+
+
+def exportar_credenciales_torneo(tournament, salida, workers=None, combinado=True):
+    """
+    Genera un PDF por equipo APROBADO del torneo dentro de `salida` y, si se
+    pide, un PDF combinado listo para imprenta con todos ellos en orden.
+
+    `workers` es el tamaño del pool de procesos (None = núm. de CPUs,
+    1 = todo en el proceso actual).
+
+    El combinado no se arma pegando los PDFs por equipo (cada uno trae sus
+    propios fondos): se dibuja en tantos tramos como procesos, cada tramo
+    comparte los fondos entre sus equipos, y al final solo se unen los tramos.
+
+    Regresa un dict con los tiempos por equipo, los equipos sin jugadores,
+    la ruta del combinado y el tiempo total.
+    """
+    inicio = time.perf_counter()
+    os.makedirs(salida, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+
+    equipos = (
+        Team.objects.filter(tournament=tournament, status='APROBADO')
+        .prefetch_related(
+            Prefetch('players', queryset=Player.objects.order_by('jersey_number'))
+        )
+        .order_by('name')
+    )
+
+    tareas = []
+    sin_jugadores = []
+    for team in equipos:
+        jugadores = list(team.players.all())
+        if not jugadores:
+            sin_jugadores.append(team.folio)
+            continue
+        # No mandamos el prefetch duplicado a los procesos
+        team._prefetched_objects_cache = {}
+        tareas.append((team, jugadores, os.path.join(salida, f"{team.folio}.pdf")))
+
+    ruta_combinado = None
+    lotes = []
+    if combinado and tareas:
+        ruta_combinado = os.path.join(salida, f"credenciales_torneo_{tournament.pk}.pdf")
+        tramos = _partir([(team, jugadores) for team, jugadores, _ in tareas], workers)
+        if len(tramos) == 1:
+            lotes = [(tramos[0], ruta_combinado)]
+        else:
+            lotes = [
+                (tramo, os.path.join(salida, f".tramo_{i:03d}.pdf"))
+                for i, tramo in enumerate(tramos)
+            ]
+
+    if workers == 1 or len(tareas) <= 1:
+        resultados = [_renderizar_equipo(tarea) for tarea in tareas]
+        rutas_lotes = [_renderizar_lote(lote) for lote in lotes]
+    else:
+        # Las conexiones abiertas no deben heredarse a los procesos hijos
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=workers, initializer=_iniciar_worker) as pool:
+            # Los tramos son los más largos: se encolan primero
+            futuros_lotes = [pool.submit(_renderizar_lote, lote) for lote in lotes]
+            resultados = list(pool.map(_renderizar_equipo, tareas))
+            rutas_lotes = [futuro.result() for futuro in futuros_lotes]
+
+    if len(rutas_lotes) > 1:
+        writer = PdfWriter()
+        for ruta in rutas_lotes:
+            writer.append(ruta)
+        with open(ruta_combinado, "wb") as fh:
+            writer.write(fh)
+        for ruta in rutas_lotes:
+            os.remove(ruta)
+
+    return {
+        "equipos": resultados,
+        "sin_jugadores": sin_jugadores,
+        "combinado": ruta_combinado,
+        "segundos": time.perf_counter() - inicio,
+    }
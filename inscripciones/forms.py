@@ -1,12 +1,40 @@
 from django import forms
 from django.forms import inlineformset_factory, BaseInlineFormSet
-from django.forms.forms import NON_FIELD_ERRORS
-from .models import Team, PaymentProof, Player
+from .models import Team, PaymentProof, Player, normalizar_folio
+from .subidas import validar_tamano_subida
 
 
 # -----------------------------
 # Equipo
 # -----------------------------
+class TorneoAbiertoField(forms.ModelChoiceField):
+    """
+    Torneo de la ficha: las opciones salen de la lista de torneos abiertos que
+    ya trae la vista (cacheada), en lugar de un queryset que se consulta al
+    armar el <select>.
+
+    Al validar no se confía en esa lista: el cache es por worker y puede ir
+    atrasado (hasta TORNEOS_ABIERTOS_CACHE_TIMEOUT) respecto a un torneo que
+    el comité acaba de cerrar. Se confirma en la BD que siga abierto, con
+    una consulta por llave primaria.
+    """
+
+    def usar_torneos(self, torneos):
+        self.choices = [('', self.empty_label)] + [
+            (t.pk, self.label_from_instance(t)) for t in torneos
+        ]
+
+    def to_python(self, value):
+        if value in self.empty_values:
+            return None
+        try:
+            return self.queryset.get(pk=value, is_open=True)
+        except (ValueError, TypeError, self.queryset.model.DoesNotExist):
+            raise forms.ValidationError(
+                self.error_messages['invalid_choice'], code='invalid_choice'
+            )
+
+
 class TeamForm(forms.ModelForm):
     PREFERRED_DAY_CHOICES = [
         ('LUN', 'Lunes'),
@@ -45,6 +73,7 @@ class TeamForm(forms.ModelForm):
             'delegate_ine',
             'alternate_delegate_ine',
         ]
+        field_classes = {'tournament': TorneoAbiertoField}
         labels = {
             'tournament': 'Torneo',
             'category': 'Categoría',
@@ -64,9 +93,13 @@ class TeamForm(forms.ModelForm):
             'alternate_delegate_ine': 'INE del suplente (foto/scan)',
         }
 
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, torneos=None, **kwargs):
         super().__init__(*args, **kwargs)
 
+        # Solo se puede elegir un torneo abierto (lista de torneos_abiertos())
+        if torneos is not None:
+            self.fields['tournament'].usar_torneos(torneos)
+
         # Estilos Bootstrap
         for name, field in self.fields.items():
             if isinstance(field.widget, forms.CheckboxSelectMultiple):
@@ -128,7 +161,7 @@ class PaymentProofForm(forms.ModelForm):
                 return ''.join(ch for ch in phone if ch.isdigit())
 
             try:
-                team = Team.objects.get(folio=folio.strip().upper())
+                team = Team.objects.get(folio=normalizar_folio(folio))
             except Team.DoesNotExist:
                 raise forms.ValidationError(
                     "No existe ningún equipo con ese folio. Revisa que esté bien escrito."
@@ -143,7 +176,7 @@ class PaymentProofForm(forms.ModelForm):
                     "Verifica tus datos o contacta a la liga."
                 )
 
-            # Guardamos el team para usarlo en la vista
+            # Guardamos el team para usarlo en la vista (no se vuelve a buscar)
             self.team = team
 
         return cleaned_data
@@ -152,6 +185,111 @@ class PaymentProofForm(forms.ModelForm):
 # -----------------------------
 # Jugadores
 # -----------------------------
+def fila_vacia(cd):
+    """¿La fila de jugador viene completamente en blanco?"""
+    return (
+        not cd.get('jersey_number')
+        and not cd.get('first_name')
+        and not cd.get('last_name')
+        and not cd.get('imss_number')
+        and not cd.get('curp')
+        and not cd.get('age_years')
+        and not cd.get('age_months')
+        and not cd.get('photo')
+        and not cd.get('is_reinforcement')
+    )
+
+
+def revisar_roster(filas):
+    """
+    Reglas del equipo sobre el roster completo:
+    - Máx. 20 jugadores.
+    - Máx. 2 refuerzos.
+    - No se puede repetir número de playera en el mismo equipo.
+    - No se puede repetir Nombre + Apellido en el mismo equipo.
+
+    `filas` son pares (clave, cleaned_data) sin filas vacías ni borradas.
+    Regresa (errores, generales): errores = [(clave, campo, mensaje)] y
+    generales = [mensaje] para las reglas de todo el equipo.
+
+    La usan BasePlayerFormSet y la importación desde CSV/XLSX.
+    """
+    errores = []
+    generales = []
+
+    total_players = 0
+    reinforcements = 0
+
+    numeros_vistos = {}   # {numero: clave}
+    nombres_vistos = {}   # {(nombre, apellido): clave}
+
+    for clave, cd in filas:
+        total_players += 1
+        if cd.get('is_reinforcement'):
+            reinforcements += 1
+
+        # --- Validar número repetido ---
+        num = cd.get('jersey_number')
+        if num:
+            if num in numeros_vistos:
+                # jugador actual
+                errores.append((
+                    clave, 'jersey_number',
+                    "Ya existe otro jugador con este número en este equipo."
+                ))
+                # jugador anterior con el mismo número
+                errores.append((
+                    numeros_vistos[num], 'jersey_number',
+                    "Este número está repetido en la lista de jugadores."
+                ))
+            else:
+                numeros_vistos[num] = clave
+
+        # --- Validar nombre+apellido repetido ---
+        first = (cd.get('first_name') or '').strip()
+        last = (cd.get('last_name') or '').strip()
+        if first and last:
+            key = (first.lower(), last.lower())
+            if key in nombres_vistos:
+                msg = "Ya existe otro jugador con este nombre y apellido en este equipo."
+                errores.append((clave, 'first_name', msg))
+                errores.append((clave, 'last_name', msg))
+
+                # también marcamos el primero
+                prev = nombres_vistos[key]
+                errores.append((prev, 'first_name', "Nombre y apellido repetidos en la lista."))
+                errores.append((prev, 'last_name', "Nombre y apellido repetidos en la lista."))
+            else:
+                nombres_vistos[key] = clave
+
+    # Máx. 20 jugadores en total
+    if total_players > 20:
+        generales.append(
+            "No puedes registrar más de 20 jugadores por equipo "
+            "(18 con NSS + hasta 2 refuerzos)."
+        )
+
+    # Máx. 2 refuerzos
+    if reinforcements > 2:
+        generales.append(
+            "Solo puedes registrar hasta 2 jugadores como refuerzo."
+        )
+
+    return errores, generales
+
+
+class FotoJugadorField(forms.ImageField):
+    """
+    Revisa el tamaño antes de abrir la imagen: una foto que pasó del límite
+    llega vacía (ver LimiteTamanoUploadHandler) y sin esto el error sería
+    "imagen no válida" en lugar del de tamaño.
+    """
+
+    def to_python(self, data):
+        validar_tamano_subida(data)
+        return super().to_python(data)
+
+
 class PlayerForm(forms.ModelForm):
     class Meta:
         model = Player
@@ -166,6 +304,7 @@ class PlayerForm(forms.ModelForm):
             'is_reinforcement',   # Es refuerzo
             'photo',              # Foto (opcional)
         ]
+        field_classes = {'photo': FotoJugadorField}
         widgets = {
             'jersey_number': forms.NumberInput(
                 attrs={'class': 'form-control form-control-sm'}
@@ -216,21 +355,19 @@ class PlayerForm(forms.ModelForm):
         # Si quieres algo más estricto, aquí podrías meter un regex de CURP real.
         return curp
 
+    def validate_unique(self):
+        """
+        No consultamos la BD por cada fila (2 queries por jugador): la
+        unicidad de número y nombre la valida BasePlayerFormSet en memoria
+        contra todo el roster, y la BD la vuelve a garantizar al guardar.
+        """
+        return
+
     def clean(self):
         cleaned = super().clean()
 
         # ¿Fila completamente en blanco? (para filas extra)
-        is_blank = (
-            not cleaned.get('jersey_number')
-            and not cleaned.get('first_name')
-            and not cleaned.get('last_name')
-            and not cleaned.get('imss_number')
-            and not cleaned.get('curp')           # 👈 añadimos curp a la comprobación
-            and not cleaned.get('age_years')
-            and not cleaned.get('age_months')
-            and not cleaned.get('photo')
-            and not cleaned.get('is_reinforcement')
-        )
+        is_blank = fila_vacia(cleaned)
 
         # Para las filas nuevas se permite que estén totalmente vacías
         if self.empty_permitted and is_blank:
@@ -243,45 +380,59 @@ class PlayerForm(forms.ModelForm):
                 "Para jugadores que no son refuerzo, el NSS (IMSS) es obligatorio."
             )
 
-        # 🔹 Hacemos más entendibles los errores de duplicados (unique_together)
-        if NON_FIELD_ERRORS in self._errors:
-            nuevos = []
-            for msg in self._errors[NON_FIELD_ERRORS]:
-                if "Team y Número ya existe" in msg or "Team and Number already exists" in msg:
-                    nuevos.append(
-                        "Ya existe un jugador en este equipo con ese número. "
-                        "Verifica que el número de camiseta no esté repetido."
-                    )
-                elif "Team,Apellido y Nombre ya existe" in msg or "Team, Last name and First name already exists" in msg:
-                    nuevos.append(
-                        "Ya existe un jugador en este equipo con ese nombre y apellido. "
-                        "Revisa que no tengas al mismo jugador registrado dos veces."
-                    )
-                else:
-                    nuevos.append(msg)
-
-            self._errors[NON_FIELD_ERRORS] = nuevos
-
         return cleaned
 
 
+class JugadorExistenteField(forms.ModelChoiceField):
+    """
+    Campo oculto `id` de cada fila: resuelve el jugador contra el roster que
+    el formset ya cargó, en lugar de un queryset.get() (1 query) por fila.
+    """
+
+    def __init__(self, *args, roster=None, **kwargs):
+        # `roster` es una función que devuelve {pk (str): jugador}
+        self.roster = roster
+        super().__init__(*args, **kwargs)
+
+    def to_python(self, value):
+        if value in self.empty_values:
+            return None
+        jugador = self.roster().get(str(value))
+        if jugador is None:
+            raise forms.ValidationError(
+                self.error_messages["invalid_choice"],
+                code="invalid_choice",
+                params={"value": value},
+            )
+        return jugador
+
+
 class BasePlayerFormSet(BaseInlineFormSet):
     """
-    Reglas del equipo:
-    - Máx. 20 jugadores.
-    - Máx. 2 refuerzos.
-    - No se puede repetir número de playera en el mismo equipo.
-    - No se puede repetir Nombre + Apellido en el mismo equipo.
+    Reglas del equipo: ver revisar_roster().
     """
+    def roster_actual(self):
+        """{pk: jugador} del roster guardado (misma consulta que usa el formset)."""
+        if not hasattr(self, '_roster'):
+            self._roster = {str(j.pk): j for j in self.get_queryset()}
+        return self._roster
+
+    def add_fields(self, form, index):
+        super().add_fields(form, index)
+
+        campo = form.fields[self._pk_field.name]
+        form.fields[self._pk_field.name] = JugadorExistenteField(
+            campo.queryset,
+            roster=self.roster_actual,
+            initial=campo.initial,
+            required=False,
+            widget=campo.widget,
+        )
+
     def clean(self):
         super().clean()
 
-        total_players = 0
-        reinforcements = 0
-
-        numeros_vistos = {}   # {numero: índice_form}
-        nombres_vistos = {}   # {(nombre, apellido): índice_form}
-
+        filas = []
         for index, form in enumerate(self.forms):
             if not hasattr(form, "cleaned_data"):
                 continue
@@ -292,74 +443,18 @@ class BasePlayerFormSet(BaseInlineFormSet):
                 continue
 
             # Fila completamente vacía -> ignorar
-            is_blank = (
-                not cd.get('jersey_number')
-                and not cd.get('first_name')
-                and not cd.get('last_name')
-                and not cd.get('imss_number')
-                and not cd.get('curp')
-                and not cd.get('age_years')
-                and not cd.get('age_months')
-                and not cd.get('photo')
-                and not cd.get('is_reinforcement')
-            )
-            if is_blank:
+            if fila_vacia(cd):
                 continue
 
-            total_players += 1
-            if cd.get('is_reinforcement'):
-                reinforcements += 1
-
-            # --- Validar número repetido ---
-            num = cd.get('jersey_number')
-            if num:
-                if num in numeros_vistos:
-                    # jugador actual
-                    form.add_error(
-                        'jersey_number',
-                        "Ya existe otro jugador con este número en este equipo."
-                    )
-                    # jugador anterior con el mismo número
-                    self.forms[numeros_vistos[num]].add_error(
-                        'jersey_number',
-                        "Este número está repetido en la lista de jugadores."
-                    )
-                else:
-                    numeros_vistos[num] = index
-
-            # --- Validar nombre+apellido repetido ---
-            first = (cd.get('first_name') or '').strip()
-            last = (cd.get('last_name') or '').strip()
-            if first and last:
-                key = (first.lower(), last.lower())
-                if key in nombres_vistos:
-                    msg = "Ya existe otro jugador con este nombre y apellido en este equipo."
-                    form.add_error('first_name', msg)
-                    form.add_error('last_name', msg)
-
-                    # también marcamos el primero
-                    prev_index = nombres_vistos[key]
-                    self.forms[prev_index].add_error(
-                        'first_name', "Nombre y apellido repetidos en la lista."
-                    )
-                    self.forms[prev_index].add_error(
-                        'last_name', "Nombre y apellido repetidos en la lista."
-                    )
-                else:
-                    nombres_vistos[key] = index
-
-        # Máx. 20 jugadores en total
-        if total_players > 20:
-            raise forms.ValidationError(
-                "No puedes registrar más de 20 jugadores por equipo "
-                "(18 con NSS + hasta 2 refuerzos)."
-            )
+            filas.append((index, cd))
 
-        # Máx. 2 refuerzos
-        if reinforcements > 2:
-            raise forms.ValidationError(
-                "Solo puedes registrar hasta 2 jugadores como refuerzo."
-            )
+        errores, generales = revisar_roster(filas)
+        for index, campo, mensaje in errores:
+            self.forms[index].add_error(campo, mensaje)
+
+        # Máx. 20 jugadores / máx. 2 refuerzos
+        if generales:
+            raise forms.ValidationError(generales[0])
 
 
 PlayerFormSet = inlineformset_factory(
@@ -367,12 +462,28 @@ PlayerFormSet = inlineformset_factory(
     Player,
     form=PlayerForm,
     formset=BasePlayerFormSet,
-    extra=20,          # siempre verás hasta 20 filas
+    extra=1,           # una fila en blanco; las demás se agregan en la página (empty_form)
     max_num=20,        # nunca más de 20 guardados
     validate_max=True,
     can_delete=True,   # el delegado puede marcar para eliminar
 )
 
+class ImportarJugadoresForm(forms.Form):
+    archivo = forms.FileField(
+        label="Archivo CSV o Excel (.xlsx)",
+        help_text="Columnas: Número, Nombre, Apellido, NSS, CURP, Edad, Meses, Refuerzo.",
+        widget=forms.ClearableFileInput(
+            attrs={'class': 'form-control form-control-sm', 'accept': '.csv,.xlsx'}
+        ),
+    )
+
+    def clean_archivo(self):
+        archivo = self.cleaned_data['archivo']
+        if not archivo.name.lower().endswith(('.csv', '.xlsx')):
+            raise forms.ValidationError("El archivo debe ser .csv o .xlsx.")
+        return archivo
+
+
 # --- Formulario SOLO para el admin ---
 class PlayerAdminForm(forms.ModelForm):
     class Meta:
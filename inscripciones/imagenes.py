@@ -0,0 +1,104 @@
+# inscripciones/imagenes.py
+"""
+Procesamiento de imágenes subidas (fotos de jugadores, INE y comprobantes).
+"""
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+
+# Recuadro de la foto en la credencial: 15 x 24 mm a ~300 dpi
+FOTO_CREDENCIAL_MM = (15, 24)
+FOTO_CREDENCIAL_DPI = 300
+FOTO_CREDENCIAL_CALIDAD = 85
+
+
+def tamano_foto_credencial():
+    """(ancho, alto) en pixeles de la foto para la credencial."""
+    ancho_mm, alto_mm = FOTO_CREDENCIAL_MM
+    return (
+        round(ancho_mm / 25.4 * FOTO_CREDENCIAL_DPI),
+        round(alto_mm / 25.4 * FOTO_CREDENCIAL_DPI),
+    )
+
+
+def generar_foto_credencial(archivo):
+    """
+    Recibe la foto original (archivo abierto o ruta) y devuelve un ContentFile
+    JPEG ya rotado según EXIF, recortado a la proporción de la credencial y
+    reducido a ~300 dpi del tamaño impreso.
+    """
+    with Image.open(archivo) as img:
+        # Pillow decodifica a menor escala los JPEG si se lo pedimos (mucho más rápido)
+        img.draft("RGB", tuple(2 * lado for lado in tamano_foto_credencial()))
+        img = ImageOps.exif_transpose(img)
+        if img.mode != "RGB":
+            img = img.convert("RGB")
+
+        img = ImageOps.fit(
+            img,
+            tamano_foto_credencial(),
+            method=Image.Resampling.LANCZOS,
+            centering=(0.5, 0.4),  # un poco hacia arriba para no cortar la cabeza
+        )
+
+        buffer = BytesIO()
+        img.save(
+            buffer,
+            "JPEG",
+            quality=FOTO_CREDENCIAL_CALIDAD,
+            optimize=True,
+            dpi=(FOTO_CREDENCIAL_DPI, FOTO_CREDENCIAL_DPI),
+        )
+
+    return ContentFile(buffer.getvalue())
+
+
+def nombre_foto_credencial(nombre_original):
+    """'jugadores_fotos/abc.png' -> 'abc.jpg' (el upload_to pone la carpeta)."""
+    base = os.path.splitext(os.path.basename(nombre_original))[0]
+    return f"{base}.jpg"
+
+
+def comprimir_documento(archivo):
+    """
+    Recomprime una imagen escaneada o fotografiada (INE, comprobante):
+    la rota según EXIF, la reduce a SUBIDAS_IMAGEN_LADO_MAX y la guarda como
+    JPEG. Devuelve un ContentFile, o None si no es imagen (PDF) o si la
+    versión comprimida no pesa menos que la original.
+    """
+    lado = settings.SUBIDAS_IMAGEN_LADO_MAX
+    try:
+        img = Image.open(archivo)
+    except UnidentifiedImageError:
+        return None
+
+    with img:
+        img.draft("RGB", (lado, lado))
+        img = ImageOps.exif_transpose(img)
+        # Escaneos en blanco y negro se quedan en escala de grises (pesan menos)
+        if img.mode not in ("RGB", "L"):
+            img = img.convert("RGB")
+        img.thumbnail((lado, lado), Image.Resampling.LANCZOS)
+
+        buffer = BytesIO()
+        img.save(
+            buffer,
+            "JPEG",
+            quality=settings.SUBIDAS_IMAGEN_CALIDAD,
+            optimize=True,
+            progressive=True,
+        )
+
+    if buffer.tell() >= archivo.size:
+        return None
+    return ContentFile(buffer.getvalue())
+
+
+def nombre_documento(nombre_original):
+    """'comprobantes/pago.png' -> 'pago.jpg' (el upload_to pone la carpeta)."""
+    base = os.path.splitext(os.path.basename(nombre_original))[0]
+    return f"{base}.jpg"
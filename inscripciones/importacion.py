@@ -0,0 +1,334 @@
+# inscripciones/importacion.py
+"""
+Importación de rosters desde CSV/XLSX.
+
+El archivo se lee fila por fila (sin cargarlo completo), cada fila se valida
+con PlayerForm y, al terminar, las reglas del equipo (revisar_roster) se
+aplican sobre el roster completo: jugadores ya guardados + filas importadas.
+
+La escritura va en una sola transacción con bulk_create / bulk_update para
+todos los equipos del archivo. Un equipo con errores no se escribe.
+
+Las filas se empatan con jugadores existentes por número de playera: si el
+número ya está en el equipo se actualiza ese jugador, si no se crea uno nuevo.
+"""
+import csv
+import os
+import unicodedata
+
+from django.db import transaction
+from django.forms.models import model_to_dict
+
+from .forms import PlayerForm, fila_vacia, revisar_roster
+from .models import Player, Team
+from .utils import invalidar_cache_credenciales, invalidar_cache_roster
+
+
+# encabezado normalizado -> campo
+COLUMNAS = {
+    "folio": "folio",
+    "numero": "jersey_number",
+    "num": "jersey_number",
+    "no": "jersey_number",
+    "dorsal": "jersey_number",
+    "playera": "jersey_number",
+    "numerodeplayera": "jersey_number",
+    "jerseynumber": "jersey_number",
+    "nombre": "first_name",
+    "nombres": "first_name",
+    "firstname": "first_name",
+    "apellido": "last_name",
+    "apellidos": "last_name",
+    "lastname": "last_name",
+    "nss": "imss_number",
+    "nssimss": "imss_number",
+    "imss": "imss_number",
+    "imssnumber": "imss_number",
+    "curp": "curp",
+    "edad": "age_years",
+    "edadanos": "age_years",
+    "edadanios": "age_years",
+    "ageyears": "age_years",
+    "edadmeses": "age_months",
+    "meses": "age_months",
+    "agemonths": "age_months",
+    "refuerzo": "is_reinforcement",
+    "esrefuerzo": "is_reinforcement",
+    "isreinforcement": "is_reinforcement",
+}
+
+COLUMNAS_OBLIGATORIAS = ("jersey_number", "first_name", "last_name")
+
+VALORES_SI = {"si", "s", "x", "1", "true", "verdadero", "yes"}
+
+TAMANO_LOTE = 500
+
+
+class ErrorImportacion(Exception):
+    """El archivo no se puede leer (formato, encabezados...)."""
+
+
+def _normalizar_encabezado(valor):
+    texto = unicodedata.normalize("NFKD", str(valor or ""))
+    texto = "".join(ch for ch in texto if not unicodedata.combining(ch))
+    return "".join(ch for ch in texto.lower() if ch.isalnum())
+
+
+def _texto(valor):
+    """Celda -> texto; los números enteros de Excel llegan como 10.0."""
+    if valor is None:
+        return ""
+    if isinstance(valor, float) and valor.is_integer():
+        valor = int(valor)
+    return str(valor).strip()
+
+
+def _lineas_csv(archivo):
+    """Decodifica línea por línea: UTF-8 y, si falla, Windows-1252 (Excel)."""
+    for linea in archivo:
+        if isinstance(linea, str):
+            yield linea
+            continue
+        try:
+            yield linea.decode("utf-8-sig")
+        except UnicodeDecodeError:
+            yield linea.decode("cp1252", errors="replace")
+
+
+def _filas_csv(archivo):
+    lineas = _lineas_csv(archivo)
+    primera = next(lineas, "")
+    try:
+        dialecto = csv.Sniffer().sniff(primera, delimiters=",;\t")
+    except csv.Error:
+        dialecto = csv.excel
+
+    def todas():
+        yield primera
+        yield from lineas
+
+    yield from csv.reader(todas(), dialecto)
+
+
+def _filas_xlsx(archivo):
+    from openpyxl import load_workbook
+
+    try:
+        libro = load_workbook(archivo, read_only=True, data_only=True)
+    except Exception as exc:
+        raise ErrorImportacion(f"No se pudo abrir el archivo de Excel: {exc}")
+    try:
+        yield from libro.active.iter_rows(values_only=True)
+    finally:
+        libro.close()
+
+
+def leer_filas(archivo, nombre):
+    """
+    Genera (número de fila, {campo: texto}) desde un CSV o XLSX.
+    Solo se toman las columnas conocidas (ver COLUMNAS); las filas en blanco
+    se saltan.
+    """
+    extension = os.path.splitext(nombre or "")[1].lower()
+    if extension == ".csv":
+        filas = _filas_csv(archivo)
+    elif extension == ".xlsx":
+        filas = _filas_xlsx(archivo)
+    else:
+        raise ErrorImportacion("El archivo debe ser .csv o .xlsx.")
+
+    encabezados = next(filas, None)
+    if not encabezados:
+        raise ErrorImportacion("El archivo está vacío.")
+
+    campos = [COLUMNAS.get(_normalizar_encabezado(e)) for e in encabezados]
+    faltan = [c for c in COLUMNAS_OBLIGATORIAS if c not in campos]
+    if faltan:
+        etiquetas = [str(Player._meta.get_field(c).verbose_name) for c in faltan]
+        raise ErrorImportacion(
+            "Faltan columnas en el archivo: " + ", ".join(etiquetas) + "."
+        )
+
+    for numero, fila in enumerate(filas, start=2):
+        datos = {}
+        for campo, valor in zip(campos, fila):
+            if campo and campo not in datos:
+                datos[campo] = _texto(valor)
+        if any(datos.values()):
+            yield numero, datos
+
+
+def _datos_formulario(datos, jugador):
+    """
+    Datos para PlayerForm: parte del jugador existente (si hay) para que las
+    columnas que no trae el archivo no borren lo ya capturado.
+    """
+    if jugador is not None:
+        base = model_to_dict(jugador, fields=PlayerForm._meta.fields)
+        base.pop("photo", None)
+    else:
+        base = {}
+    for campo, valor in datos.items():
+        if campo == "folio":
+            continue
+        if campo == "is_reinforcement":
+            valor = _normalizar_encabezado(valor) in VALORES_SI
+        base[campo] = valor
+    return base
+
+
+def _errores_formulario(form):
+    for campo, mensajes in form.errors.items():
+        etiqueta = form.fields[campo].label if campo in form.fields else None
+        for mensaje in mensajes:
+            yield f"{etiqueta}: {mensaje}" if etiqueta else mensaje
+
+
+class _Roster:
+    """Estado de un equipo durante la importación."""
+
+    def __init__(self, team, jugadores):
+        self.team = team
+        self.por_numero = {j.jersey_number: j for j in jugadores}
+        self.filas = []         # [(fila, form)]
+        self.errores = []       # [(fila, mensaje)]
+
+    def agregar(self, fila, datos):
+        try:
+            numero = int(datos.get("jersey_number") or 0)
+        except ValueError:
+            numero = None
+
+        # Una fila por jugador existente; si el número se repite en el
+        # archivo, las demás filas son altas y las reglas marcan el duplicado.
+        jugador = self.por_numero.pop(numero, None) if numero else None
+        form = PlayerForm(
+            data=_datos_formulario(datos, jugador),
+            instance=jugador,
+        )
+        if form.is_valid():
+            self.filas.append((fila, form))
+        else:
+            self.errores.extend((fila, m) for m in _errores_formulario(form))
+
+    def revisar(self):
+        """Reglas del equipo: primero lo ya guardado, luego el archivo."""
+        existentes = [
+            (("bd", j.pk), model_to_dict(j, fields=PlayerForm._meta.fields))
+            for j in self.por_numero.values()
+        ]
+        importadas = [
+            (fila, form.cleaned_data)
+            for fila, form in self.filas
+            if not fila_vacia(form.cleaned_data)
+        ]
+        errores, generales = revisar_roster(existentes + importadas)
+        vistos = set()
+        for fila, campo, mensaje in errores:
+            # Los jugadores ya guardados no tienen fila en el archivo
+            if isinstance(fila, tuple) or (fila, mensaje) in vistos:
+                continue
+            vistos.add((fila, mensaje))
+            etiqueta = PlayerForm.base_fields[campo].label
+            self.errores.append((fila, f"{etiqueta}: {mensaje}"))
+        self.errores.extend((None, m) for m in generales)
+        self.errores.sort(key=lambda e: e[0] or 0)
+
+    def cambios(self):
+        """(nuevos, actualizados, campos actualizados)"""
+        nuevos, actualizados, campos = [], [], set()
+        for _fila, form in self.filas:
+            jugador = form.instance
+            if jugador.pk is None:
+                jugador.team = self.team
+                nuevos.append(jugador)
+            elif form.has_changed():
+                campos.update(form.changed_data)
+                actualizados.append(jugador)
+        return nuevos, actualizados, campos
+
+
+def importar_jugadores(archivo, nombre, team=None, torneo=None, guardar=True, max_filas=None):
+    """
+    Importa jugadores desde un CSV/XLSX.
+
+    - `team`: todas las filas son de ese equipo (columna folio ignorada).
+    - `torneo`: cada fila indica el folio del equipo; se cargan de una vez
+      los equipos APROBADOS del torneo y sus jugadores (2 consultas).
+    - `guardar=False` solo valida.
+    - `max_filas`: corta la lectura (para subidas desde la web).
+
+    Regresa {"equipos": {folio: {...}}, "errores": [(folio, fila, mensaje)]}.
+    """
+    if (team is None) == (torneo is None):
+        raise ValueError("Indica un equipo o un torneo (solo uno).")
+
+    if team is not None:
+        equipos = [team]
+    else:
+        equipos = list(Team.objects.filter(tournament=torneo, status="APROBADO"))
+
+    jugadores = {}
+    for jugador in Player.objects.filter(team__in=equipos).order_by("jersey_number"):
+        jugadores.setdefault(jugador.team_id, []).append(jugador)
+
+    rosters = {e.folio: _Roster(e, jugadores.get(e.pk, [])) for e in equipos}
+    resultado = {"equipos": {}, "errores": []}
+
+    for fila, datos in leer_filas(archivo, nombre):
+        if max_filas is not None and fila - 1 > max_filas:
+            resultado["errores"].append(
+                (None, fila, f"El archivo tiene más de {max_filas} filas; se ignoró el resto.")
+            )
+            break
+
+        if team is not None:
+            roster = rosters[team.folio]
+        else:
+            folio = datos.get("folio", "").upper()
+            roster = rosters.get(folio)
+            if roster is None:
+                mensaje = (
+                    "Falta el folio del equipo." if not folio else
+                    f"No hay un equipo APROBADO con folio {folio} en este torneo."
+                )
+                resultado["errores"].append((folio or None, fila, mensaje))
+                continue
+
+        roster.agregar(fila, datos)
+
+    nuevos, actualizados, campos, tocados = [], [], set(), []
+    for folio, roster in rosters.items():
+        if not roster.filas and not roster.errores:
+            continue
+
+        roster.revisar()
+        if roster.errores:
+            resultado["errores"].extend((folio, f, m) for f, m in roster.errores)
+            continue
+
+        n, a, c = roster.cambios()
+        nuevos.extend(n)
+        actualizados.extend(a)
+        campos.update(c)
+        if n or a:
+            tocados.append(roster.team.pk)
+        resultado["equipos"][folio] = {
+            "creados": len(n),
+            "actualizados": len(a),
+            "sin_cambios": len(roster.filas) - len(n) - len(a),
+        }
+
+    if guardar and (nuevos or actualizados):
+        with transaction.atomic():
+            if actualizados:
+                Player.objects.bulk_update(actualizados, sorted(campos), batch_size=TAMANO_LOTE)
+            if nuevos:
+                Player.objects.bulk_create(nuevos, batch_size=TAMANO_LOTE)
+
+        # bulk_* no dispara post_save: invalidamos a mano
+        for team_id in tocados:
+            invalidar_cache_credenciales(team_id)
+            invalidar_cache_roster(team_id)
+
+    return resultado
@@ -0,0 +1,132 @@
+# inscripciones/indices.py
+"""
+Revisión con EXPLAIN de las consultas frecuentes de vistas, admin y worker.
+
+Cada consulta de CONSULTAS reproduce la forma de una consulta real (mismos
+filtros y orden) y se considera bien servida si su plan no recorre ninguna
+tabla completa. Funciona en SQLite y PostgreSQL; en PostgreSQL se apaga
+`enable_seqscan` dentro de la transacción para que el planificador no elija
+un Seq Scan solo porque la tabla de desarrollo es pequeña. En otras BDs no
+se revisa nada (con un aviso).
+
+Lo usa el comando `revisar_indices`.
+"""
+import json
+import re
+import warnings
+
+from django.db import connections, router, transaction
+
+from .models import PaymentProof, PdfJob, Player, Team, normalizar_folio
+
+VENDORS = ('postgresql', 'sqlite')
+
+
+def _equipos_admin():
+    # Listado del admin de equipos filtrado por estado (mismo queryset anotado)
+    from django.contrib import admin
+
+    team_admin = admin.site._registry[Team]
+    queryset = team_admin.anotar_listado(team_admin.get_queryset(None))
+    return queryset.filter(status='COMPROBANTE_ENVIADO')
+
+
+CONSULTAS = [
+    (
+        "Equipo por folio (vistas de jugadores, credenciales, comprobante)",
+        lambda: Team.objects.filter(folio=normalizar_folio("life-01-0001")),
+    ),
+    (
+        "Equipos aprobados de un torneo (exportación e importación)",
+        lambda: Team.objects.filter(tournament_id=1, status='APROBADO'),
+    ),
+    (
+        "Equipos con fecha límite vencida",
+        lambda: Team.objects.filter(
+            status='PRE_REGISTRADO', payment_deadline__lt='2000-01-01'
+        ),
+    ),
+    (
+        "Admin de equipos filtrado por estado",
+        _equipos_admin,
+    ),
+    (
+        "Último comprobante de un equipo",
+        lambda: PaymentProof.objects.filter(team_id=1).order_by('-uploaded_at')[:1],
+    ),
+    (
+        "Roster de un equipo",
+        lambda: Player.objects.filter(team_id=1).order_by('jersey_number'),
+    ),
+    (
+        "Siguiente PDF en la cola",
+        lambda: PdfJob.objects.filter(status='PENDIENTE').order_by('created_at')[:1],
+    ),
+]
+
+
+def obtener_plan(queryset):
+    """Plan de ejecución de `queryset` como texto."""
+    alias = router.db_for_read(queryset.model)
+    connection = connections[alias]
+
+    if connection.vendor == 'postgresql':
+        with transaction.atomic(using=alias):
+            with connection.cursor() as cursor:
+                cursor.execute("SET LOCAL enable_seqscan = off")
+            return queryset.using(alias).explain(format='json')
+    return queryset.using(alias).explain()
+
+
+def _escaneos_postgresql(plan):
+    def recorrer(nodo):
+        if nodo.get('Node Type') == 'Seq Scan':
+            yield nodo.get('Relation Name', '?')
+        for hijo in nodo.get('Plans', []):
+            yield from recorrer(hijo)
+
+    for raiz in json.loads(plan):
+        yield from recorrer(raiz['Plan'])
+
+
+# "SCAN inscripciones_team" sin "USING ... INDEX" = recorrido completo
+_SCAN_SQLITE = re.compile(r"\bSCAN (\S+)(?! USING)")
+
+
+def _escaneos_sqlite(plan):
+    for linea in plan.splitlines():
+        encontrado = _SCAN_SQLITE.search(linea)
+        if encontrado and "INDEX" not in linea:
+            yield encontrado.group(1)
+
+
+def tablas_sin_indice(queryset, plan=None):
+    """Tablas que el plan de `queryset` recorre completas (lista vacía = bien)."""
+    if plan is None:
+        plan = obtener_plan(queryset)
+    vendor = connections[router.db_for_read(queryset.model)].vendor
+    if vendor == 'postgresql':
+        return sorted(set(_escaneos_postgresql(plan)))
+    if vendor == 'sqlite':
+        return sorted(set(_escaneos_sqlite(plan)))
+    raise NotImplementedError(f"Revisión de planes no disponible para {vendor}.")
+
+
+def revisar_consultas():
+    """
+    Genera (descripción, plan, tablas recorridas completas) por consulta. Si
+    la BD no es SQLite ni PostgreSQL avisa (RuntimeWarning) y no genera nada.
+    """
+    vendor = connections[router.db_for_read(Team)].vendor
+    if vendor not in VENDORS:
+        warnings.warn(
+            f"Revisión de planes no disponible para {vendor}; no se revisó ninguna consulta.",
+            RuntimeWarning,
+            stacklevel=2,
+        )
+        return
+
+    for descripcion, consulta in CONSULTAS:
+        queryset = consulta()
+        plan = obtener_plan(queryset)
+        yield descripcion, plan, tablas_sin_indice(queryset, plan)
@@ -0,0 +1,257 @@
+# inscripciones/management/commands/benchmark_credenciales.py
+import json
+import os
+import platform
+import statistics
+import tempfile
+import time
+import tracemalloc
+from io import BytesIO
+from types import SimpleNamespace
+
+import reportlab
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+from PIL import Image
+
+from inscripciones import utils
+from inscripciones.imagenes import generar_foto_credencial
+from inscripciones.models import Team
+
+CATEGORIAS = [codigo for codigo, _ in Team.CATEGORY_CHOICES]
+TAMANOS = [1, 8, 20]
+FOTOS = ["sin_foto", "original", "credencial"]
+FASES = ["fondo", "foto", "texto", "qr", "pagina", "guardado"]
+
+
+def _foto_sintetica(directorio, ancho, alto, nombre):
+    """JPEG con ruido (no comprime como un color plano, se parece a una foto real)."""
+    ruta = os.path.join(directorio, nombre)
+    img = Image.effect_noise((ancho, alto), 64).convert("RGB")
+    img.save(ruta, "JPEG", quality=90)
+    return ruta
+
+
+def _equipo_sintetico(categoria, tamano, modo_foto, fotos):
+    """
+    Equipo y jugadores falsos (sin BD) con la misma forma que los modelos.
+    Con 8 o más jugadores, los dos últimos son refuerzos (fondo REF).
+    """
+    nombres = dict(Team.CATEGORY_CHOICES)
+    team = SimpleNamespace(
+        pk=0,
+        name=f"Deportivo Benchmark {categoria}",
+        category=categoria,
+        folio=f"BENCH-{categoria}-{tamano:02d}",
+        get_category_display=lambda: nombres[categoria],
+    )
+
+    jugadores = []
+    for numero in range(1, tamano + 1):
+        photo = photo_credencial = None
+        if modo_foto != "sin_foto":
+            photo = SimpleNamespace(name="original.jpg", path=fotos["original"])
+        if modo_foto == "credencial":
+            photo_credencial = SimpleNamespace(name="credencial.jpg", path=fotos["credencial"])
+
+        refuerzo = tamano >= 8 and numero > tamano - 2
+        jugadores.append(
+            SimpleNamespace(
+                pk=numero,
+                jersey_number=numero,
+                first_name=f"Jugador{numero}",
+                last_name="Apellido Benchmark",
+                curp="" if refuerzo else "XEXX010101HNEXXXA4",
+                imss_number="" if refuerzo else f"1234567{numero:04d}",
+                is_reinforcement=refuerzo,
+                photo=photo,
+                photo_credencial=photo_credencial,
+            )
+        )
+    return team, jugadores
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark reproducible del generador de credenciales: tiempo, memoria pico, "
+        "tamaño del PDF y desglose por fase. Puede guardar o comparar contra una base JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeticiones", type=int, default=10)
+        parser.add_argument(
+            "--categorias",
+            default=",".join(CATEGORIAS),
+            help=f"Separadas por coma (default: {','.join(CATEGORIAS)}).",
+        )
+        parser.add_argument(
+            "--tamanos",
+            default=",".join(str(t) for t in TAMANOS),
+            help="Jugadores por equipo, separados por coma (default: 1,8,20).",
+        )
+        parser.add_argument(
+            "--fotos",
+            default=",".join(FOTOS),
+            help=f"Modos de foto (default: {','.join(FOTOS)}).",
+        )
+        parser.add_argument(
+            "--en-frio",
+            action="store_true",
+            help="Vacía los caches de QR y fondos antes de cada repetición.",
+        )
+        parser.add_argument("--guardar", metavar="JSON", help="Guarda los resultados como base.")
+        parser.add_argument("--comparar", metavar="JSON", help="Compara contra una base guardada.")
+        parser.add_argument(
+            "--tolerancia",
+            type=float,
+            default=30.0,
+            help=(
+                "%% de tiempo extra (sobre el mínimo de las repeticiones) permitido al "
+                "comparar antes de marcar regresión. Entre corridas del mismo código el "
+                "mínimo de 10 repeticiones varía ~15%%."
+            ),
+        )
+
+    def handle(self, *args, **options):
+        categorias = [c.strip().upper() for c in options["categorias"].split(",") if c.strip()]
+        tamanos = [int(t) for t in options["tamanos"].split(",") if t.strip()]
+        modos = [m.strip() for m in options["fotos"].split(",") if m.strip()]
+        for modo in modos:
+            if modo not in FOTOS:
+                raise CommandError(f"Modo de foto desconocido: {modo}")
+
+        # Sin caches en disco (QR y fondos): el benchmark no debe depender de lo
+        # que haya en MEDIA_ROOT, y todas las corridas parten de lo mismo
+        with override_settings(
+            CREDENCIALES_QR_DISK_CACHE_DIR=None,
+            CREDENCIALES_FONDOS_CACHE_DIR=None,
+        ):
+            self._vaciar_caches()
+            with tempfile.TemporaryDirectory() as tmp:
+                original = _foto_sintetica(tmp, 4000, 3000, "original.jpg")
+                with open(original, "rb") as fh:
+                    derivada = generar_foto_credencial(fh)
+                ruta_derivada = os.path.join(tmp, "credencial.jpg")
+                with open(ruta_derivada, "wb") as fh:
+                    fh.write(derivada.read())
+                fotos = {"original": original, "credencial": ruta_derivada}
+
+                resultados = {}
+                for categoria in categorias:
+                    for tamano in tamanos:
+                        for modo in modos:
+                            clave = f"{categoria}-{tamano:02d}-{modo}"
+                            team, jugadores = _equipo_sintetico(categoria, tamano, modo, fotos)
+                            resultados[clave] = self._medir(
+                                team, jugadores, options["repeticiones"], options["en_frio"]
+                            )
+                            self._imprimir(clave, resultados[clave])
+
+        datos = {
+            "meta": {
+                "python": platform.python_version(),
+                "reportlab": reportlab.Version,
+                "maquina": platform.machine(),
+                "repeticiones": options["repeticiones"],
+                "en_frio": options["en_frio"],
+                "layout": utils.CREDENCIALES_LAYOUT_VERSION,
+            },
+            "escenarios": resultados,
+        }
+
+        if options["guardar"]:
+            with open(options["guardar"], "w", encoding="utf-8") as fh:
+                json.dump(datos, fh, indent=2, sort_keys=True)
+            self.stdout.write(self.style.SUCCESS(f"Base guardada en {options['guardar']}"))
+
+        if options["comparar"]:
+            self._comparar(options["comparar"], resultados, options["tolerancia"])
+
+    def _vaciar_caches(self):
+        utils._qr_cache.clear()
+        with utils._fondos_lock:
+            utils._fondos_cache.clear()
+
+    def _medir(self, team, jugadores, repeticiones, en_frio):
+        # Calentamiento: deja listos QR/fondos como estarían en un worker ya arrancado
+        utils.generar_credenciales_pdf(team, jugadores, BytesIO())
+
+        tiempos = []
+        fases_por_corrida = []
+        tamano_pdf = 0
+        for _ in range(repeticiones):
+            if en_frio:
+                self._vaciar_caches()
+            fases = {}
+            salida = BytesIO()
+            inicio = time.perf_counter()
+            utils.generar_credenciales_pdf(team, jugadores, salida, fases=fases)
+            tiempos.append(time.perf_counter() - inicio)
+            fases_por_corrida.append(fases)
+            tamano_pdf = salida.tell()
+
+        # La memoria se mide aparte: tracemalloc distorsiona los tiempos
+        if en_frio:
+            self._vaciar_caches()
+        tracemalloc.start()
+        try:
+            utils.generar_credenciales_pdf(team, jugadores, BytesIO())
+            _, pico = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        return {
+            "segundos": statistics.median(tiempos),
+            "segundos_min": min(tiempos),
+            "pico_kb": pico / 1024,
+            "bytes": tamano_pdf,
+            "fases": {
+                fase: statistics.median(f.get(fase, 0.0) for f in fases_por_corrida)
+                for fase in FASES
+            },
+        }
+
+    def _imprimir(self, clave, r):
+        fases = " ".join(f"{fase}={r['fases'][fase] * 1000:.1f}" for fase in FASES)
+        self.stdout.write(
+            f"{clave:<24} {r['segundos'] * 1000:>8.1f} ms {r['pico_kb']:>9.0f} KB pico "
+            f"{r['bytes'] / 1024:>8.1f} KB pdf | {fases}"
+        )
+
+    def _comparar(self, ruta, resultados, tolerancia):
+        try:
+            with open(ruta, encoding="utf-8") as fh:
+                base = json.load(fh)["escenarios"]
+        except (OSError, ValueError, KeyError) as exc:
+            raise CommandError(f"No se pudo leer la base {ruta}: {exc}")
+
+        self.stdout.write(f"\nComparación contra {ruta} (tolerancia {tolerancia:.0f}%):")
+        regresiones = []
+        for clave, actual in resultados.items():
+            anterior = base.get(clave)
+            if not anterior:
+                self.stdout.write(f"  {clave:<24} (sin dato en la base)")
+                continue
+
+            # El mínimo es lo más estable entre corridas (la mediana arrastra
+            # el ruido de la máquina); bases viejas solo traen la mediana
+            delta_t = (
+                actual["segundos_min"] / anterior.get("segundos_min", anterior["segundos"]) - 1
+            ) * 100
+            delta_b = (actual["bytes"] / anterior["bytes"] - 1) * 100 if anterior["bytes"] else 0
+            delta_m = (actual["pico_kb"] / anterior["pico_kb"] - 1) * 100 if anterior["pico_kb"] else 0
+            linea = (
+                f"  {clave:<24} tiempo {delta_t:+6.1f}%  memoria {delta_m:+6.1f}%  "
+                f"pdf {delta_b:+6.1f}%"
+            )
+            if delta_t > tolerancia:
+                regresiones.append(clave)
+                self.stdout.write(self.style.ERROR(linea))
+            else:
+                self.stdout.write(linea)
+
+        if regresiones:
+            raise CommandError(
+                f"{len(regresiones)} escenarios más lentos que la base: {', '.join(regresiones)}"
+            )
+        self.stdout.write(self.style.SUCCESS("Sin regresiones."))
@@ -0,0 +1,97 @@
+# inscripciones/management/commands/comprimir_documentos.py
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from PIL import Image
+
+from inscripciones.almacenamiento import borrar_si_huerfano
+from inscripciones.imagenes import comprimir_documento, nombre_documento
+from inscripciones.models import PaymentProof, Team
+
+
+# (modelo, campo de archivo, campo tamaño original, campo tamaño guardado)
+CAMPOS = [
+    (Team, "delegate_ine", "delegate_ine_original_size", "delegate_ine_stored_size"),
+    (
+        Team,
+        "alternate_delegate_ine",
+        "alternate_delegate_ine_original_size",
+        "alternate_delegate_ine_stored_size",
+    ),
+    (PaymentProof, "file", "original_size", "stored_size"),
+]
+
+
+def _procesar(archivo):
+    """Corre en un hilo del pool: solo trabajo de imagen, nada de BD."""
+    try:
+        with archivo.open("rb"):
+            return comprimir_documento(archivo), None
+    except (OSError, ValueError, Image.DecompressionBombError) as exc:
+        return None, exc
+
+
+class Command(BaseCommand):
+    help = (
+        "Recomprime las INE y comprobantes que se subieron antes de normalizar "
+        "las subidas (las imágenes pasan a JPEG reducido, los PDF no se tocan)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count() or 2,
+            help="Hilos para procesar imágenes en paralelo (default: núm. de CPUs).",
+        )
+
+    def handle(self, *args, **options):
+        total_original = total_guardado = errores = 0
+
+        for modelo, campo, campo_original, campo_guardado in CAMPOS:
+            registros = list(
+                modelo.objects
+                .exclude(**{campo: ""})
+                .exclude(**{f"{campo}__isnull": True})
+                .filter(**{f"{campo_guardado}__isnull": True})
+                .only("id", campo)
+            )
+            if not registros:
+                continue
+
+            self.stdout.write(f"{modelo.__name__}.{campo}: {len(registros)} archivos...")
+
+            with ThreadPoolExecutor(max_workers=options["workers"]) as pool:
+                archivos = [getattr(r, campo) for r in registros]
+                resultados = pool.map(_procesar, archivos)
+
+                for registro, archivo, (contenido, exc) in zip(registros, archivos, resultados):
+                    if exc is not None:
+                        errores += 1
+                        self.stderr.write(f"  {archivo.name}: {exc}")
+                        continue
+
+                    original = archivo.size
+                    anterior = archivo.name
+                    if contenido is not None:
+                        archivo.save(nombre_documento(anterior), contenido, save=False)
+
+                    # update() directo: no queremos disparar save() ni señales
+                    modelo.objects.filter(pk=registro.pk).update(**{
+                        campo: archivo.name,
+                        campo_original: original,
+                        campo_guardado: archivo.size,
+                    })
+                    if archivo.name != anterior:
+                        # Otro registro puede compartir el archivo (mismo contenido)
+                        borrar_si_huerfano(anterior)
+                    total_original += original
+                    total_guardado += archivo.size
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Antes: {total_original / 1024 / 1024:.1f} MB, "
+                f"ahora: {total_guardado / 1024 / 1024:.1f} MB. Con error: {errores}."
+            )
+        )
@@ -0,0 +1,398 @@
+# inscripciones/management/commands/ensayo_inscripciones.py
+import http.cookiejar
+import json
+import math
+import os
+import re
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+import uuid
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.core.management.base import BaseCommand, CommandError
+from PIL import Image
+
+from inscripciones.almacenamiento import borrar_si_huerfano
+from inscripciones.models import PaymentProof, Team
+
+# Los equipos del ensayo se reconocen por el nombre (ver --limpiar)
+PREFIJO_EQUIPO = "Ensayo carga"
+HOSTS_LOCALES = {"localhost", "127.0.0.1", "::1"}
+ENDPOINTS = [
+    "GET inscripcion",
+    "POST inscripcion",
+    "GET comprobante",
+    "POST comprobante",
+]
+
+RE_CSRF = re.compile(r'name="csrfmiddlewaretoken" value="([^"]+)"')
+RE_TORNEO = re.compile(r'<select name="tournament"[^>]*>(.*?)</select>', re.S)
+RE_OPCION = re.compile(r'<option value="(\d+)"')
+RE_FOLIO = re.compile(r'\?folio=([A-Za-z0-9-]+)')
+# Server-Timing de TiemposPeticionMiddleware: db;dur=1.2;desc="5 consultas"
+RE_CONSULTAS = re.compile(r'db;[^,]*desc="(\d+) consultas"')
+
+
+def _foto_telefono(megas):
+    """
+    Imagen con ruido que en JPEG pesa aprox. `megas` MB, como la foto de un
+    teléfono (el ruido no comprime, así que pesa lo que una foto real).
+    """
+    muestra = Image.effect_noise((400, 300), 64).convert("RGB")
+    escala = math.sqrt(megas * 1024 * 1024 / len(_jpeg(muestra)))
+    return Image.effect_noise(
+        (max(1, int(400 * escala)), max(1, int(300 * escala))), 64
+    ).convert("RGB")
+
+
+def _jpeg(imagen, marca=None):
+    """
+    JPEG de `imagen`. Con `marca`, una esquina de pixeles al azar: cada
+    delegado sube una imagen distinta, aun después de recomprimirla (si no,
+    el storage por contenido guardaría un solo archivo para todos).
+    """
+    if marca is not None:
+        imagen = imagen.copy()
+        imagen.paste(Image.frombytes("RGB", (16, 16), os.urandom(16 * 16 * 3)))
+    salida = BytesIO()
+    imagen.save(salida, "JPEG", quality=90)
+    return salida.getvalue()
+
+
+def _multipart(campos, archivos):
+    """Cuerpo multipart/form-data como lo manda el navegador."""
+    frontera = uuid.uuid4().hex
+    partes = []
+    for nombre, valor in campos:
+        partes.append(
+            f'--{frontera}\r\nContent-Disposition: form-data; name="{nombre}"\r\n\r\n'
+            f"{valor}\r\n".encode()
+        )
+    for nombre, archivo, contenido, tipo in archivos:
+        partes.append(
+            f'--{frontera}\r\nContent-Disposition: form-data; name="{nombre}"; '
+            f'filename="{archivo}"\r\nContent-Type: {tipo}\r\n\r\n'.encode()
+        )
+        partes.append(contenido)
+        partes.append(b"\r\n")
+    partes.append(f"--{frontera}--\r\n".encode())
+    return b"".join(partes), f"multipart/form-data; boundary={frontera}"
+
+
+def _percentil(valores, p):
+    """Percentil por rango más cercano (valores ya ordenados)."""
+    if not valores:
+        return None
+    return valores[min(len(valores) - 1, max(0, math.ceil(p / 100 * len(valores)) - 1))]
+
+
+class _Resultados:
+    """Latencias, estados y consultas por endpoint; compartido entre hilos."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencias = defaultdict(list)
+        self.errores = Counter()
+        self.estados = defaultdict(Counter)
+        self.consultas = defaultdict(list)
+        self.enviado = Counter()
+
+    def registrar(self, endpoint, segundos, estado, consultas, enviados, ok):
+        with self.lock:
+            self.latencias[endpoint].append(segundos)
+            self.estados[endpoint][estado] += 1
+            self.enviado[endpoint] += enviados
+            if consultas is not None:
+                self.consultas[endpoint].append(consultas)
+            if not ok:
+                self.errores[endpoint] += 1
+
+    def resumen(self, duracion):
+        resumen = {}
+        for endpoint in ENDPOINTS:
+            latencias = sorted(self.latencias.get(endpoint, []))
+            if not latencias:
+                continue
+            consultas = self.consultas.get(endpoint, [])
+            n = len(latencias)
+            resumen[endpoint] = {
+                "peticiones": n,
+                "errores": self.errores[endpoint],
+                "tasa_error": self.errores[endpoint] / n,
+                "por_segundo": n / duracion,
+                "p50_ms": _percentil(latencias, 50) * 1000,
+                "p90_ms": _percentil(latencias, 90) * 1000,
+                "p95_ms": _percentil(latencias, 95) * 1000,
+                "p99_ms": _percentil(latencias, 99) * 1000,
+                "max_ms": latencias[-1] * 1000,
+                "consultas_prom": sum(consultas) / len(consultas) if consultas else None,
+                "consultas_max": max(consultas) if consultas else None,
+                "mb_enviados": self.enviado[endpoint] / 1024 / 1024,
+                "estados": dict(self.estados[endpoint]),
+            }
+        return resumen
+
+
+class _Delegado:
+    """
+    Un delegado con su propio navegador (cookies y token CSRF): se inscribe
+    con la INE y luego sube el comprobante, igual que en el sitio.
+    """
+
+    def __init__(self, numero, opciones, resultados, ine, comprobante):
+        self.numero = numero
+        self.url = opciones["url"].rstrip("/")
+        self.timeout = opciones["timeout"]
+        self.torneo = opciones["torneo"]
+        self.resultados = resultados
+        self.ine = _jpeg(ine, marca=numero)
+        self.comprobante = _jpeg(comprobante, marca=numero)
+        self.navegador = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar())
+        )
+
+    def _pedir(self, endpoint, ruta, cuerpo=None, tipo=None, exito=None):
+        peticion = urllib.request.Request(self.url + ruta, data=cuerpo)
+        if tipo:
+            peticion.add_header("Content-Type", tipo)
+            peticion.add_header("Referer", self.url + ruta)
+
+        inicio = time.perf_counter()
+        try:
+            with self.navegador.open(peticion, timeout=self.timeout) as respuesta:
+                html = respuesta.read().decode("utf-8", "replace")
+                estado = respuesta.status
+                tiempos = respuesta.headers.get("Server-Timing")
+        except urllib.error.HTTPError as exc:
+            html, estado, tiempos = "", exc.code, exc.headers.get("Server-Timing")
+        except (urllib.error.URLError, OSError) as exc:
+            html, estado, tiempos = "", type(exc).__name__, None
+        segundos = time.perf_counter() - inicio
+        consultas = RE_CONSULTAS.search(tiempos or "")
+
+        ok = estado == 200 and (exito is None or exito(html))
+        self.resultados.registrar(
+            endpoint,
+            segundos,
+            estado,
+            int(consultas.group(1)) if consultas else None,
+            len(cuerpo or b""),
+            ok,
+        )
+        return html if ok else None
+
+    def correr(self):
+        html = self._pedir("GET inscripcion", "/inscripcion/", exito=RE_CSRF.search)
+        if html is None:
+            return False
+
+        torneo = self.torneo
+        if torneo is None:
+            select = RE_TORNEO.search(html)
+            opciones = RE_OPCION.findall(select.group(1)) if select else []
+            if not opciones:
+                return False
+            torneo = opciones[0]
+
+        telefono = f"55{self.numero:08d}"
+        cuerpo, tipo = _multipart(
+            [
+                ("csrfmiddlewaretoken", RE_CSRF.search(html).group(1)),
+                ("tournament", torneo),
+                ("category", "LIB"),
+                ("name", f"{PREFIJO_EQUIPO} {self.numero:05d}"),
+                ("company_name", "Ensayo de carga"),
+                ("employer_number_imss", ""),
+                ("delegate_name", f"Delegado Ensayo {self.numero}"),
+                ("delegate_phone", telefono),
+                ("delegate_office_phone", ""),
+                ("delegate_email", f"ensayo{self.numero}@example.com"),
+                ("alternate_delegate_name", ""),
+                ("alternate_delegate_phone", ""),
+                ("alternate_delegate_office_phone", ""),
+                ("preferred_days", "LUN"),
+                ("preferred_days", "MIE"),
+            ],
+            [("delegate_ine", "ine.jpg", self.ine, "image/jpeg")],
+        )
+        html = self._pedir(
+            "POST inscripcion", "/inscripcion/", cuerpo, tipo, exito=RE_FOLIO.search
+        )
+        if html is None:
+            return False
+        folio = RE_FOLIO.search(html).group(1)
+
+        html = self._pedir(
+            "GET comprobante",
+            "/comprobante/?" + urllib.parse.urlencode({"folio": folio}),
+            exito=RE_CSRF.search,
+        )
+        if html is None:
+            return False
+
+        cuerpo, tipo = _multipart(
+            [
+                ("csrfmiddlewaretoken", RE_CSRF.search(html).group(1)),
+                ("folio", folio),
+                ("delegate_phone", telefono),
+            ],
+            [("file", "comprobante.jpg", self.comprobante, "image/jpeg")],
+        )
+        # Si el comprobante se aceptó, la respuesta ya no trae el formulario
+        html = self._pedir(
+            "POST comprobante",
+            "/comprobante/",
+            cuerpo,
+            tipo,
+            exito=lambda html: 'name="file"' not in html,
+        )
+        return html is not None
+
+
+class Command(BaseCommand):
+    help = (
+        "Ensayo del día de inscripciones: muchos delegados a la vez se inscriben "
+        "(con INE) y suben su comprobante contra un servidor local. Reporta "
+        "peticiones por segundo, percentiles de latencia, errores y consultas por endpoint."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--url", default="http://127.0.0.1:8000")
+        parser.add_argument("--delegados", type=int, default=100)
+        parser.add_argument("--concurrencia", type=int, default=20)
+        parser.add_argument(
+            "--torneo",
+            help="ID del torneo (default: el primero abierto que ofrece el formulario).",
+        )
+        parser.add_argument("--mb-ine", type=float, default=2.0)
+        parser.add_argument("--mb-comprobante", type=float, default=4.0)
+        parser.add_argument(
+            "--rampa",
+            type=float,
+            default=0,
+            help="Segundos en los que se reparten los arranques (default: todos a la vez).",
+        )
+        parser.add_argument("--timeout", type=float, default=60)
+        parser.add_argument("--guardar", metavar="ARCHIVO", help="Guarda el resumen en JSON.")
+        parser.add_argument(
+            "--remoto",
+            action="store_true",
+            help="Permite un --url que no es local (el ensayo crea equipos de verdad).",
+        )
+        parser.add_argument(
+            "--limpiar",
+            action="store_true",
+            help="No corre el ensayo: borra los equipos que dejaron ensayos anteriores.",
+        )
+
+    def handle(self, *args, **options):
+        if options["limpiar"]:
+            return self._limpiar()
+
+        host = urllib.parse.urlsplit(options["url"]).hostname
+        if host not in HOSTS_LOCALES and not options["remoto"]:
+            raise CommandError(
+                f"{options['url']} no es local; el ensayo crea equipos y archivos. "
+                "Usa --remoto si de verdad es un servidor de pruebas."
+            )
+
+        self.stdout.write("Generando archivos de prueba...")
+        ine = _foto_telefono(options["mb_ine"])
+        comprobante = _foto_telefono(options["mb_comprobante"])
+
+        resultados = _Resultados()
+        delegados = options["delegados"]
+        pausa = options["rampa"] / delegados if delegados else 0
+
+        def delegado(numero):
+            if pausa:
+                time.sleep(numero * pausa)
+            return _Delegado(numero, options, resultados, ine, comprobante).correr()
+
+        self.stdout.write(
+            f"{delegados} delegados, {options['concurrencia']} a la vez, contra {options['url']}..."
+        )
+        inicio = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options["concurrencia"]) as pool:
+            completos = sum(pool.map(delegado, range(1, delegados + 1)))
+        duracion = time.perf_counter() - inicio
+
+        resumen = resultados.resumen(duracion)
+        self._imprimir(resumen, completos, delegados, duracion)
+
+        if options["guardar"]:
+            with open(options["guardar"], "w", encoding="utf-8") as f:
+                json.dump(
+                    {
+                        "opciones": {
+                            k: options[k]
+                            for k in ("url", "delegados", "concurrencia", "mb_ine", "mb_comprobante", "rampa")
+                        },
+                        "duracion_s": duracion,
+                        "delegados_completos": completos,
+                        "endpoints": resumen,
+                    },
+                    f,
+                    indent=2,
+                    ensure_ascii=False,
+                )
+            self.stdout.write(f"Resumen guardado en {options['guardar']}")
+
+    def _imprimir(self, resumen, completos, delegados, duracion):
+        encabezado = (
+            f"{'endpoint':<18} {'pets':>5} {'err%':>6} {'pet/s':>7} {'p50':>7} "
+            f"{'p90':>7} {'p95':>7} {'p99':>7} {'max':>7} {'consultas':>10}"
+        )
+        self.stdout.write("")
+        self.stdout.write(encabezado)
+        self.stdout.write("-" * len(encabezado))
+        for endpoint, r in resumen.items():
+            consultas = (
+                f"{r['consultas_prom']:.1f}/{r['consultas_max']}"
+                if r["consultas_prom"] is not None
+                else "-"
+            )
+            self.stdout.write(
+                f"{endpoint:<18} {r['peticiones']:>5} {r['tasa_error'] * 100:>5.1f}% "
+                f"{r['por_segundo']:>7.1f} {r['p50_ms']:>6.0f}ms {r['p90_ms']:>5.0f}ms "
+                f"{r['p95_ms']:>5.0f}ms {r['p99_ms']:>5.0f}ms {r['max_ms']:>5.0f}ms {consultas:>10}"
+            )
+            fallas = {k: v for k, v in r["estados"].items() if k != 200}
+            if fallas:
+                self.stdout.write(f"    respuestas distintas de 200: {fallas}")
+
+        if not any(r["consultas_prom"] is not None for r in resumen.values()):
+            self.stdout.write(
+                "(sin conteo de consultas: arranca el servidor con TIEMPOS_SERVER_TIMING=True)"
+            )
+
+        estilo = self.style.SUCCESS if completos == delegados else self.style.WARNING
+        self.stdout.write(
+            estilo(
+                f"\nDelegados completos: {completos}/{delegados} en {duracion:.1f} s "
+                f"({completos / duracion:.1f} inscripciones/s)."
+            )
+        )
+
+    def _limpiar(self):
+        equipos = Team.objects.filter(name__startswith=PREFIJO_EQUIPO)
+        archivos = set()
+        for delegado, suplente in equipos.values_list("delegate_ine", "alternate_delegate_ine"):
+            archivos.update([delegado, suplente])
+        archivos.update(
+            PaymentProof.objects.filter(team__in=equipos).values_list("file", flat=True)
+        )
+
+        borrados, _detalle = equipos.delete()
+        # Al final: un archivo solo se borra si ya nadie lo usa
+        archivos_borrados = sum(borrar_si_huerfano(nombre) for nombre in archivos if nombre)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Registros borrados: {borrados}. Archivos borrados: {archivos_borrados}."
+            )
+        )
@@ -0,0 +1,52 @@
+# inscripciones/management/commands/expirar_equipos.py
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from inscripciones.models import Team, Tournament
+from inscripciones.servicios import expirar_equipos_vencidos
+
+
+class Command(BaseCommand):
+    help = (
+        "Pasa a EXPIRADO los equipos pre-registrados con la fecha límite de pago "
+        "vencida. Idempotente: se puede correr desde cron cada pocos minutos."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--torneo", type=int, help="Solo este torneo (ID).")
+        parser.add_argument(
+            "--fecha",
+            help="Fecha de hoy a usar, AAAA-MM-DD (default: hoy en Ciudad de México).",
+        )
+        parser.add_argument(
+            "--simular",
+            action="store_true",
+            help="Solo cuenta los equipos que expirarían, no cambia nada.",
+        )
+
+    def handle(self, *args, **options):
+        equipos = None
+        if options["torneo"]:
+            if not Tournament.objects.filter(pk=options["torneo"]).exists():
+                raise CommandError(f"No existe el torneo con id {options['torneo']}.")
+            equipos = Team.objects.filter(tournament_id=options["torneo"])
+
+        try:
+            hoy = date.fromisoformat(options["fecha"]) if options["fecha"] else timezone.localdate()
+        except ValueError:
+            raise CommandError("La fecha debe tener el formato AAAA-MM-DD.")
+
+        expirados = expirar_equipos_vencidos(equipos, hoy=hoy, simular=options["simular"])
+
+        nombres = dict(Tournament.objects.filter(pk__in=expirados).values_list("pk", "name"))
+        for torneo_id, total in expirados.items():
+            self.stdout.write(f"  {nombres.get(torneo_id, torneo_id)}: {total}")
+
+        accion = "expirarían" if options["simular"] else "expirados"
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Equipos {accion} (límite antes del {hoy:%d/%m/%Y}): {sum(expirados.values())}."
+            )
+        )
@@ -0,0 +1,67 @@
+# inscripciones/management/commands/exportar_credenciales.py
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from inscripciones.exportacion import exportar_credenciales_torneo
+from inscripciones.models import Tournament
+
+
+class Command(BaseCommand):
+    help = "Genera las credenciales de todos los equipos APROBADOS de un torneo"
+
+    def add_arguments(self, parser):
+        parser.add_argument("torneo", type=int, help="ID del torneo.")
+        parser.add_argument(
+            "--salida",
+            default=None,
+            help="Carpeta destino (default: credenciales_torneo_<id>/).",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count() or 2,
+            help="Procesos para generar PDFs en paralelo (1 = sin pool).",
+        )
+        parser.add_argument(
+            "--sin-combinado",
+            action="store_true",
+            help="No generar el PDF único para imprenta.",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            torneo = Tournament.objects.get(pk=options["torneo"])
+        except Tournament.DoesNotExist:
+            raise CommandError(f"No existe el torneo con id {options['torneo']}.")
+
+        salida = options["salida"] or f"credenciales_torneo_{torneo.pk}"
+
+        self.stdout.write(
+            f"Exportando credenciales de '{torneo}' con {options['workers']} procesos..."
+        )
+        resultado = exportar_credenciales_torneo(
+            torneo,
+            salida,
+            workers=options["workers"],
+            combinado=not options["sin_combinado"],
+        )
+
+        for equipo in resultado["equipos"]:
+            self.stdout.write(
+                f"  {equipo['folio']:<16} {equipo['jugadores']:>3} jugadores "
+                f"{equipo['segundos'] * 1000:>8.1f} ms {equipo['bytes'] / 1024:>8.1f} KB"
+            )
+
+        for folio in resultado["sin_jugadores"]:
+            self.stdout.write(self.style.WARNING(f"  {folio}: sin jugadores, se omite."))
+
+        if resultado["combinado"]:
+            self.stdout.write(f"PDF combinado: {resultado['combinado']}")
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{len(resultado['equipos'])} equipos exportados en "
+                f"{resultado['segundos']:.2f} s."
+            )
+        )
@@ -0,0 +1,48 @@
+# inscripciones/management/commands/exportar_inscripciones.py
+from django.core.management.base import BaseCommand, CommandError
+
+from inscripciones.models import Tournament
+from inscripciones.reportes import csv_inscripciones, xlsx_inscripciones
+
+
+class Command(BaseCommand):
+    help = "Exporta equipos, contactos y jugadores de uno o varios torneos a CSV o XLSX"
+
+    def add_arguments(self, parser):
+        parser.add_argument("torneos", type=int, nargs="+", help="IDs de los torneos.")
+        parser.add_argument(
+            "--formato",
+            choices=["csv", "xlsx"],
+            default="csv",
+        )
+        parser.add_argument(
+            "--salida",
+            default=None,
+            help="Archivo destino (default: inscripciones.<formato>; '-' = salida estándar, solo CSV).",
+        )
+
+    def handle(self, *args, **options):
+        encontrados = set(
+            Tournament.objects.filter(pk__in=options["torneos"]).values_list("pk", flat=True)
+        )
+        faltan = sorted(set(options["torneos"]) - encontrados)
+        if faltan:
+            raise CommandError(f"No existen los torneos: {', '.join(map(str, faltan))}.")
+
+        formato = options["formato"]
+        salida = options["salida"] or f"inscripciones.{formato}"
+
+        if formato == "xlsx":
+            if salida == "-":
+                raise CommandError("El XLSX necesita un archivo de salida.")
+            xlsx_inscripciones(options["torneos"], salida)
+        elif salida == "-":
+            for pedazo in csv_inscripciones(options["torneos"]):
+                self.stdout.write(pedazo, ending="")
+            return
+        else:
+            with open(salida, "w", encoding="utf-8", newline="") as archivo:
+                for pedazo in csv_inscripciones(options["torneos"]):
+                    archivo.write(pedazo)
+
+        self.stdout.write(self.style.SUCCESS(f"Inscripciones exportadas en {salida}."))
@@ -0,0 +1,90 @@
+# inscripciones/management/commands/generar_fotos_credencial.py
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from PIL import Image
+
+from inscripciones.imagenes import generar_foto_credencial, nombre_foto_credencial
+from inscripciones.models import Player
+
+
+def _procesar(ruta):
+    """Corre en un hilo del pool: solo trabajo de imagen, nada de BD."""
+    try:
+        return generar_foto_credencial(ruta), None
+    except (OSError, ValueError, Image.DecompressionBombError) as exc:
+        return None, exc
+
+
+class Command(BaseCommand):
+    help = "Genera la foto a tamaño credencial de los jugadores que aún no la tienen"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count() or 2,
+            help="Hilos para procesar imágenes en paralelo (default: núm. de CPUs).",
+        )
+        parser.add_argument(
+            "--todas",
+            action="store_true",
+            help="Regenera también las que ya existen (p. ej. si cambió el tamaño).",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=200,
+            help="Jugadores por bloque de actualización en la BD.",
+        )
+
+    def handle(self, *args, **options):
+        jugadores = Player.objects.exclude(photo="").exclude(photo__isnull=True)
+        if not options["todas"]:
+            jugadores = jugadores.filter(
+                Q(photo_credencial__isnull=True) | Q(photo_credencial="")
+            )
+        jugadores = list(jugadores.only("id", "photo", "photo_credencial"))
+
+        if not jugadores:
+            self.stdout.write(self.style.SUCCESS("No hay fotos pendientes. Nada que hacer."))
+            return
+
+        self.stdout.write(
+            f"Procesando {len(jugadores)} fotos con {options['workers']} hilos..."
+        )
+
+        pendientes = []
+        generadas = 0
+        errores = 0
+
+        # PIL suelta el GIL al decodificar/redimensionar, así que los hilos sí escalan
+        with ThreadPoolExecutor(max_workers=options["workers"]) as pool:
+            resultados = pool.map(_procesar, [j.photo.path for j in jugadores])
+
+            for jugador, (contenido, exc) in zip(jugadores, resultados):
+                if exc is not None:
+                    errores += 1
+                    self.stderr.write(f"  {jugador.photo.name}: {exc}")
+                    continue
+
+                jugador.photo_credencial.save(
+                    nombre_foto_credencial(jugador.photo.name),
+                    contenido,
+                    save=False,
+                )
+                pendientes.append(jugador)
+                generadas += 1
+
+                if len(pendientes) >= options["batch_size"]:
+                    Player.objects.bulk_update(pendientes, ["photo_credencial"])
+                    pendientes = []
+
+        if pendientes:
+            Player.objects.bulk_update(pendientes, ["photo_credencial"])
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Fotos generadas: {generadas}. Con error: {errores}.")
+        )
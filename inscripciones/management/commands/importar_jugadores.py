@@ -0,0 +1,76 @@
+# inscripciones/management/commands/importar_jugadores.py
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError
+
+from inscripciones.importacion import ErrorImportacion, importar_jugadores
+from inscripciones.models import Team, Tournament
+
+
+class Command(BaseCommand):
+    help = (
+        "Importa jugadores desde un CSV/XLSX. Con --torneo el archivo trae una "
+        "columna Folio y puede tener los rosters de todos los equipos."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("archivo", help="Ruta del .csv o .xlsx.")
+        grupo = parser.add_mutually_exclusive_group(required=True)
+        grupo.add_argument("--equipo", help="Folio del equipo (todas las filas son de él).")
+        grupo.add_argument("--torneo", type=int, help="ID del torneo (columna Folio por fila).")
+        parser.add_argument(
+            "--validar",
+            action="store_true",
+            help="Solo valida el archivo, no guarda nada.",
+        )
+
+    def handle(self, *args, **options):
+        team = torneo = None
+        if options["equipo"]:
+            try:
+                team = Team.objects.get(folio=options["equipo"].strip().upper())
+            except Team.DoesNotExist:
+                raise CommandError(f"No existe el equipo con folio {options['equipo']}.")
+            if team.status != "APROBADO":
+                raise CommandError(f"El equipo {team.folio} no está APROBADO.")
+        else:
+            try:
+                torneo = Tournament.objects.get(pk=options["torneo"])
+            except Tournament.DoesNotExist:
+                raise CommandError(f"No existe el torneo con id {options['torneo']}.")
+
+        try:
+            with open(options["archivo"], "rb") as archivo:
+                resultado = importar_jugadores(
+                    archivo,
+                    options["archivo"],
+                    team=team,
+                    torneo=torneo,
+                    guardar=not options["validar"],
+                )
+        except OSError as exc:
+            raise CommandError(f"No se pudo leer el archivo: {exc}")
+        except ErrorImportacion as exc:
+            raise CommandError(str(exc))
+        except IntegrityError as exc:
+            raise CommandError(f"No se guardó nada, la BD rechazó el roster: {exc}")
+
+        for folio, cuenta in resultado["equipos"].items():
+            self.stdout.write(
+                f"  {folio:<16} {cuenta['creados']:>3} nuevos "
+                f"{cuenta['actualizados']:>3} actualizados {cuenta['sin_cambios']:>3} sin cambios"
+            )
+
+        for folio, fila, mensaje in resultado["errores"]:
+            donde = " ".join(x for x in (folio, f"fila {fila}" if fila else None) if x)
+            self.stdout.write(self.style.ERROR(f"  {donde}: {mensaje}" if donde else f"  {mensaje}"))
+
+        equipos_con_error = {folio for folio, _fila, _mensaje in resultado["errores"]}
+        accion = "validados" if options["validar"] else "importados"
+        self.stdout.write(
+            self.style.SUCCESS(f"{len(resultado['equipos'])} equipos {accion}.")
+            if not equipos_con_error else
+            self.style.WARNING(
+                f"{len(resultado['equipos'])} equipos {accion}, "
+                f"{len(equipos_con_error)} con errores (no se guardaron)."
+            )
+        )
@@ -0,0 +1,61 @@
+# inscripciones/management/commands/procesar_credenciales.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from inscripciones.trabajos import (
+    procesar,
+    purgar_terminados,
+    reclamar_siguiente,
+    recuperar_abandonados,
+)
+
+
+class Command(BaseCommand):
+    help = "Worker local que genera en segundo plano los PDFs de credenciales encolados"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--intervalo",
+            type=float,
+            default=1.0,
+            help="Segundos de espera cuando la cola está vacía.",
+        )
+        parser.add_argument(
+            "--una-vez",
+            action="store_true",
+            help="Procesa lo pendiente y termina (útil para cron).",
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write("Worker de credenciales iniciado.")
+        ultimo_mantenimiento = 0
+
+        while True:
+            # Cada minuto: recuperar trabajos huérfanos y limpiar los viejos
+            if time.monotonic() - ultimo_mantenimiento > 60:
+                recuperados = recuperar_abandonados()
+                if recuperados:
+                    self.stdout.write(
+                        self.style.WARNING(f"{recuperados} trabajos abandonados regresan a la cola.")
+                    )
+                purgar_terminados()
+                ultimo_mantenimiento = time.monotonic()
+
+            job = reclamar_siguiente()
+            if job is None:
+                if options["una_vez"]:
+                    break
+                time.sleep(options["intervalo"])
+                continue
+
+            inicio = time.perf_counter()
+            procesar(job)
+            duracion = (time.perf_counter() - inicio) * 1000
+
+            if job.status == 'LISTO':
+                self.stdout.write(f"  {job.team.folio}: listo en {duracion:.0f} ms")
+            else:
+                self.stderr.write(f"  {job.team.folio}: error (intento {job.attempts})")
+
+        self.stdout.write(self.style.SUCCESS("Cola vacía. Worker terminado."))
@@ -0,0 +1,84 @@
+# inscripciones/management/commands/reubicar_media.py
+from django.core.management.base import BaseCommand
+
+from inscripciones.almacenamiento import (
+    borrar_si_huerfano,
+    campos_de_archivo,
+    es_nombre_por_contenido,
+)
+from inscripciones.models import Player
+from inscripciones.utils import invalidar_caches_roster
+
+
+class Command(BaseCommand):
+    help = (
+        "Mueve la media existente al almacenamiento por contenido "
+        "(<carpeta>/ab/cd/<hash>.<ext>); los archivos repetidos quedan una sola vez"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--conservar",
+            action="store_true",
+            help="No borra los archivos con el nombre anterior.",
+        )
+
+    def handle(self, *args, **options):
+        movidos = errores = 0
+        anteriores = set()
+        nuevos = set()
+        jugadores = set()
+
+        for modelo, campo in campos_de_archivo():
+            registros = (
+                modelo.objects
+                .exclude(**{campo: ""})
+                .exclude(**{f"{campo}__isnull": True})
+                .only("pk", campo)
+            )
+            pendientes = [
+                r for r in registros.iterator()
+                if not es_nombre_por_contenido(getattr(r, campo).name)
+            ]
+            if not pendientes:
+                continue
+
+            self.stdout.write(f"{modelo.__name__}.{campo}: {len(pendientes)} archivos...")
+
+            for registro in pendientes:
+                archivo = getattr(registro, campo)
+                anterior = archivo.name
+                try:
+                    with archivo.open("rb"):
+                        nuevo = archivo.storage.save(anterior, archivo)
+                except OSError as exc:
+                    errores += 1
+                    self.stderr.write(f"  {anterior}: {exc}")
+                    continue
+
+                # update() directo: no queremos disparar save() ni señales
+                modelo.objects.filter(pk=registro.pk).update(**{campo: nuevo})
+                anteriores.add(anterior)
+                nuevos.add(nuevo)
+                movidos += 1
+                if modelo is Player:
+                    jugadores.add(registro.pk)
+
+        if jugadores:
+            # Sin señales: el roster público guardado apunta a las fotos anteriores
+            invalidar_caches_roster(
+                Player.objects.filter(pk__in=jugadores).values_list("team_id", flat=True).distinct()
+            )
+
+        borrados = 0
+        if not options["conservar"]:
+            # Al final: un archivo viejo puede estar en varios registros/campos
+            for nombre in anteriores:
+                borrados += borrar_si_huerfano(nombre)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Archivos reubicados: {movidos} ({len(nuevos)} únicos). "
+                f"Borrados: {borrados}. Con error: {errores}."
+            )
+        )
@@ -0,0 +1,41 @@
+# inscripciones/management/commands/revisar_indices.py
+from django.core.management.base import BaseCommand, CommandError
+
+from inscripciones.indices import revisar_consultas
+
+
+class Command(BaseCommand):
+    help = (
+        "Revisa con EXPLAIN que las consultas frecuentes (vistas, admin, cola "
+        "de PDFs) usen índices. Termina con error si alguna recorre una tabla completa."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--planes",
+            action="store_true",
+            help="Muestra el plan completo de cada consulta.",
+        )
+
+    def handle(self, *args, **options):
+        fallas = []
+        revisadas = 0
+        for descripcion, plan, tablas in revisar_consultas():
+            revisadas += 1
+            if tablas:
+                fallas.append(descripcion)
+                self.stdout.write(
+                    self.style.ERROR(f"  SIN ÍNDICE  {descripcion}: recorre {', '.join(tablas)}")
+                )
+            else:
+                self.stdout.write(f"  ok          {descripcion}")
+            if options["planes"] or tablas:
+                for linea in plan.splitlines():
+                    self.stdout.write(f"                {linea}")
+
+        if fallas:
+            raise CommandError(f"{len(fallas)} consultas sin índice.")
+        if not revisadas:
+            self.stdout.write(self.style.WARNING("No se revisó ninguna consulta (BD no soportada)."))
+            return
+        self.stdout.write(self.style.SUCCESS("Todas las consultas usan índices."))
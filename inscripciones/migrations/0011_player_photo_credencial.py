@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-17 20:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inscripciones', '0010_player_curp'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='player',
+            name='photo_credencial',
+            field=models.ImageField(blank=True, editable=False, null=True, upload_to='jugadores_fotos/credencial/', verbose_name='Foto para credencial'),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.8 on 2026-10-17 20:44
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def inicializar_consecutivos(apps, schema_editor):
+    """
+    Arranca cada secuencia en el mayor consecutivo ya usado en el torneo
+    (los folios viejos salían del id global o de un count(), así que el
+    máximo es lo único seguro para no repetir).
+    """
+    Tournament = apps.get_model('inscripciones', 'Tournament')
+    Team = apps.get_model('inscripciones', 'Team')
+    FolioSequence = apps.get_model('inscripciones', 'FolioSequence')
+
+    secuencias = []
+    for tournament_id in Tournament.objects.values_list('id', flat=True):
+        ultimo = 0
+        folios = Team.objects.filter(tournament_id=tournament_id).values_list('folio', flat=True)
+        for folio in folios:
+            sufijo = (folio or '').rsplit('-', 1)[-1]
+            if sufijo.isdigit():
+                ultimo = max(ultimo, int(sufijo))
+        secuencias.append(FolioSequence(tournament_id=tournament_id, last_value=ultimo))
+
+    FolioSequence.objects.bulk_create(secuencias)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inscripciones', '0012_pdfjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FolioSequence',
+            fields=[
+                ('tournament', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='folio_sequence', serialize=False, to='inscripciones.tournament')),
+                ('last_value', models.PositiveIntegerField(default=0, verbose_name='Último consecutivo')),
+            ],
+        ),
+        migrations.RunPython(inicializar_consecutivos, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.8 on 2026-10-17 20:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inscripciones', '0013_folio_sequence'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='paymentproof',
+            index=models.Index(fields=['team', '-uploaded_at'], name='comprobante_equipo_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='team',
+            index=models.Index(fields=['tournament', 'status'], name='team_torneo_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='team',
+            index=models.Index(fields=['status', 'payment_deadline'], name='team_status_limite_idx'),
+        ),
+    ]
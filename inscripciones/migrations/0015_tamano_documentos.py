@@ -0,0 +1,59 @@
+# Generated by Django 5.2.8 on 2026-10-17 20:55
+
+import inscripciones.subidas
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inscripciones', '0014_indices_consultas'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='paymentproof',
+            name='original_size',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='paymentproof',
+            name='stored_size',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='team',
+            name='alternate_delegate_ine_original_size',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='team',
+            name='alternate_delegate_ine_stored_size',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='team',
+            name='delegate_ine_original_size',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='team',
+            name='delegate_ine_stored_size',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AlterField(
+            model_name='paymentproof',
+            name='file',
+            field=models.FileField(upload_to='comprobantes/', validators=[inscripciones.subidas.validar_tamano_subida]),
+        ),
+        migrations.AlterField(
+            model_name='team',
+            name='alternate_delegate_ine',
+            field=models.FileField(blank=True, null=True, upload_to='ines/', validators=[inscripciones.subidas.validar_tamano_subida], verbose_name='INE del suplente'),
+        ),
+        migrations.AlterField(
+            model_name='team',
+            name='delegate_ine',
+            field=models.FileField(blank=True, null=True, upload_to='ines/', validators=[inscripciones.subidas.validar_tamano_subida], verbose_name='INE del delegado'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.8 on 2026-10-17 21:25
+
+import inscripciones.subidas
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inscripciones', '0015_tamano_documentos'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='player',
+            name='photo',
+            field=models.ImageField(blank=True, null=True, upload_to='jugadores_fotos/', validators=[inscripciones.subidas.validar_tamano_subida], verbose_name='Foto del jugador (opcional)'),
+        ),
+    ]
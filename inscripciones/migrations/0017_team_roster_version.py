@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-17 21:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inscripciones', '0016_tamano_foto_jugador'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='team',
+            name='roster_version',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
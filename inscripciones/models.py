@@ -1,7 +1,17 @@
 from datetime import timedelta
-from django.db import models
+from django.db import connections, models, router, transaction
+from django.db.models import F
 from django.utils import timezone
 from django.core.validators import MinValueValidator, MaxValueValidator
+from PIL import Image
+
+from .imagenes import (
+    comprimir_documento,
+    generar_foto_credencial,
+    nombre_documento,
+    nombre_foto_credencial,
+)
+from .subidas import validar_tamano_subida
 
 
 class Tournament(models.Model):
@@ -19,6 +29,91 @@ class Tournament(models.Model):
         return self.name if not self.season else f"{self.name} - {self.season}"
 
 
+class FolioSequence(models.Model):
+    """
+    Consecutivo de folios por torneo.
+
+    `siguiente()` incrementa y devuelve el número en una sola sentencia
+    (INSERT ... ON CONFLICT DO UPDATE ... RETURNING), que la BD ejecuta de
+    forma atómica: dos inscripciones simultáneas nunca reciben el mismo
+    número. Como una secuencia de BD, si el INSERT del equipo falla después,
+    ese número se pierde (puede haber huecos, nunca duplicados).
+    """
+    tournament = models.OneToOneField(
+        Tournament,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='folio_sequence',
+    )
+    last_value = models.PositiveIntegerField('Último consecutivo', default=0)
+
+    def __str__(self):
+        return f"Folios {self.tournament_id}: {self.last_value}"
+
+    @classmethod
+    def siguiente(cls, tournament_id):
+        """Reserva y devuelve el siguiente consecutivo del torneo."""
+        connection = connections[router.db_for_write(cls)]
+
+        if connection.vendor in ('postgresql', 'sqlite') and (
+            connection.features.can_return_columns_from_insert
+        ):
+            tabla = connection.ops.quote_name(cls._meta.db_table)
+            sql = (
+                f"INSERT INTO {tabla} (tournament_id, last_value) VALUES (%s, 1) "
+                f"ON CONFLICT (tournament_id) DO UPDATE "
+                f"SET last_value = {tabla}.last_value + 1 "
+                f"RETURNING last_value"
+            )
+            with connection.cursor() as cursor:
+                cursor.execute(sql, [tournament_id])
+                return cursor.fetchone()[0]
+
+        # Otras BDs: bloqueo de fila dentro de una transacción
+        with transaction.atomic(using=connection.alias):
+            seq, _ = cls.objects.select_for_update().get_or_create(
+                tournament_id=tournament_id
+            )
+            seq.last_value = F('last_value') + 1
+            seq.save(update_fields=['last_value'])
+            seq.refresh_from_db(fields=['last_value'])
+            return seq.last_value
+
+
+def guardar_documento(archivo):
+    """
+    Escribe en el storage una subida nueva (INE, comprobante) ya normalizada:
+    las imágenes se recomprimen (ver comprimir_documento) y los PDF quedan
+    intactos. Regresa (tamaño original, tamaño guardado) en bytes, o None si
+    `archivo` no es una subida nueva.
+    """
+    if not archivo or archivo._committed:
+        return None
+
+    original = archivo.size
+    try:
+        contenido = comprimir_documento(archivo)
+    except (OSError, ValueError, Image.DecompressionBombError):
+        # Imagen dañada o enorme: se guarda como llegó
+        contenido = None
+    finally:
+        archivo.seek(0)
+
+    if contenido is None:
+        archivo.save(archivo.name, archivo.file, save=False)
+    else:
+        archivo.save(nombre_documento(archivo.name), contenido, save=False)
+    return original, archivo.size
+
+
+def normalizar_folio(folio):
+    """
+    Los folios se guardan en mayúsculas: buscar con el folio normalizado
+    usa el índice único en lugar de un UPPER()/LIKE que recorre la tabla.
+    """
+    return (folio or '').strip().upper()
+
+
 class Team(models.Model):
     CATEGORY_CHOICES = [
         ('EMP', 'Empresarial'),
@@ -65,38 +160,74 @@ class Team(models.Model):
         upload_to='ines/',
         null=True,
         blank=True,
+        validators=[validar_tamano_subida],
     )
     alternate_delegate_ine = models.FileField(
         'INE del suplente',
         upload_to='ines/',
         null=True,
         blank=True,
+        validators=[validar_tamano_subida],
     )
+    # Tamaños en bytes: como se subió y como quedó guardado (ver guardar_documento)
+    delegate_ine_original_size = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    delegate_ine_stored_size = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    alternate_delegate_ine_original_size = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    alternate_delegate_ine_stored_size = models.PositiveIntegerField(null=True, blank=True, editable=False)
 
     created_at = models.DateTimeField(auto_now_add=True)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='PRE_REGISTRADO')
     folio = models.CharField(max_length=30, unique=True, blank=True)
     payment_deadline = models.DateField(null=True, blank=True)
+    # Sube con cada cambio de jugadores (ver utils.invalidar_cache_roster):
+    # es parte de la clave del roster público en el cache
+    roster_version = models.PositiveIntegerField(default=0, editable=False)
 
     class Meta:
         ordering = ['tournament', 'name']
+        indexes = [
+            # Equipos de un torneo por estado (exportación, importación, admin)
+            models.Index(fields=['tournament', 'status'], name='team_torneo_status_idx'),
+            # Filtro por estado del admin y vencimiento de fechas límite de pago
+            models.Index(fields=['status', 'payment_deadline'], name='team_status_limite_idx'),
+        ]
 
     def __str__(self):
         return f"{self.name} ({self.tournament})"
 
+    def preparar_alta(self):
+        """
+        Llena fecha límite de pago y folio de un equipo nuevo, antes del INSERT.
+        No sobrescribe valores que ya traiga.
+        """
+        # Fecha límite de pago automática (7 días naturales, fecha de CDMX)
+        if self.payment_deadline is None:
+            self.payment_deadline = timezone.localdate() + timedelta(days=7)
+
+        # Folio LIFE-<torneo>-<consecutivo> con el consecutivo propio del torneo
+        if not self.folio:
+            consecutivo = FolioSequence.siguiente(self.tournament_id)
+            self.folio = f"LIFE-{self.tournament_id:02d}-{consecutivo:04d}"
+
     def save(self, *args, **kwargs):
-        creating = self.pk is None
+        if self.pk is None:
+            self.preparar_alta()
+        self.folio = normalizar_folio(self.folio)
 
-        # Fecha límite de pago automática (7 días)
-        if creating and self.payment_deadline is None:
-            self.payment_deadline = timezone.now().date() + timedelta(days=7)
+        # INE nuevas: se recomprimen antes de escribirlas al storage
+        campos = []
+        for campo in ('delegate_ine', 'alternate_delegate_ine'):
+            tamanos = guardar_documento(getattr(self, campo))
+            if tamanos:
+                setattr(self, f'{campo}_original_size', tamanos[0])
+                setattr(self, f'{campo}_stored_size', tamanos[1])
+                campos += [f'{campo}_original_size', f'{campo}_stored_size']
 
-        super().save(*args, **kwargs)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and campos:
+            kwargs['update_fields'] = {*update_fields, *campos}
 
-        # Generación de folio LIFE-<torneo>-<consecutivo>
-        if creating and not self.folio:
-            self.folio = f"LIFE-{self.tournament.id:02d}-{self.id:04d}"
-            super().save(update_fields=['folio'])
+        super().save(*args, **kwargs)
 
 class Player(models.Model):
     team = models.ForeignKey(Team, on_delete=models.CASCADE, related_name='players')
@@ -144,6 +275,15 @@ class Player(models.Model):
         upload_to='jugadores_fotos/',
         null=True,
         blank=True,
+        validators=[validar_tamano_subida],
+    )
+    # Derivada de la foto a resolución de credencial (se genera sola al guardar)
+    photo_credencial = models.ImageField(
+        'Foto para credencial',
+        upload_to='jugadores_fotos/credencial/',
+        null=True,
+        blank=True,
+        editable=False,
     )
 
     created_at = models.DateTimeField(auto_now_add=True)
@@ -159,6 +299,65 @@ class Player(models.Model):
         ref = " (REF)" if self.is_reinforcement else ""
         return f"{self.jersey_number} - {self.last_name} {self.first_name}{ref}"
 
+    def save(self, *args, **kwargs):
+        # Foto nueva (aún no escrita en storage) -> generamos su derivada
+        # antes del INSERT/UPDATE para guardar ambas en una sola escritura.
+        if self.photo and not self.photo._committed:
+            self.actualizar_foto_credencial()
+        elif not self.photo and self.photo_credencial:
+            self.photo_credencial = None
+
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'photo' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'photo_credencial'}
+
+        super().save(*args, **kwargs)
+
+    def preparar_fotos(self):
+        """
+        Hace con las fotos lo que haría save(): genera la derivada si hay foto
+        nueva y escribe la foto en el storage. Lo usan los guardados masivos
+        (bulk_create/bulk_update no pasan por save() y bulk_update tampoco
+        escribe archivos). Regresa True si cambió alguna de las dos fotos.
+        """
+        if self.photo and not self.photo._committed:
+            self.actualizar_foto_credencial()
+            self.photo.save(self.photo.name, self.photo.file, save=False)
+            return True
+        if not self.photo and self.photo_credencial:
+            self.photo_credencial = None
+            return True
+        return False
+
+    def actualizar_foto_credencial(self):
+        """Regenera `photo_credencial` a partir de `photo` (sin guardar el modelo)."""
+        if not self.photo:
+            self.photo_credencial = None
+            return
+
+        try:
+            self.photo.open('rb')
+            contenido = generar_foto_credencial(self.photo)
+        except (OSError, ValueError, Image.DecompressionBombError):
+            # Imagen ilegible o enorme: la credencial usará la original
+            contenido = None
+        finally:
+            if self.photo._committed:
+                self.photo.close()
+            else:
+                # el archivo subido todavía lo tiene que escribir el storage
+                self.photo.seek(0)
+
+        if contenido is None:
+            self.photo_credencial = None
+            return
+
+        self.photo_credencial.save(
+            nombre_foto_credencial(self.photo.name),
+            contenido,
+            save=False,
+        )
+
 
 class PaymentProof(models.Model):
     # 👇 ahora es ForeignKey, no OneToOne
@@ -167,11 +366,65 @@ class PaymentProof(models.Model):
         on_delete=models.CASCADE,
         related_name='payment_proofs',
     )
-    file = models.FileField(upload_to='comprobantes/')
+    file = models.FileField(upload_to='comprobantes/', validators=[validar_tamano_subida])
     uploaded_at = models.DateTimeField(auto_now_add=True)
+    # Tamaños en bytes: como se subió y como quedó guardado (ver guardar_documento)
+    original_size = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    stored_size = models.PositiveIntegerField(null=True, blank=True, editable=False)
 
     class Meta:
         ordering = ['-uploaded_at']
+        indexes = [
+            # Último comprobante de cada equipo (admin de equipos)
+            models.Index(fields=['team', '-uploaded_at'], name='comprobante_equipo_fecha_idx'),
+        ]
 
     def __str__(self):
         return f"Comprobante {self.team.folio}"
+
+    def save(self, *args, **kwargs):
+        tamanos = guardar_documento(self.file)
+        if tamanos:
+            self.original_size, self.stored_size = tamanos
+        super().save(*args, **kwargs)
+
+
+class PdfJob(models.Model):
+    """
+    Trabajo en cola para generar el PDF de credenciales fuera de la petición web.
+    Lo procesa el comando `procesar_credenciales` (no hay broker externo).
+    """
+    STATUS_CHOICES = [
+        ('PENDIENTE', 'Pendiente'),
+        ('EN_PROCESO', 'En proceso'),
+        ('LISTO', 'Listo'),
+        ('ERROR', 'Error'),
+    ]
+
+    team = models.ForeignKey(Team, on_delete=models.CASCADE, related_name='pdf_jobs')
+    # Huella del contenido (ver utils.huella_credenciales): un trabajo por versión del roster
+    fingerprint = models.CharField(max_length=64)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='PENDIENTE')
+    attempts = models.PositiveIntegerField('Intentos', default=0)
+    error = models.TextField(blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Última vez que entró a la cola (al crearse o al reencolarse)
+    queued_at = models.DateTimeField(default=timezone.now)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['created_at']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['team', 'fingerprint'],
+                name='pdfjob_unico_por_huella',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='pdfjob_cola_idx'),
+        ]
+
+    def __str__(self):
+        return f"Credenciales {self.team.folio} ({self.get_status_display()})"
@@ -0,0 +1,112 @@
+# inscripciones/reportes.py
+"""
+Reporte de inscripciones: equipos, datos de contacto y jugadores por torneo.
+
+Una sola consulta (equipos LEFT JOIN jugadores) recorrida con
+iterator(chunk_size=...): la memoria no crece con el número de filas y la
+descarga empieza en cuanto sale la primera. Los equipos sin jugadores
+aparecen en una fila con las columnas de jugador vacías.
+
+Las columnas de jugador usan los mismos encabezados que la importación
+(Folio, Número, Nombre, Apellido, NSS...), así que el archivo se puede
+corregir y volver a importar.
+"""
+import csv
+
+from .models import Team
+
+
+TAMANO_BLOQUE = 2000
+
+ESTADOS = dict(Team.STATUS_CHOICES)
+CATEGORIAS = dict(Team.CATEGORY_CHOICES)
+
+# (encabezado, campo de values(), formato)
+COLUMNAS = [
+    ("Torneo", "tournament__name", None),
+    ("Folio", "folio", None),
+    ("Equipo", "name", None),
+    ("Categoría", "category", CATEGORIAS.get),
+    ("Estado", "status", ESTADOS.get),
+    ("Empresa / Patrocinador", "company_name", None),
+    ("Número patronal IMSS", "employer_number_imss", None),
+    ("Delegado", "delegate_name", None),
+    ("Teléfono del delegado", "delegate_phone", None),
+    ("Teléfono de oficina del delegado", "delegate_office_phone", None),
+    ("Correo del delegado", "delegate_email", None),
+    ("Suplente", "alternate_delegate_name", None),
+    ("Teléfono del suplente", "alternate_delegate_phone", None),
+    ("Teléfono de oficina del suplente", "alternate_delegate_office_phone", None),
+    ("Días preferentes", "preferred_days", None),
+    ("Fecha límite de pago", "payment_deadline", None),
+    ("Número", "players__jersey_number", None),
+    ("Nombre", "players__first_name", None),
+    ("Apellido", "players__last_name", None),
+    ("NSS", "players__imss_number", None),
+    ("CURP", "players__curp", None),
+    ("Edad (años)", "players__age_years", None),
+    ("Edad (meses)", "players__age_months", None),
+    ("Refuerzo", "players__is_reinforcement", lambda v: None if v is None else ("Sí" if v else "No")),
+]
+
+
+def _celda(valor):
+    """Texto seguro para Excel: una celda que empieza con = o @ no se evalúa."""
+    if valor is None:
+        return ""
+    if isinstance(valor, str) and valor[:1] in ("=", "@", "\t", "\r"):
+        return "'" + valor
+    if isinstance(valor, str) and valor[:1] in ("+", "-") and not valor[1:2].isdigit():
+        return "'" + valor
+    return valor
+
+
+def filas_inscripciones(torneos):
+    """
+    Genera el encabezado y luego una fila (lista) por jugador, en orden de
+    torneo, equipo y número. `torneos` = IDs o queryset de torneos.
+    """
+    yield [encabezado for encabezado, _campo, _formato in COLUMNAS]
+
+    consulta = (
+        Team.objects
+        .filter(tournament__in=torneos)
+        .order_by("tournament__name", "tournament_id", "name", "pk", "players__jersey_number")
+        .values_list(*[campo for _encabezado, campo, _formato in COLUMNAS])
+        .iterator(chunk_size=TAMANO_BLOQUE)
+    )
+    formatos = [formato for _encabezado, _campo, formato in COLUMNAS]
+    for fila in consulta:
+        yield [
+            _celda(formato(valor) if formato and valor is not None else valor)
+            for formato, valor in zip(formatos, fila)
+        ]
+
+
+class _Eco:
+    """'Archivo' que solo devuelve lo escrito: csv.writer sin buffer."""
+
+    def write(self, valor):
+        return valor
+
+
+def csv_inscripciones(torneos):
+    """Genera el CSV en pedazos de texto (con BOM para que Excel lea UTF-8)."""
+    escritor = csv.writer(_Eco())
+    yield "\ufeff"
+    for fila in filas_inscripciones(torneos):
+        yield escritor.writerow(fila)
+
+
+def xlsx_inscripciones(torneos, salida):
+    """
+    Escribe el XLSX en `salida` (ruta o archivo abierto) con openpyxl en modo
+    write_only: las filas se van a disco, no se guardan en memoria.
+    """
+    from openpyxl import Workbook
+
+    libro = Workbook(write_only=True)
+    hoja = libro.create_sheet("Inscripciones")
+    for fila in filas_inscripciones(torneos):
+        hoja.append(fila)
+    libro.save(salida)
@@ -0,0 +1,150 @@
+# inscripciones/servicios.py
+"""
+Operaciones de negocio que usan las vistas (y el admin/comandos cuando aplica).
+"""
+from django.db import transaction
+from django.utils import timezone
+
+from liga_life.metricas import TRANSICIONES_ESTADO
+
+from .almacenamiento import borrar_si_huerfano
+from .models import Player, Team
+from .utils import invalidar_cache_credenciales, invalidar_cache_roster
+
+
+def crear_equipo(form):
+    """
+    Da de alta el equipo de un TeamForm ya validado con una sola escritura
+    en la tabla de equipos: folio y fecha límite se calculan antes del INSERT
+    (nada de guardar y luego actualizar).
+
+    El consecutivo del folio y el INSERT van en la misma transacción, así que
+    si el INSERT falla el número no se pierde.
+    """
+    team = form.save(commit=False)
+    with transaction.atomic():
+        team.preparar_alta()
+        team.save(force_insert=True)
+        form.save_m2m()
+    TRANSICIONES_ESTADO.inc(desde="", hacia=team.status)
+    return team
+
+
+def registrar_comprobante(form):
+    """
+    Guarda el comprobante de un PaymentProofForm ya validado y pasa el equipo
+    a COMPROBANTE_ENVIADO en la misma transacción: o quedan las dos cosas o
+    ninguna.
+
+    El equipo es el que el formulario ya resolvió por folio (form.team); no
+    se vuelve a consultar.
+    """
+    team = form.team
+    anterior = team.status
+    comprobante = form.save(commit=False)
+    comprobante.team = team
+    with transaction.atomic():
+        comprobante.save(force_insert=True)
+        team.status = 'COMPROBANTE_ENVIADO'
+        team.save(update_fields=['status'])
+    if anterior != team.status:
+        TRANSICIONES_ESTADO.inc(desde=anterior, hacia=team.status)
+    return comprobante
+
+
+def guardar_roster(formset):
+    """
+    Guarda un PlayerFormSet ya validado comparando contra el roster actual:
+    solo escribe lo que cambió, con un bulk_create, un bulk_update y un
+    delete, todo en una transacción (en lugar de un INSERT/UPDATE/DELETE
+    por fila).
+
+    La unicidad de número y nombre ya la validó BasePlayerFormSet en memoria;
+    si otra petición se adelantó, la BD lanza IntegrityError y no se guarda
+    nada: las fotos nuevas (se escriben al storage antes de la transacción)
+    se vuelven a borrar si ningún registro las usa.
+
+    Regresa (creados, actualizados, eliminados).
+    """
+    team = formset.instance
+    nuevos = []
+    cambiados = []
+    campos = set()
+    eliminar = []
+    fotos = []  # nombres que este guardado escribió al storage
+
+    borrados = set(formset.deleted_forms)
+
+    for form in formset.initial_forms:
+        if form in borrados:
+            eliminar.append(form.instance.pk)
+        elif form.has_changed():
+            campos.update(n for n in form.changed_data if n in form._meta.fields)
+            if form.instance.preparar_fotos():
+                campos.update(['photo', 'photo_credencial'])
+                fotos += _nombres_fotos(form.instance)
+            cambiados.append(form.instance)
+
+    for form in formset.extra_forms:
+        if not form.has_changed() or form in borrados:
+            continue
+        form.instance.team = team
+        if form.instance.preparar_fotos():
+            fotos += _nombres_fotos(form.instance)
+        nuevos.append(form.instance)
+
+    try:
+        with transaction.atomic():
+            if eliminar:
+                Player.objects.filter(team=team, pk__in=eliminar).delete()
+            if cambiados and campos:
+                Player.objects.bulk_update(cambiados, sorted(campos))
+            if nuevos:
+                Player.objects.bulk_create(nuevos)
+    except Exception:
+        for nombre in fotos:
+            borrar_si_huerfano(nombre)
+        raise
+
+    if nuevos or cambiados or eliminar:
+        # bulk_* no dispara post_save: invalidamos a mano
+        invalidar_cache_credenciales(team.pk)
+        invalidar_cache_roster(team.pk)
+
+    return len(nuevos), len(cambiados), len(eliminar)
+
+
+def _nombres_fotos(jugador):
+    return [foto.name for foto in (jugador.photo, jugador.photo_credencial) if foto]
+
+
+def expirar_equipos_vencidos(equipos=None, hoy=None, simular=False):
+    """
+    Pasa a EXPIRADO los equipos PRE_REGISTRADOS cuya fecha límite de pago ya
+    pasó (la fecha límite cuenta completa, en hora de Ciudad de México).
+
+    Un UPDATE por torneo sobre el índice (status, payment_deadline); el filtro
+    por status lo hace idempotente y seguro de correr en paralelo (cron): un
+    equipo que ya expiró o que ya mandó comprobante no se vuelve a tocar.
+
+    `equipos` limita a un queryset (p. ej. la selección del admin).
+    Regresa {tournament_id: equipos expirados}.
+    """
+    if hoy is None:
+        hoy = timezone.localdate()  # TIME_ZONE = America/Mexico_City
+    vencidos = Team.objects.filter(status='PRE_REGISTRADO', payment_deadline__lt=hoy)
+    if equipos is not None:
+        vencidos = vencidos.filter(pk__in=equipos.values('pk'))
+    torneos = sorted(set(vencidos.values_list('tournament_id', flat=True)))
+
+    expirados = {}
+    for torneo_id in torneos:
+        del_torneo = vencidos.filter(tournament_id=torneo_id)
+        if simular:
+            expirados[torneo_id] = del_torneo.count()
+        else:
+            expirados[torneo_id] = del_torneo.update(status='EXPIRADO')
+            TRANSICIONES_ESTADO.inc(
+                expirados[torneo_id], desde='PRE_REGISTRADO', hacia='EXPIRADO'
+            )
+    return expirados
@@ -0,0 +1,40 @@
+# inscripciones/signals.py
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Player, Team, Tournament
+from .utils import (
+    invalidar_cache_credenciales,
+    invalidar_cache_roster,
+    invalidar_cache_torneos,
+)
+
+
+# ===========================
+#  CACHE DE CREDENCIALES Y ROSTER PÚBLICO
+# ===========================
+# Credenciales: la huella ya detecta cualquier cambio; aquí solo liberamos
+# el disco en cuanto el PDF guardado deja de servir.
+# Roster público: los datos del equipo y del torneo ya son parte de su clave;
+# los jugadores no, así que cada cambio sube roster_version.
+@receiver(post_save, sender=Team)
+@receiver(post_delete, sender=Team)
+def invalidar_credenciales_equipo(sender, instance, **kwargs):
+    invalidar_cache_credenciales(instance.pk)
+
+
+@receiver(post_save, sender=Player)
+@receiver(post_delete, sender=Player)
+def invalidar_credenciales_jugador(sender, instance, **kwargs):
+    invalidar_cache_credenciales(instance.team_id)
+    invalidar_cache_roster(instance.team_id)
+
+
+# ===========================
+#  CACHE DE TORNEOS ABIERTOS
+# ===========================
+@receiver(post_save, sender=Tournament)
+@receiver(post_delete, sender=Tournament)
+def invalidar_torneos_abiertos(sender, instance, **kwargs):
+    invalidar_cache_torneos()
+
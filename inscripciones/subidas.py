@@ -0,0 +1,58 @@
+# inscripciones/subidas.py
+"""
+Límite de tamaño de los archivos subidos, aplicado mientras se reciben.
+
+LimiteTamanoUploadHandler escribe a disco como el handler de temporales de
+Django pero deja de escribir en cuanto el archivo pasa de SUBIDAS_MAX_BYTES:
+el resto del archivo se descarta sin tocar el disco y el formulario recibe
+un ArchivoExcedido, que validar_tamano_subida rechaza con un mensaje claro.
+"""
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from django.template.defaultfilters import filesizeformat
+
+
+class ArchivoExcedido(SimpleUploadedFile):
+    """Subida que pasó del límite: conserva nombre y tamaño, sin contenido."""
+
+    def __init__(self, name, size, content_type=None):
+        super().__init__(name, b"", content_type)
+        self.size = size
+
+
+class LimiteTamanoUploadHandler(TemporaryFileUploadHandler):
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.excedido = False
+
+    def receive_data_chunk(self, raw_data, start):
+        if self.excedido or start + len(raw_data) > settings.SUBIDAS_MAX_BYTES:
+            self.excedido = True
+            return None
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        if not self.excedido:
+            return super().file_complete(file_size)
+        # El temporal parcial se borra al cerrarlo
+        self.file.close()
+        return ArchivoExcedido(self.file_name, file_size, self.content_type)
+
+
+def validar_tamano_subida(archivo):
+    """Validador de modelo para los campos de archivo con límite de tamaño."""
+    # Solo subidas nuevas: los archivos ya guardados no se vuelven a medir
+    if archivo and not getattr(archivo, "_committed", False) and (
+        archivo.size > settings.SUBIDAS_MAX_BYTES
+    ):
+        raise ValidationError(
+            "El archivo pesa %(tamano)s; el máximo permitido es %(maximo)s. "
+            "Toma la foto con menor resolución o reduce el PDF.",
+            code="archivo_muy_grande",
+            params={
+                "tamano": filesizeformat(archivo.size),
+                "maximo": filesizeformat(settings.SUBIDAS_MAX_BYTES),
+            },
+        )
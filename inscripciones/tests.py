@@ -0,0 +1,1287 @@
+# inscripciones/tests.py
+import csv
+import importlib
+import io
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import zipfile
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from unittest import mock
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.db import IntegrityError, connection
+from django.test.utils import CaptureQueriesContext
+from django.test import (
+    SimpleTestCase,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+from pypdf import PdfReader
+from reportlab import rl_config
+
+from liga_life import metricas
+from liga_life.middleware import PresupuestoConsultasExcedido
+
+from .almacenamiento import borrar_si_huerfano, es_nombre_por_contenido
+from .forms import PaymentProofForm, PlayerFormSet
+from .imagenes import generar_foto_credencial, tamano_foto_credencial
+from .importacion import importar_jugadores
+from .indices import revisar_consultas
+from .models import FolioSequence, PaymentProof, PdfJob, Player, Team, Tournament
+from . import trabajos, utils, views
+from .servicios import expirar_equipos_vencidos, guardar_roster, registrar_comprobante
+from .subidas import ArchivoExcedido, LimiteTamanoUploadHandler, validar_tamano_subida
+
+
+def imagen_png(nombre="foto.png", color=(200, 30, 30)):
+    """Subida PNG pequeña (cada color da un archivo distinto en el storage)."""
+    buffer = io.BytesIO()
+    Image.new("RGB", (32, 32), color).save(buffer, format="PNG")
+    return SimpleUploadedFile(nombre, buffer.getvalue(), content_type="image/png")
+
+
+def datos_equipo(torneo, **extra):
+    datos = {
+        "tournament": torneo.pk,
+        "category": "LIB",
+        "name": "Deportivo Prueba",
+        "company_name": "Empresa",
+        "delegate_name": "Delegado",
+        "delegate_phone": "55 1234 5678",
+        "delegate_email": "delegado@example.com",
+        "preferred_days": ["LUN"],
+    }
+    datos.update(extra)
+    return datos
+
+
+def crear_equipo_prueba(torneo, nombre="Equipo", status="APROBADO", telefono="5512345678"):
+    return Team.objects.create(
+        tournament=torneo,
+        name=nombre,
+        category="LIB",
+        delegate_name="Delegado",
+        delegate_phone=telefono,
+        status=status,
+    )
+
+
+def datos_roster(team, filas, iniciales=0):
+    """POST del PlayerFormSet: `filas` son dicts con los campos de cada jugador."""
+    datos = {
+        "players-TOTAL_FORMS": str(len(filas)),
+        "players-INITIAL_FORMS": str(iniciales),
+        "players-MIN_NUM_FORMS": "0",
+        "players-MAX_NUM_FORMS": "20",
+    }
+    for i, fila in enumerate(filas):
+        for campo, valor in fila.items():
+            datos[f"players-{i}-{campo}"] = valor
+        datos[f"players-{i}-team"] = team.pk
+    return datos
+
+
+def fila_jugador(numero, jugador=None):
+    fila = {
+        "jersey_number": str(numero),
+        "first_name": f"Nombre{numero}",
+        "last_name": f"Apellido{numero}",
+        "imss_number": f"{numero:011d}",
+    }
+    if jugador is not None:
+        fila["id"] = str(jugador.pk)
+    return fila
+
+
+class PruebaConMedia(TestCase):
+    """
+    Media, caches de credenciales y métricas en un directorio temporal, y los
+    caches vacíos en cada prueba (el rollback de TestCase no dispara las
+    señales que los invalidan).
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls._media = tempfile.mkdtemp(prefix="liga_life_pruebas_")
+        cls._ajustes = override_settings(
+            MEDIA_ROOT=cls._media,
+            CREDENCIALES_QR_DISK_CACHE_DIR=f"{cls._media}/cache/qr",
+            CREDENCIALES_FONDOS_CACHE_DIR=f"{cls._media}/cache/fondos",
+            CREDENCIALES_PDF_CACHE_DIR=f"{cls._media}/cache/credenciales",
+            METRICAS_DIR=f"{cls._media}/metricas",
+            # Sin collectstatic: el storage de WhiteNoise no tiene manifiesto
+            STORAGES={
+                **settings.STORAGES,
+                "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+            },
+        )
+        cls._ajustes.enable()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls._ajustes.disable()
+        shutil.rmtree(cls._media, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        # Los fondos ya preparados apuntan al directorio temporal de otra clase
+        utils._qr_cache.clear()
+        with utils._fondos_lock:
+            utils._fondos_cache.clear()
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.torneo = Tournament.objects.create(name="Apertura", season="2026")
+
+
+# ===========================
+#  PRESUPUESTO DE CONSULTAS
+# ===========================
+@override_settings(TIEMPOS_PRESUPUESTO_ESTRICTO=True)
+class PresupuestoConsultasTests(PruebaConMedia):
+    """
+    Las vistas principales dentro de su presupuesto (TIEMPOS_PRESUPUESTOS):
+    en modo estricto el middleware lanza PresupuestoConsultasExcedido.
+    """
+
+    def test_inscripcion(self):
+        self.assertEqual(self.client.get(reverse("inscripcion")).status_code, 200)
+        response = self.client.post(reverse("inscripcion"), datos_equipo(self.torneo))
+        self.assertTemplateUsed(response, "inscripciones/inscripcion_exitosa.html")
+
+    def test_subir_comprobante(self):
+        team = crear_equipo_prueba(self.torneo, status="PRE_REGISTRADO")
+        response = self.client.post(
+            reverse("subir_comprobante"),
+            {"folio": team.folio, "delegate_phone": team.delegate_phone, "file": imagen_png()},
+        )
+        self.assertTemplateUsed(response, "inscripciones/comprobante_enviado.html")
+
+    def test_registrar_jugadores(self):
+        team = crear_equipo_prueba(self.torneo)
+        url = reverse("registrar_jugadores", args=[team.folio])
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+        filas = [fila_jugador(n) for n in range(1, 11)]
+        response = self.client.post(url, datos_roster(team, filas))
+        self.assertTrue(response.context["guardado"])
+        self.assertEqual(team.players.count(), 10)
+
+    def test_roster_equipo(self):
+        team = crear_equipo_prueba(self.torneo)
+        Player.objects.create(team=team, jersey_number=7, first_name="A", last_name="B")
+        url = reverse("roster_equipo", args=[team.folio])
+        self.assertEqual(self.client.get(url).status_code, 200)
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_credenciales_pdf(self):
+        team = crear_equipo_prueba(self.torneo)
+        Player.objects.create(team=team, jersey_number=7, first_name="A", last_name="B")
+        response = self.client.get(reverse("credenciales_pdf", args=[team.folio]))
+        self.assertEqual(response["Content-Type"], "application/pdf")
+        # Consumirlo lo cierra sin cerrar la conexión a la BD (response.close()
+        # dispara request_finished y cerraría la BD de pruebas en archivo)
+        self.assertTrue(b"".join(response.streaming_content).startswith(b"%PDF"))
+
+    def test_importar_jugadores(self):
+        team = crear_equipo_prueba(self.torneo)
+        archivo = SimpleUploadedFile(
+            "roster.csv", "Número,Nombre,Apellido,NSS\n7,Ana,Báez,00000000007\n8,Luis,Cruz,00000000008\n".encode()
+        )
+        response = self.client.post(
+            reverse("importar_jugadores", args=[team.folio]), {"archivo": archivo}
+        )
+        self.assertRedirects(response, reverse("registrar_jugadores", args=[team.folio]))
+        self.assertEqual(team.players.count(), 2)
+
+    @override_settings(CREDENCIALES_PDF_ASYNC=True)
+    def test_credenciales_estado(self):
+        team = crear_equipo_prueba(self.torneo)
+        self.assertEqual(
+            self.client.get(reverse("credenciales_pdf", args=[team.folio])).status_code, 202
+        )
+        job = PdfJob.objects.get()
+        url = reverse("credenciales_estado", args=[team.folio, job.pk])
+        self.assertEqual(self.client.get(url).json()["estado"], "pendiente")
+        # El camino más caro: reencolar un trabajo con error
+        PdfJob.objects.update(status="ERROR", attempts=1)
+        self.assertEqual(self.client.get(url).json()["estado"], "pendiente")
+
+    def test_admin(self):
+        usuario = User.objects.create_superuser("admin", "admin@example.com", "clave")
+        self.client.force_login(usuario)
+        for n in range(3):
+            team = crear_equipo_prueba(
+                self.torneo, nombre=f"Equipo {n}", status="PRE_REGISTRADO"
+            )
+            form = PaymentProofForm(
+                {"folio": team.folio, "delegate_phone": team.delegate_phone},
+                {"file": imagen_png()},
+            )
+            self.assertTrue(form.is_valid(), form.errors)
+            registrar_comprobante(form)
+        for nombre in ("inscripciones_team_changelist", "inscripciones_paymentproof_changelist"):
+            self.assertEqual(self.client.get(reverse(f"admin:{nombre}")).status_code, 200)
+
+    @override_settings(TIEMPOS_PRESUPUESTOS={"roster_equipo": 0})
+    def test_excedido_lanza_error(self):
+        team = crear_equipo_prueba(self.torneo)
+        with self.assertRaises(PresupuestoConsultasExcedido):
+            self.client.get(reverse("roster_equipo", args=[team.folio]))
+
+
+# ===========================
+#  CONSULTAS POR PETICIÓN
+# ===========================
+def sentencias(capturadas, inicio):
+    return [q["sql"] for q in capturadas if q["sql"].startswith(inicio)]
+
+
+class ConsultasInscripcionTests(PruebaConMedia):
+    """
+    Número exacto de consultas de las altas. assertNumQueries cuenta también
+    el SAVEPOINT/RELEASE del atomic() (BEGIN/COMMIT fuera de un TestCase).
+    """
+
+    def test_inscripcion_post(self):
+        # Con la lista de torneos ya en cache (como en cualquier petición menos la primera)
+        self.client.get(reverse("inscripcion"))
+        # Torneo abierto (la lista cacheada solo arma el <select>), existe el
+        # torneo (validación del FK), SAVEPOINT, consecutivo del folio, INSERT
+        # del equipo, RELEASE
+        with self.assertNumQueries(6) as capturadas:
+            response = self.client.post(
+                reverse("inscripcion"),
+                datos_equipo(self.torneo, delegate_ine=imagen_png()),
+            )
+        self.assertTemplateUsed(response, "inscripciones/inscripcion_exitosa.html")
+
+        self.assertEqual(len(sentencias(capturadas, 'INSERT INTO "inscripciones_team"')), 1)
+        self.assertEqual(sentencias(capturadas, "UPDATE"), [])
+        team = Team.objects.get()
+        self.assertTrue(team.folio.endswith("-0001"))
+        self.assertIsNotNone(team.payment_deadline)
+        self.assertTrue(team.delegate_ine)
+
+    def test_subir_comprobante_post(self):
+        team = crear_equipo_prueba(self.torneo, status="PRE_REGISTRADO")
+        # Equipo por folio, SAVEPOINT, INSERT del comprobante, UPDATE del status, RELEASE
+        with self.assertNumQueries(5):
+            response = self.client.post(
+                reverse("subir_comprobante"),
+                {"folio": team.folio.lower(), "delegate_phone": "55-1234-5678", "file": imagen_png()},
+            )
+        self.assertTemplateUsed(response, "inscripciones/comprobante_enviado.html")
+
+        team.refresh_from_db()
+        self.assertEqual(team.status, "COMPROBANTE_ENVIADO")
+        self.assertEqual(team.payment_proofs.count(), 1)
+
+
+class TorneoCerradoTests(PruebaConMedia):
+    def test_cerrado_con_lista_en_cache(self):
+        # Otro worker cierra el torneo: la señal no limpia el cache de este
+        self.client.get(reverse("inscripcion"))
+        Tournament.objects.filter(pk=self.torneo.pk).update(is_open=False)
+        self.assertEqual(utils.torneos_abiertos(), [self.torneo])
+
+        response = self.client.post(reverse("inscripcion"), datos_equipo(self.torneo))
+        self.assertTemplateUsed(response, "inscripciones/inscripcion.html")
+        self.assertIn("tournament", response.context["form"].errors)
+        self.assertFalse(Team.objects.exists())
+
+
+class ConsultasServiciosTests(PruebaConMedia):
+    def test_comprobante_busca_el_equipo_una_vez(self):
+        team = crear_equipo_prueba(self.torneo, status="PRE_REGISTRADO")
+        with CaptureQueriesContext(connection) as capturadas:
+            form = PaymentProofForm(
+                {"folio": team.folio, "delegate_phone": team.delegate_phone},
+                {"file": imagen_png()},
+            )
+            self.assertTrue(form.is_valid(), form.errors)
+            registrar_comprobante(form)
+
+        self.assertEqual(len(sentencias(capturadas, "SELECT")), 1)
+        self.assertEqual(len(sentencias(capturadas, "INSERT")), 1)
+        self.assertEqual(len(sentencias(capturadas, "UPDATE")), 1)
+
+    def _consultas_roster(self, team, filas, iniciales=0):
+        """Consultas de validar y guardar el formset del roster."""
+        with CaptureQueriesContext(connection) as capturadas:
+            formset = PlayerFormSet(datos_roster(team, filas, iniciales), instance=team)
+            self.assertTrue(formset.is_valid(), formset.errors)
+            guardar_roster(formset)
+        return len(capturadas)
+
+    def test_roster_consultas_constantes(self):
+        chico = crear_equipo_prueba(self.torneo, nombre="Chico")
+        grande = crear_equipo_prueba(self.torneo, nombre="Grande")
+
+        # Alta: un solo bulk_create, sin importar cuántos jugadores
+        altas_chico = self._consultas_roster(chico, [fila_jugador(n) for n in range(1, 3)])
+        altas_grande = self._consultas_roster(grande, [fila_jugador(n) for n in range(1, 19)])
+        self.assertEqual(altas_chico, altas_grande)
+        self.assertEqual(altas_grande, 4)  # SAVEPOINT, INSERT, RELEASE, roster_version
+        self.assertEqual(grande.players.count(), 18)
+
+        # Edición de todos: el roster se lee una vez y se escribe con un bulk_update
+        def editadas(team):
+            filas = []
+            for jugador in team.players.order_by("pk"):
+                fila = fila_jugador(jugador.jersey_number, jugador)
+                fila["first_name"] = f"Otro{jugador.jersey_number}"
+                filas.append(fila)
+            return filas
+
+        cambios_chico = self._consultas_roster(chico, editadas(chico), iniciales=2)
+        cambios_grande = self._consultas_roster(grande, editadas(grande), iniciales=18)
+        self.assertEqual(cambios_chico, cambios_grande)
+        self.assertEqual(cambios_grande, 5)  # roster, SAVEPOINT, UPDATE, RELEASE, roster_version
+        self.assertEqual(grande.players.filter(first_name__startswith="Otro").count(), 18)
+
+
+class GuardarRosterTests(PruebaConMedia):
+    def test_conflicto_no_deja_fotos_huerfanas(self):
+        team = crear_equipo_prueba(self.torneo)
+        # Foto que ya usa un jugador de otro equipo: no se debe borrar
+        otro = crear_equipo_prueba(self.torneo, nombre="Otro")
+        compartida = Player.objects.create(
+            team=otro, jersey_number=1, first_name="C", last_name="D",
+            photo=imagen_png(color=(0, 0, 255)),
+        )
+
+        fotos = {
+            "players-0-photo": imagen_png(color=(0, 255, 0)),
+            "players-1-photo": imagen_png(color=(0, 0, 255)),
+        }
+        formset = PlayerFormSet(
+            datos_roster(team, [fila_jugador(7), fila_jugador(8)]), fotos, instance=team
+        )
+        self.assertTrue(formset.is_valid(), formset.errors)
+        # Otra captura guardó el 7 mientras tanto
+        Player.objects.create(team=team, jersey_number=7, first_name="X", last_name="Y")
+
+        with self.assertRaises(IntegrityError):
+            guardar_roster(formset)
+
+        nueva = formset.forms[0].instance
+        self.assertFalse(default_storage.exists(nueva.photo.name))
+        self.assertFalse(default_storage.exists(nueva.photo_credencial.name))
+        self.assertTrue(default_storage.exists(compartida.photo.name))
+        self.assertTrue(default_storage.exists(compartida.photo_credencial.name))
+        self.assertEqual(team.players.count(), 1)
+
+
+@override_settings(CREDENCIALES_PDF_ASYNC=True)
+class CredencialesAsincronasTests(PruebaConMedia):
+    def setUp(self):
+        super().setUp()
+        self.team = crear_equipo_prueba(self.torneo)
+        self.descarga = reverse("credenciales_pdf", args=[self.team.folio])
+
+    def encolar(self):
+        response = self.client.get(self.descarga)
+        self.assertEqual(response.status_code, 202)
+        job = PdfJob.objects.get()
+        return job, reverse("credenciales_estado", args=[self.team.folio, job.pk])
+
+    def test_descarga_encola_y_estado_solo_consulta(self):
+        job, estado = self.encolar()
+
+        for _ in range(3):
+            # Solo lee el trabajo: ni el equipo ni los jugadores
+            with self.assertNumQueries(1):
+                self.assertEqual(self.client.get(estado).json()["estado"], "pendiente")
+
+        # El worker terminó pero el archivo ya no está (invalidación): no se reencola
+        PdfJob.objects.filter(pk=job.pk).update(status="LISTO")
+        for _ in range(3):
+            self.assertEqual(self.client.get(estado).json()["estado"], "listo")
+        job.refresh_from_db()
+        self.assertEqual(job.status, "LISTO")
+        self.assertEqual(PdfJob.objects.count(), 1)
+
+        # Trabajo de otro equipo o ya purgado: la descarga decide
+        otro = crear_equipo_prueba(self.torneo, nombre="Otro")
+        url = reverse("credenciales_estado", args=[otro.folio, job.pk])
+        self.assertEqual(self.client.get(url).json()["estado"], "listo")
+
+    def test_estado_reintenta_errores(self):
+        _job, estado = self.encolar()
+        PdfJob.objects.update(status="ERROR", attempts=1)
+        self.assertEqual(self.client.get(estado).json()["estado"], "pendiente")
+        self.assertEqual(PdfJob.objects.get().status, "PENDIENTE")
+        PdfJob.objects.update(status="ERROR", attempts=3)
+        self.assertEqual(self.client.get(estado).json()["estado"], "error")
+
+    @override_settings(CREDENCIALES_PDF_ESPERA_WORKER=20)
+    def test_sin_worker_la_web_genera(self):
+        job, estado = self.encolar()
+        self.assertEqual(self.client.get(estado).json()["estado"], "pendiente")
+
+        # Ningún worker lo tomó en el tiempo de espera
+        PdfJob.objects.update(queued_at=timezone.now() - timedelta(seconds=30))
+        self.assertEqual(self.client.get(estado).json()["estado"], "listo")
+
+        response = self.client.get(self.descarga)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(b"".join(response.streaming_content).startswith(b"%PDF"))
+        job.refresh_from_db()
+        self.assertEqual(job.status, "LISTO")
+        self.assertIsNone(trabajos.reclamar_siguiente())
+
+
+# ===========================
+#  SUBIDAS
+# ===========================
+@override_settings(SUBIDAS_MAX_BYTES=1024, FILE_UPLOAD_MAX_MEMORY_SIZE=256)
+class LimiteSubidasTests(PruebaConMedia):
+    def test_foto_de_jugador_muy_grande(self):
+        team = crear_equipo_prueba(self.torneo)
+        buffer = io.BytesIO()
+        Image.effect_noise((64, 64), 64).convert("RGB").save(buffer, format="PNG")
+        fila = fila_jugador(7)
+        fila["photo"] = SimpleUploadedFile("grande.png", buffer.getvalue(), "image/png")
+
+        response = self.client.post(
+            reverse("registrar_jugadores", args=[team.folio]), datos_roster(team, [fila])
+        )
+
+        errores = response.context["formset"].forms[0].errors["photo"]
+        self.assertEqual(len(errores), 1)
+        self.assertIn("el máximo permitido es", errores[0])
+        self.assertFalse(team.players.exists())
+
+    def test_deja_de_escribir_al_pasar_el_limite(self):
+        handler = LimiteTamanoUploadHandler()
+        handler.new_file("file", "pago.png", "image/png", None)
+        for inicio in range(0, 2000, 400):
+            handler.receive_data_chunk(b"x" * 400, inicio)
+
+        # Solo los dos pedazos que caben en 1024 bytes llegaron al disco
+        self.assertEqual(handler.file.tell(), 800)
+        archivo = handler.file_complete(2000)
+        self.assertIsInstance(archivo, ArchivoExcedido)
+        self.assertEqual((archivo.size, archivo.read()), (2000, b""))
+        with self.assertRaisesMessage(ValidationError, "el máximo permitido es 1.0"):
+            validar_tamano_subida(archivo)
+
+    def test_comprobante_muy_grande(self):
+        team = crear_equipo_prueba(self.torneo, status="PRE_REGISTRADO")
+        archivo = SimpleUploadedFile("pago.pdf", b"%PDF-1.4\n" + b"0" * 4096, "application/pdf")
+        response = self.client.post(
+            reverse("subir_comprobante"),
+            {"folio": team.folio, "delegate_phone": team.delegate_phone, "file": archivo},
+        )
+        self.assertIn("el máximo permitido es", response.context["form"].errors["file"][0])
+        self.assertFalse(team.payment_proofs.exists())
+
+
+def imagen_con_rotacion(lado=(240, 120), formato="JPEG", ruido=False):
+    """Izquierda roja y derecha azul; EXIF dice girar 90° (orientación 6)."""
+    ancho, alto = lado
+    img = Image.new("RGB", lado, (220, 0, 0))
+    img.paste((0, 0, 220), (ancho // 2, 0, ancho, alto))
+    if ruido:
+        img = Image.blend(img, Image.effect_noise(lado, 80).convert("RGB"), 0.3)
+    exif = Image.Exif()
+    exif[0x0112] = 6
+    buffer = io.BytesIO()
+    img.save(buffer, format=formato, exif=exif)
+    buffer.seek(0)
+    return buffer
+
+
+class DocumentosTests(PruebaConMedia):
+    def setUp(self):
+        super().setUp()
+        self.team = crear_equipo_prueba(self.torneo)
+
+    def comprobante(self, nombre, contenido, tipo):
+        return PaymentProof.objects.create(
+            team=self.team, file=SimpleUploadedFile(nombre, contenido, tipo)
+        )
+
+    def test_foto_credencial_girada_segun_exif(self):
+        with Image.open(generar_foto_credencial(imagen_con_rotacion())) as img:
+            ancho, alto = img.size
+            puntos = ((2, 2), (ancho - 3, 2), (2, alto - 3), (ancho - 3, alto - 3))
+            esquinas = [img.getpixel(p) for p in puntos]
+        # Girada: arriba lo que era la izquierda (rojo), abajo lo de la derecha (azul)
+        rojo = [c[0] > 150 and c[2] < 80 for c in esquinas]
+        azul = [c[2] > 150 and c[0] < 80 for c in esquinas]
+        self.assertEqual((rojo, azul), ([True, True, False, False], [False, False, True, True]))
+
+    def test_imagen_se_reemplaza_solo_si_pesa_menos(self):
+        # PNG con ruido: el JPEG pesa menos y además queda girado según EXIF
+        grande = imagen_con_rotacion((400, 200), formato="PNG", ruido=True).getvalue()
+        comprobante = self.comprobante("pago.png", grande, "image/png")
+        self.assertTrue(comprobante.file.name.endswith(".jpg"))
+        self.assertEqual(comprobante.original_size, len(grande))
+        self.assertLess(comprobante.stored_size, comprobante.original_size)
+        with Image.open(comprobante.file.path) as img:
+            self.assertEqual(img.size, (200, 400))
+
+        # PNG liso: el JPEG pesaría más, se queda la original
+        chico = imagen_png().read()
+        comprobante = self.comprobante("pago.png", chico, "image/png")
+        self.assertTrue(comprobante.file.name.endswith(".png"))
+        self.assertEqual(comprobante.stored_size, len(chico))
+        self.assertEqual(default_storage.open(comprobante.file.name).read(), chico)
+
+    def test_pdf_intacto(self):
+        contenido = b"%PDF-1.4\n1 0 obj << >> endobj\ntrailer << >>\n%%EOF\n"
+        comprobante = self.comprobante("pago.pdf", contenido, "application/pdf")
+        self.assertTrue(comprobante.file.name.endswith(".pdf"))
+        self.assertEqual((comprobante.original_size, comprobante.stored_size), (len(contenido),) * 2)
+        with default_storage.open(comprobante.file.name) as fh:
+            self.assertEqual(fh.read(), contenido)
+
+
+# ===========================
+#  IMPORTACIÓN DE JUGADORES
+# ===========================
+def xlsx(filas):
+    from openpyxl import Workbook
+
+    libro = Workbook()
+    for fila in filas:
+        libro.active.append(fila)
+    buffer = io.BytesIO()
+    libro.save(buffer)
+    buffer.seek(0)
+    return buffer
+
+
+class ImportacionTests(PruebaConMedia):
+    def setUp(self):
+        super().setUp()
+        self.team = crear_equipo_prueba(self.torneo)
+
+    def importar(self, contenido, nombre="roster.csv", **opciones):
+        opciones.setdefault("team", None if "torneo" in opciones else self.team)
+        archivo = io.BytesIO(contenido) if isinstance(contenido, bytes) else contenido
+        return importar_jugadores(archivo, nombre, **opciones)
+
+    def test_csv_windows_1252(self):
+        # Excel en Windows guarda con ; y en cp1252
+        contenido = "Número;Nombre;Apellido;NSS\n7;José;Muñoz;00000000007\n".encode("cp1252")
+        resultado = self.importar(contenido)
+
+        self.assertEqual(resultado["errores"], [])
+        jugador = self.team.players.get()
+        self.assertEqual((jugador.first_name, jugador.last_name), ("José", "Muñoz"))
+
+    def test_xlsx(self):
+        archivo = xlsx([
+            ("No.", "Nombres", "Apellidos", "NSS", "Refuerzo"),
+            (7, "Ana", "Báez", "00000000007", None),
+            (9.0, "Luis", "Cruz", None, "Sí"),
+        ])
+        resultado = self.importar(archivo, "roster.xlsx")
+
+        self.assertEqual(resultado["errores"], [])
+        self.assertEqual(resultado["equipos"][self.team.folio]["creados"], 2)
+        refuerzo = self.team.players.get(jersey_number=9)
+        self.assertTrue(refuerzo.is_reinforcement)
+        self.assertEqual(refuerzo.imss_number, "")
+
+    def test_numero_repetido(self):
+        Player.objects.create(
+            team=self.team, jersey_number=7, first_name="Ana", last_name="Báez",
+            imss_number="00000000007",
+        )
+        # La fila 2 actualiza al 7 existente; la fila 3 sería un segundo 7
+        contenido = (
+            "Número,Nombre,Apellido,NSS\n"
+            "7,Ana,Báez,00000000007\n"
+            "7,Luis,Cruz,00000000008\n"
+        ).encode()
+        resultado = self.importar(contenido)
+
+        self.assertEqual(
+            resultado["errores"],
+            [
+                (self.team.folio, 2, "Número: Este número está repetido en la lista de jugadores."),
+                (self.team.folio, 3, "Número: Ya existe otro jugador con este número en este equipo."),
+            ],
+        )
+        self.assertEqual(self.team.players.count(), 1)
+
+    def test_limite_de_refuerzos(self):
+        contenido = "Número,Nombre,Apellido,Refuerzo\n" + "".join(
+            f"{n},N{n},A,x\n" for n in (1, 2, 3)
+        )
+        resultado = self.importar(contenido.encode())
+
+        self.assertEqual(
+            resultado["errores"],
+            [(self.team.folio, None, "Solo puedes registrar hasta 2 jugadores como refuerzo.")],
+        )
+        self.assertFalse(self.team.players.exists())
+
+    def test_por_torneo_un_equipo_con_errores_no_escribe(self):
+        otro = crear_equipo_prueba(self.torneo, nombre="Otro")
+        contenido = (
+            "Folio,Número,Nombre,Apellido,NSS\n"
+            f"{self.team.folio},7,Ana,Báez,00000000007\n"
+            f"{otro.folio},8,Luis,Cruz,00000000008\n"
+            f"{otro.folio},9,Sin,NSS,\n"
+            "LIFE-99-0001,10,Eva,Díaz,00000000010\n"
+        ).encode()
+        resultado = self.importar(contenido, torneo=self.torneo)
+
+        self.assertEqual(list(resultado["equipos"]), [self.team.folio])
+        self.assertEqual(self.team.players.count(), 1)
+        self.assertFalse(otro.players.exists())
+        self.assertEqual(
+            [(folio, fila) for folio, fila, _mensaje in resultado["errores"]],
+            [("LIFE-99-0001", 5), (otro.folio, 4)],
+        )
+        self.assertIn("No hay un equipo APROBADO con folio LIFE-99-0001", resultado["errores"][0][2])
+
+    def test_comando_validar_no_guarda(self):
+        ruta = os.path.join(self._media, "roster.csv")
+        with open(ruta, "w", encoding="utf-8") as fh:
+            fh.write("Número,Nombre,Apellido,NSS\n7,Ana,Báez,00000000007\n8,Luis,Cruz,\n")
+        salida = io.StringIO()
+
+        call_command("importar_jugadores", ruta, "--equipo", self.team.folio, "--validar", stdout=salida)
+
+        self.assertIn("0 equipos validados, 1 con errores (no se guardaron).", salida.getvalue())
+        self.assertIn(f"{self.team.folio} fila 3: Número IMSS: Para jugadores que no son refuerzo", salida.getvalue())
+        self.assertFalse(self.team.players.exists())
+
+        with open(ruta, "w", encoding="utf-8") as fh:
+            fh.write("Número,Nombre,Apellido,NSS\n7,Ana,Báez,00000000007\n")
+        call_command("importar_jugadores", ruta, "--equipo", self.team.folio, "--validar", stdout=salida)
+        self.assertIn("1 equipos validados.", salida.getvalue())
+        self.assertFalse(self.team.players.exists())
+
+        call_command("importar_jugadores", ruta, "--equipo", self.team.folio, stdout=salida)
+        self.assertIn("1 equipos importados.", salida.getvalue())
+        self.assertEqual(self.team.players.count(), 1)
+
+
+# ===========================
+#  CREDENCIALES
+# ===========================
+class DescargaCredencialesTests(PruebaConMedia):
+    def setUp(self):
+        super().setUp()
+        self.team = crear_equipo_prueba(self.torneo)
+        Player.objects.create(team=self.team, jersey_number=7, first_name="A", last_name="B")
+        self.url = reverse("credenciales_pdf", args=[self.team.folio])
+
+    def test_cache_y_304(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(b"".join(response.streaming_content).startswith(b"%PDF"))
+
+        revalidacion = self.client.get(self.url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(revalidacion.status_code, 304)
+
+    def test_pdf_borrado_al_generarse(self):
+        # Otro worker borra el archivo (invalidación) entre generarlo y abrirlo
+        generar = views.obtener_pdf_credenciales
+        borrados = []
+
+        def generar_y_borrar(*args):
+            ruta = generar(*args)
+            if not borrados:
+                os.remove(ruta)
+                borrados.append(ruta)
+            return ruta
+
+        with mock.patch.object(views, "obtener_pdf_credenciales", side_effect=generar_y_borrar):
+            response = self.client.get(self.url)
+
+        self.assertEqual(len(borrados), 1)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(b"".join(response.streaming_content).startswith(b"%PDF"))
+
+
+class FotoCredencialTests(PruebaConMedia):
+    def setUp(self):
+        super().setUp()
+        self.team = crear_equipo_prueba(self.torneo)
+
+    def jugador(self, numero, lado=32):
+        buffer = io.BytesIO()
+        Image.new("RGB", (lado, lado), (numero, 30, 30)).save(buffer, format="PNG")
+        foto = SimpleUploadedFile(f"f{numero}.png", buffer.getvalue(), content_type="image/png")
+        return Player.objects.create(
+            team=self.team, jersey_number=numero, first_name=f"N{numero}",
+            last_name="A", photo=foto,
+        )
+
+    def test_derivada_al_guardar(self):
+        jugador = self.jugador(7)
+        self.assertTrue(jugador.photo_credencial.name.endswith(".jpg"))
+        with Image.open(jugador.photo_credencial.path) as img:
+            self.assertEqual(img.size, tamano_foto_credencial())
+
+    def test_bomba_de_descompresion(self):
+        with mock.patch.object(Image, "MAX_IMAGE_PIXELS", 100):
+            jugador = self.jugador(7)
+        self.assertTrue(jugador.photo)
+        self.assertFalse(jugador.photo_credencial)
+
+    def test_comando(self):
+        sana, enorme = self.jugador(7), self.jugador(8, lado=64)
+        Player.objects.update(photo_credencial=None)
+        salida, errores = io.StringIO(), io.StringIO()
+
+        # 64x64 pasa del doble del límite (bomba); 32x32 no llega ni al límite
+        with mock.patch.object(Image, "MAX_IMAGE_PIXELS", 1500):
+            call_command(
+                "generar_fotos_credencial", "--workers", "2", stdout=salida, stderr=errores
+            )
+
+        self.assertIn("Fotos generadas: 1. Con error: 1.", salida.getvalue())
+        self.assertIn(enorme.photo.name, errores.getvalue())
+        sana.refresh_from_db()
+        enorme.refresh_from_db()
+        self.assertTrue(default_storage.exists(sana.photo_credencial.name))
+        self.assertFalse(enorme.photo_credencial)
+
+        # Solo queda pendiente la que falló
+        call_command("generar_fotos_credencial", stdout=salida, stderr=errores)
+        self.assertIn("Fotos generadas: 1. Con error: 0.", salida.getvalue())
+
+
+def xobjects(recursos):
+    """Todos los XObjects de unos recursos de pypdf, entrando a los forms."""
+    for objeto in recursos.get("/XObject", {}).values():
+        objeto = objeto.get_object()
+        yield objeto
+        if objeto["/Subtype"] == "/Form":
+            yield from xobjects(objeto["/Resources"])
+
+
+class GenerarCredencialesTests(PruebaConMedia):
+    def test_pdf_binario_sin_cambiar_reportlab(self):
+        team = crear_equipo_prueba(self.torneo)
+        Player.objects.create(
+            team=team, jersey_number=7, first_name="A", last_name="B", photo=imagen_png()
+        )
+        salida = io.BytesIO()
+        utils.generar_credenciales_pdf(team, list(team.players.all()), salida)
+
+        pdf = salida.getvalue()
+        self.assertNotIn(b"/ASCII85Decode", pdf)
+        # Los demás PDFs del proceso conservan el default de reportlab
+        self.assertEqual(rl_config.useA85, 1)
+
+        # Se puede leer y cada stream se decodifica con sus filtros
+        lector = PdfReader(io.BytesIO(pdf))
+        self.assertEqual(len(lector.pages), 1)
+        pagina = lector.pages[0]
+        self.assertTrue(pagina.get_contents().get_data())
+        filtros = set()
+        for objeto in xobjects(pagina["/Resources"]):
+            self.assertTrue(objeto.get_data())
+            filtros.update(objeto.get("/Filter", []))
+        self.assertIn("/DCTDecode", filtros)  # el fondo va tal cual
+        self.assertIn("/FlateDecode", filtros)
+
+    def test_qr_reader_por_llamada(self):
+        primero = utils.obtener_qr("https://example.com/qr")
+        segundo = utils.obtener_qr("https://example.com/qr")
+        self.assertIsNot(primero, segundo)
+        self.assertIsInstance(utils._qr_cache.get("https://example.com/qr"), bytes)
+        self.assertEqual(primero.getRGBData(), segundo.getRGBData())
+
+
+class RosterPublicoTests(PruebaConMedia):
+    def setUp(self):
+        super().setUp()
+        self.team = crear_equipo_prueba(self.torneo)
+        self.url = reverse("roster_equipo", args=[self.team.folio])
+
+    def test_cambio_de_torneo(self):
+        self.assertContains(self.client.get(self.url), "Apertura")
+        self.torneo.name = "Clausura"
+        self.torneo.save()
+        self.assertContains(self.client.get(self.url), "Clausura")
+
+    def test_reubicar_media(self):
+        # Foto con nombre anterior al storage por contenido
+        with open(os.path.join(settings.MEDIA_ROOT, "vieja.jpg"), "wb") as f:
+            f.write(imagen_png().read())
+        jugador = Player.objects.create(team=self.team, jersey_number=7, first_name="A", last_name="B")
+        Player.objects.filter(pk=jugador.pk).update(photo="vieja.jpg")
+        self.assertContains(self.client.get(self.url), "/media/vieja.jpg")
+
+        call_command("reubicar_media", stdout=io.StringIO())
+
+        jugador.refresh_from_db()
+        response = self.client.get(self.url)
+        self.assertNotContains(response, "/media/vieja.jpg")
+        self.assertContains(response, jugador.photo.url)
+
+    def test_cambio_en_otro_worker(self):
+        # El cache es por worker: un cambio guardado en otro no borra nada de este
+        jugador = Player.objects.create(team=self.team, jersey_number=7, first_name="Ana", last_name="B")
+        self.assertContains(self.client.get(self.url), "Ana")
+
+        with mock.patch.object(cache, "delete"), mock.patch.object(cache, "delete_many"):
+            jugador.delete()
+            self.assertNotContains(self.client.get(self.url), "Ana")
+
+            Team.objects.filter(pk=self.team.pk).update(status="EXPIRADO")
+            self.assertContains(self.client.get(self.url), "no está aprobado")
+
+
+# ===========================
+#  ADMIN
+# ===========================
+@override_settings(TIEMPOS_PRESUPUESTO_ESTRICTO=True)
+class TeamAdminTests(PruebaConMedia):
+    def setUp(self):
+        super().setUp()
+        usuario = User.objects.create_superuser("admin", "admin@example.com", "clave")
+        self.client.force_login(usuario)
+        self.team = crear_equipo_prueba(self.torneo)
+        Player.objects.create(team=self.team, jersey_number=7, first_name="A", last_name="B")
+
+    def test_listado_anotado_y_ordenable(self):
+        # o=6: orden por la columna de jugadores (anotación)
+        response = self.client.get(reverse("admin:inscripciones_team_changelist"), {"o": "6"})
+        self.assertEqual(response.status_code, 200)
+        equipo = response.context["cl"].result_list[0]
+        self.assertEqual(equipo.num_jugadores, 1)
+
+    def test_edicion_sin_anotaciones(self):
+        with CaptureQueriesContext(connection) as capturadas:
+            response = self.client.get(
+                reverse("admin:inscripciones_team_change", args=[self.team.pk])
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([q for q in sentencias(capturadas, "SELECT") if "COUNT(" in q], [])
+
+    def test_sin_peticion(self):
+        queryset = admin.site._registry[Team].get_queryset(None)
+        self.assertNotIn("num_jugadores", queryset.query.annotations)
+
+
+@override_settings(CREDENCIALES_PDF_ASYNC=True)
+class ExportarCredencialesAdminTests(PruebaConMedia):
+    def setUp(self):
+        super().setUp()
+        usuario = User.objects.create_superuser("admin", "admin@example.com", "clave")
+        self.client.force_login(usuario)
+        self.generado = crear_equipo_prueba(self.torneo, nombre="Generado")
+        self.pendiente = crear_equipo_prueba(self.torneo, nombre="Pendiente")
+        for team in (self.generado, self.pendiente):
+            Player.objects.create(team=team, jersey_number=7, first_name="A", last_name="B")
+        utils.obtener_pdf_credenciales(self.generado, list(self.generado.players.all()))
+
+    def exportar(self):
+        return self.client.post(
+            reverse("admin:inscripciones_tournament_changelist"),
+            {"action": "exportar_credenciales", "_selected_action": [self.torneo.pk]},
+            follow=True,
+        )
+
+    def test_solo_empaqueta_los_generados_y_encola_el_resto(self):
+        with mock.patch.object(utils, "generar_credenciales_pdf") as generar:
+            response = self.exportar()
+        generar.assert_not_called()
+
+        with zipfile.ZipFile(io.BytesIO(b"".join(response.streaming_content))) as zf:
+            self.assertEqual(
+                zf.namelist(), [f"torneo_{self.torneo.pk}/{self.generado.folio}.pdf"]
+            )
+        job = PdfJob.objects.get()
+        self.assertEqual((job.team, job.status), (self.pendiente, "PENDIENTE"))
+
+    def test_nada_generado(self):
+        utils.invalidar_cache_credenciales(self.generado.pk)
+        response = self.exportar()
+        self.assertEqual(response["Content-Type"], "text/html; charset=utf-8")
+        mensajes = [str(m) for m in response.context["messages"]]
+        self.assertEqual(len(mensajes), 1)
+        self.assertIn("2 equipos aún no tienen su PDF", mensajes[0])
+        self.assertEqual(PdfJob.objects.count(), 2)
+
+
+# ===========================
+#  ALMACENAMIENTO POR CONTENIDO
+# ===========================
+class AlmacenamientoTests(PruebaConMedia):
+    def setUp(self):
+        super().setUp()
+        self.team = crear_equipo_prueba(self.torneo)
+
+    def jugador(self, numero, foto=None):
+        return Player.objects.create(
+            team=self.team, jersey_number=numero, first_name=f"N{numero}",
+            last_name="A", photo=foto,
+        )
+
+    def test_mismo_contenido_un_solo_archivo(self):
+        a = self.jugador(7, imagen_png("A.PNG"))
+        b = self.jugador(8, imagen_png("otra.png"))
+        c = self.jugador(9, imagen_png(color=(1, 2, 3)))
+
+        self.assertEqual(a.photo.name, b.photo.name)
+        self.assertEqual(a.photo_credencial.name, b.photo_credencial.name)
+        self.assertNotEqual(a.photo.name, c.photo.name)
+        self.assertTrue(es_nombre_por_contenido(a.photo.name))
+        self.assertTrue(a.photo.name.startswith("jugadores_fotos/"))
+        self.assertTrue(a.photo.name.endswith(".png"))
+        self.assertEqual(len(os.listdir(os.path.dirname(a.photo.path))), 1)
+
+    def test_no_borra_un_archivo_compartido(self):
+        a = self.jugador(7, imagen_png())
+        b = self.jugador(8, imagen_png())
+        nombre = a.photo.name
+
+        # `a` deja de usarlo, pero `b` todavía lo tiene
+        self.assertFalse(borrar_si_huerfano(nombre, excluir=(Player, a.pk)))
+        self.assertTrue(default_storage.exists(nombre))
+
+        Player.objects.filter(pk=b.pk).update(photo="")
+        self.assertTrue(borrar_si_huerfano(nombre, excluir=(Player, a.pk)))
+        self.assertFalse(default_storage.exists(nombre))
+
+    def test_reubicar_media_idempotente(self):
+        # Media de antes del storage por contenido: nombres libres y repetidos
+        contenido = imagen_png().read()
+        anterior = FileSystemStorage()
+        viejos = [
+            anterior.save(f"jugadores_fotos/vieja_{n}.png", ContentFile(contenido))
+            for n in (7, 8)
+        ]
+        for numero, nombre in zip((7, 8), viejos):
+            Player.objects.filter(pk=self.jugador(numero).pk).update(photo=nombre)
+
+        salida = io.StringIO()
+        call_command("reubicar_media", stdout=salida)
+        self.assertIn("Archivos reubicados: 2 (1 únicos). Borrados: 2. Con error: 0.", salida.getvalue())
+        nombres = set(Player.objects.values_list("photo", flat=True))
+        self.assertEqual(len(nombres), 1)
+        nuevo = nombres.pop()
+        self.assertTrue(es_nombre_por_contenido(nuevo))
+        self.assertTrue(default_storage.exists(nuevo))
+        self.assertFalse(any(anterior.exists(nombre) for nombre in viejos))
+
+        # Segunda corrida: nada que mover ni borrar
+        call_command("reubicar_media", stdout=salida)
+        self.assertIn("Archivos reubicados: 0 (0 únicos). Borrados: 0. Con error: 0.", salida.getvalue())
+        self.assertEqual(set(Player.objects.values_list("photo", flat=True)), {nuevo})
+        self.assertTrue(default_storage.exists(nuevo))
+
+
+# ===========================
+#  REPORTE DE INSCRIPCIONES
+# ===========================
+class ReporteInscripcionesTests(PruebaConMedia):
+    def setUp(self):
+        super().setUp()
+        self.team = crear_equipo_prueba(self.torneo, nombre='=HYPERLINK("http://x")')
+        Team.objects.filter(pk=self.team.pk).update(
+            delegate_name="+cmd|' /C calc'!A0", company_name="@SUMA(A1)",
+            delegate_office_phone="-55 1234",
+        )
+        Player.objects.create(
+            team=self.team, jersey_number=7, first_name="Ana", last_name="-Báez",
+            imss_number="00000000007", is_reinforcement=True,
+        )
+        self.vacio = crear_equipo_prueba(self.torneo, nombre="Sin jugadores")
+
+    def revisar(self, filas):
+        encabezado, equipo, vacio = filas
+        self.assertEqual(encabezado[:3], ["Torneo", "Folio", "Equipo"])
+        fila = dict(zip(encabezado, equipo))
+        # Fórmulas escapadas; un teléfono con signo y número se deja igual
+        self.assertEqual(fila["Equipo"], "\'=HYPERLINK(\"http://x\")")
+        self.assertEqual(fila["Delegado"], "\'+cmd|' /C calc'!A0")
+        self.assertEqual(fila["Empresa / Patrocinador"], "\'@SUMA(A1)")
+        self.assertEqual(fila["Teléfono de oficina del delegado"], "-55 1234")
+        self.assertEqual(fila["Apellido"], "\'-Báez")
+        self.assertEqual(fila["Refuerzo"], "Sí")
+        # El equipo sin jugadores sale una vez, con las columnas de jugador vacías
+        fila = dict(zip(encabezado, vacio))
+        self.assertEqual(fila["Equipo"], "Sin jugadores")
+        self.assertEqual([fila[c] for c in ("Número", "Nombre", "NSS", "Refuerzo")], [""] * 4)
+
+    def test_csv_por_salida_estandar(self):
+        salida = io.StringIO()
+        call_command("exportar_inscripciones", str(self.torneo.pk), "--salida", "-", stdout=salida)
+
+        contenido = salida.getvalue()
+        self.assertTrue(contenido.startswith("\ufeff"))
+        self.revisar(list(csv.reader(io.StringIO(contenido[1:]))))
+
+    def test_xlsx(self):
+        from openpyxl import load_workbook
+
+        ruta = os.path.join(self._media, "inscripciones.xlsx")
+        call_command(
+            "exportar_inscripciones", str(self.torneo.pk), "--formato", "xlsx",
+            "--salida", ruta, stdout=io.StringIO(),
+        )
+
+        libro = load_workbook(ruta, read_only=True)
+        filas = [
+            ["" if celda is None else str(celda) for celda in fila]
+            for fila in libro["Inscripciones"].iter_rows(values_only=True)
+        ]
+        libro.close()
+        self.revisar(filas)
+
+
+# ===========================
+#  EXPIRACIÓN
+# ===========================
+class ExpirarEquiposTests(PruebaConMedia):
+    LIMITE = date(2026, 3, 10)
+
+    def equipo(self, nombre, status="PRE_REGISTRADO", limite=LIMITE):
+        team = crear_equipo_prueba(self.torneo, nombre=nombre, status=status)
+        Team.objects.filter(pk=team.pk).update(payment_deadline=limite)
+        return team
+
+    def estados(self):
+        return dict(Team.objects.values_list("name", "status"))
+
+    def ahora(self, momento):
+        return mock.patch("django.utils.timezone.now", return_value=momento)
+
+    def test_limite_en_hora_local(self):
+        self.equipo("Vence")
+        salida = io.StringIO()
+
+        # 04:30 UTC del 11 = 22:30 del 10 en Ciudad de México: el último día aún cuenta
+        with self.ahora(datetime(2026, 3, 11, 4, 30, tzinfo=dt_timezone.utc)):
+            call_command("expirar_equipos", stdout=salida)
+        self.assertEqual(self.estados(), {"Vence": "PRE_REGISTRADO"})
+        self.assertIn("Equipos expirados (límite antes del 10/03/2026): 0.", salida.getvalue())
+
+        with self.ahora(datetime(2026, 3, 11, 6, 30, tzinfo=dt_timezone.utc)):
+            call_command("expirar_equipos", stdout=salida)
+        self.assertEqual(self.estados(), {"Vence": "EXPIRADO"})
+        self.assertIn("Equipos expirados (límite antes del 11/03/2026): 1.", salida.getvalue())
+
+    def test_segunda_corrida_no_cambia_nada(self):
+        self.equipo("A")
+        self.equipo("B")
+        self.equipo("Pagado", status="COMPROBANTE_ENVIADO")
+        hoy = self.LIMITE + timedelta(days=1)
+
+        self.assertEqual(expirar_equipos_vencidos(hoy=hoy), {self.torneo.pk: 2})
+        self.assertEqual(expirar_equipos_vencidos(hoy=hoy), {})
+        self.assertEqual(self.estados()["Pagado"], "COMPROBANTE_ENVIADO")
+
+    def test_accion_del_admin_solo_toca_vencidos_seleccionados(self):
+        usuario = User.objects.create_superuser("admin", "admin@example.com", "clave")
+        self.client.force_login(usuario)
+        ayer = timezone.localdate() - timedelta(days=1)
+        seleccionados = [
+            self.equipo("Vencido", limite=ayer),
+            self.equipo("A tiempo", limite=timezone.localdate()),
+            self.equipo("Pagado", status="COMPROBANTE_ENVIADO", limite=ayer),
+        ]
+        self.equipo("No seleccionado", limite=ayer)
+
+        response = self.client.post(
+            reverse("admin:inscripciones_team_changelist"),
+            {"action": "expirar_vencidos", "_selected_action": [t.pk for t in seleccionados]},
+            follow=True,
+        )
+
+        self.assertIn("1 equipos pasaron a EXPIRADO.", [str(m) for m in response.context["messages"]])
+        self.assertEqual(
+            self.estados(),
+            {
+                "Vencido": "EXPIRADO",
+                "A tiempo": "PRE_REGISTRADO",
+                "Pagado": "COMPROBANTE_ENVIADO",
+                "No seleccionado": "PRE_REGISTRADO",
+            },
+        )
+
+
+# ===========================
+#  FOLIOS
+# ===========================
+def consecutivos(torneo):
+    folios = Team.objects.filter(tournament=torneo).values_list("folio", flat=True)
+    return sorted(int(folio.rsplit("-", 1)[-1]) for folio in folios)
+
+
+class FolioSequenceTests(TestCase):
+    def test_consecutivo_por_torneo(self):
+        torneo_a = Tournament.objects.create(name="A")
+        torneo_b = Tournament.objects.create(name="B")
+        for _ in range(3):
+            crear_equipo_prueba(torneo_a, nombre=f"A{_}")
+            crear_equipo_prueba(torneo_b, nombre=f"B{_}")
+
+        self.assertEqual(consecutivos(torneo_a), [1, 2, 3])
+        self.assertEqual(consecutivos(torneo_b), [1, 2, 3])
+        team = Team.objects.filter(tournament=torneo_a).latest("pk")
+        self.assertEqual(team.folio, f"LIFE-{torneo_a.pk:02d}-0003")
+
+    def test_migracion_sigue_del_mayor_sufijo(self):
+        migracion = importlib.import_module("inscripciones.migrations.0013_folio_sequence")
+        torneo = Tournament.objects.create(name="Viejo")
+        vacio = Tournament.objects.create(name="Sin equipos")
+        # Folios viejos (id global): con huecos y sin empezar en 1
+        for folio in ("LIFE-00-0007", "LIFE-00-0012", "SIN-CONSECUTIVO"):
+            Team.objects.create(
+                tournament=torneo, name=folio, category="LIB",
+                delegate_name="D", delegate_phone="1", folio=folio,
+            )
+        FolioSequence.objects.all().delete()
+
+        migracion.inicializar_consecutivos(apps, None)
+
+        self.assertEqual(FolioSequence.objects.get(tournament=torneo).last_value, 12)
+        self.assertEqual(FolioSequence.objects.get(tournament=vacio).last_value, 0)
+        self.assertTrue(crear_equipo_prueba(torneo).folio.endswith("-0013"))
+        self.assertTrue(crear_equipo_prueba(vacio).folio.endswith("-0001"))
+
+
+class FolioConcurrenciaTests(TransactionTestCase):
+    """
+    Inscripciones simultáneas en dos torneos, cada una en su propio hilo (y
+    conexión): folios únicos y sin huecos por torneo. En SQLite necesita la
+    BD de pruebas en archivo (TEST NAME en settings); en memoria se salta.
+    """
+
+    HILOS = 8
+    POR_HILO = 25
+
+    def setUp(self):
+        if connection.vendor == "sqlite" and connection.is_in_memory_db():
+            self.skipTest("SQLite en memoria: una sola conexión a la BD de pruebas")
+
+    def test_folios_unicos_sin_huecos(self):
+        torneos = [Tournament.objects.create(name="A"), Tournament.objects.create(name="B")]
+        barrera = threading.Barrier(self.HILOS)
+        errores = []
+
+        def inscribir(n):
+            try:
+                barrera.wait()
+                for i in range(self.POR_HILO):
+                    crear_equipo_prueba(torneos[(n + i) % 2], nombre=f"H{n}-{i}")
+            except Exception as exc:  # se reporta abajo, en el hilo de la prueba
+                errores.append(exc)
+            finally:
+                connection.close()
+
+        hilos = [threading.Thread(target=inscribir, args=(n,)) for n in range(self.HILOS)]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+
+        self.assertEqual(errores, [])
+        total = self.HILOS * self.POR_HILO
+        for torneo in torneos:
+            self.assertEqual(consecutivos(torneo), list(range(1, total // 2 + 1)))
+
+
+# ===========================
+#  ÍNDICES
+# ===========================
+class IndicesTests(TestCase):
+    def test_consultas_frecuentes_usan_indice(self):
+        revisadas = list(revisar_consultas())
+        self.assertTrue(revisadas)
+        for descripcion, plan, tablas in revisadas:
+            with self.subTest(descripcion):
+                self.assertEqual(tablas, [], plan)
+
+    def test_bd_no_soportada_se_omite(self):
+        with mock.patch.object(connection, "vendor", "oracle"):
+            with self.assertWarns(RuntimeWarning):
+                self.assertEqual(list(revisar_consultas()), [])
+
+
+# ===========================
+#  MÉTRICAS
+# ===========================
+class MetricasTests(SimpleTestCase):
+    SERIE = 'liga_http_requests_total{vista="prueba_metricas",metodo="GET",codigo="200"}'
+
+    def setUp(self):
+        self.directorio = tempfile.mkdtemp(prefix="liga_life_metricas_")
+        self.addCleanup(shutil.rmtree, self.directorio, ignore_errors=True)
+        ajustes = override_settings(METRICAS_DIR=self.directorio)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+
+    def _archivo(self, nombre, valor):
+        with open(os.path.join(self.directorio, nombre), "w", encoding="utf-8") as f:
+            json.dump([[metricas.PETICIONES.nombre, ["prueba_metricas", "GET", "200"], valor]], f)
+
+    def _valor(self):
+        for linea in metricas.exponer().splitlines():
+            if linea.startswith(self.SERIE + " "):
+                return int(linea.rsplit(" ", 1)[1])
+        return None
+
+    def _archivos(self):
+        return sorted(n for n in os.listdir(self.directorio) if n.endswith(".json"))
+
+    def test_fusiona_procesos_terminados(self):
+        proceso = subprocess.Popen([sys.executable, "-c", "pass"])
+        proceso.wait()
+        self._archivo(f"{proceso.pid}-0a1b2c3d.json", 3)
+        # Proceso anterior con el mismo pid que este (pid reutilizado)
+        self._archivo(f"{os.getpid()}-ffffffff.json", 4)
+        # Proceso vivo: se suma pero no se fusiona
+        self._archivo(f"{os.getppid()}-12345678.json", 5)
+
+        self.assertEqual(self._valor(), 12)
+        self.assertEqual(self._valor(), 12)
+        archivos = self._archivos()
+        self.assertIn(metricas.ACUMULADO, archivos)
+        self.assertIn(f"{os.getppid()}-12345678.json", archivos)
+        self.assertNotIn(f"{proceso.pid}-0a1b2c3d.json", archivos)
+        self.assertNotIn(f"{os.getpid()}-ffffffff.json", archivos)
+
+    def test_fusionado_sin_borrar_no_cuenta_doble(self):
+        proceso = subprocess.Popen([sys.executable, "-c", "pass"])
+        proceso.wait()
+        nombre = f"{proceso.pid}-0a1b2c3d.json"
+        self._archivo(nombre, 3)
+        with mock.patch("os.remove"):
+            self.assertEqual(self._valor(), 3)
+        self.assertIn(nombre, self._archivos())
+        self.assertEqual(self._valor(), 3)
+        self.assertNotIn(nombre, self._archivos())
+
+    def test_desactivado_no_registra(self):
+        with mock.patch.object(metricas, "_activo", True), mock.patch.object(metricas, "_valores", {}):
+            metricas.desactivar()
+            metricas.PETICIONES.inc(vista="prueba_metricas", metodo="GET", codigo="200")
+            self.assertEqual(metricas._valores, {})
+            metricas.guardar()
+        self.assertEqual(self._archivos(), [])
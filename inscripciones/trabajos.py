@@ -0,0 +1,131 @@
+# inscripciones/trabajos.py
+"""
+Cola de trabajos para generar PDFs de credenciales en segundo plano.
+
+La tabla `PdfJob` hace de cola: la vista encola y el comando
+`procesar_credenciales` reclama y procesa. Para reclamar usamos un UPDATE
+condicional (status='PENDIENTE' -> 'EN_PROCESO'), que funciona igual en
+SQLite y PostgreSQL y evita que dos workers tomen el mismo trabajo.
+"""
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import PdfJob, Player
+from .utils import huella_credenciales, obtener_pdf_credenciales
+
+# Después de estos intentos fallidos ya no se vuelve a encolar solo
+MAX_INTENTOS = 3
+
+# Un trabajo EN_PROCESO más viejo que esto se considera abandonado (worker caído)
+TIEMPO_MAXIMO = timedelta(minutes=10)
+
+
+def encolar_credenciales(team, huella):
+    """
+    Devuelve el trabajo de esa versión del roster, creándolo si no existe.
+
+    Se llama solo cuando el PDF no está en el cache, así que un trabajo LISTO
+    significa que el archivo se borró después: se vuelve a encolar. Uno con
+    ERROR se reintenta mientras queden intentos.
+    """
+    job, _ = PdfJob.objects.get_or_create(team=team, fingerprint=huella)
+
+    if job.status == 'LISTO' or (job.status == 'ERROR' and job.attempts < MAX_INTENTOS):
+        _reencolar(job)
+    return job
+
+
+def consultar_credenciales(job_id, folio):
+    """
+    Trabajo para la página de espera, que consulta cada par de segundos: una
+    sola consulta por llave primaria (el folio solo confirma que es de ese
+    equipo). Uno con ERROR se reintenta mientras queden intentos; uno LISTO
+    no vuelve a la cola. None si no existe (ya se purgó).
+    """
+    job = PdfJob.objects.filter(pk=job_id, team__folio=folio).first()
+    if job is not None and job.status == 'ERROR' and job.attempts < MAX_INTENTOS:
+        _reencolar(job)
+    return job
+
+
+def _reencolar(job):
+    anterior = job.status
+    job.status = 'PENDIENTE'
+    job.queued_at = timezone.now()
+    PdfJob.objects.filter(pk=job.pk, status=anterior).update(
+        status=job.status, queued_at=job.queued_at
+    )
+
+
+def sin_worker(job):
+    """
+    True si el trabajo lleva más de CREDENCIALES_PDF_ESPERA_WORKER segundos
+    en la cola sin que un worker lo tome (worker caído o sin arrancar): la
+    descarga lo genera entonces en el proceso web.
+    """
+    limite = timezone.now() - timedelta(seconds=settings.CREDENCIALES_PDF_ESPERA_WORKER)
+    return job.status == 'PENDIENTE' and job.queued_at <= limite
+
+
+def marcar_listo(job):
+    """El proceso web ya generó el PDF: el worker no tiene que volver a hacerlo."""
+    PdfJob.objects.filter(pk=job.pk, status='PENDIENTE').update(
+        status='LISTO', finished_at=timezone.now()
+    )
+
+
+def reclamar_siguiente():
+    """Toma el trabajo pendiente más antiguo (o None si la cola está vacía)."""
+    while True:
+        job = PdfJob.objects.filter(status='PENDIENTE').order_by('created_at').first()
+        if job is None:
+            return None
+
+        tomado = PdfJob.objects.filter(pk=job.pk, status='PENDIENTE').update(
+            status='EN_PROCESO',
+            started_at=timezone.now(),
+            attempts=job.attempts + 1,
+        )
+        if tomado:
+            job.refresh_from_db()
+            return job
+        # Otro worker lo ganó: intentamos con el siguiente
+
+
+def procesar(job):
+    """Genera el PDF del trabajo (queda en el cache de credenciales)."""
+    team = job.team
+    jugadores = list(Player.objects.filter(team=team).order_by('jersey_number'))
+
+    try:
+        obtener_pdf_credenciales(team, jugadores, huella_credenciales(team, jugadores))
+    except Exception:
+        job.status = 'ERROR'
+        job.error = traceback.format_exc()
+    else:
+        job.status = 'LISTO'
+        job.error = ''
+
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'error', 'finished_at'])
+    return job
+
+
+def recuperar_abandonados():
+    """Regresa a la cola los trabajos que un worker dejó a medias."""
+    limite = timezone.now() - TIEMPO_MAXIMO
+    return PdfJob.objects.filter(status='EN_PROCESO', started_at__lt=limite).update(
+        status='PENDIENTE'
+    )
+
+
+def purgar_terminados(antiguedad=timedelta(days=1)):
+    """Borra los trabajos terminados hace más de `antiguedad`."""
+    limite = timezone.now() - antiguedad
+    borrados, _ = PdfJob.objects.filter(
+        status__in=['LISTO', 'ERROR'], finished_at__lt=limite
+    ).delete()
+    return borrados
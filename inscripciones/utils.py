@@ -1,14 +1,556 @@
+from reportlab.pdfbase import pdfdoc, pdfutils
 from reportlab.pdfgen import canvas
 from reportlab.lib.pagesizes import letter
 from reportlab.lib.units import mm
 import qrcode
 from io import BytesIO
+from collections import OrderedDict
 from django.conf import settings
-from reportlab.lib.utils import ImageReader
+from django.core.cache import cache
+from django.db.models import F
+from liga_life.metricas import DURACION_PDF
+from liga_life.tiempos import medir
+from .models import Team, Tournament
+from reportlab.lib.utils import ImageReader, _digester, open_for_read
+from PIL import Image
+import hashlib
 import os
-
-
-def generar_credenciales_pdf(team, jugadores, ruta_salida):
+import threading
+import time
+import zlib
+
+
+# URL pública que se imprime en el QR de cada credencial: lleva a la página
+# de solo lectura del roster (la que revisan los árbitros en la cancha)
+QR_BASE_URL = "https://liga-life.onrender.com"
+QR_RUTA = "/equipo/{folio}/roster/"
+
+
+# ===========================
+#  CACHE LRU EN MEMORIA
+# ===========================
+class LRUCache:
+    """
+    Cache acotado que desaloja lo menos usado recientemente.
+    Es por proceso (cada worker de gunicorn tiene el suyo) y seguro entre hilos.
+    """
+
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._data:
+                return default
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+# ===========================
+#  CACHE DE CÓDIGOS QR
+# ===========================
+_qr_cache = LRUCache(getattr(settings, "CREDENCIALES_QR_CACHE_SIZE", 256))
+
+
+def _qr_disk_path(payload):
+    """Ruta del PNG en disco para ese payload (o None si el cache en disco está apagado)."""
+    cache_dir = getattr(settings, "CREDENCIALES_QR_DISK_CACHE_DIR", None)
+    if not cache_dir:
+        return None
+    digest = hashlib.sha1(payload.encode("utf-8")).hexdigest()
+    return os.path.join(cache_dir, f"{digest}.png")
+
+
+def obtener_qr(payload):
+    """
+    Devuelve un ImageReader listo para dibujar con el QR de `payload`.
+
+    Primero busca en memoria, luego en disco (MEDIA_ROOT) y solo si no
+    existe en ningún lado genera el QR con `qrcode`. El cache guarda los
+    bytes del PNG y cada llamada arma su propio ImageReader: un reader
+    guarda estado (archivo abierto, datos decodificados) y no se puede
+    compartir entre hilos.
+    """
+    png = _qr_cache.get(payload)
+    if png is not None:
+        return ImageReader(BytesIO(png))
+
+    ruta = _qr_disk_path(payload)
+    if ruta and os.path.exists(ruta):
+        try:
+            with open(ruta, "rb") as fh:
+                png = fh.read()
+        except OSError:
+            png = None
+
+    if png is None:
+        buffer = BytesIO()
+        qrcode.make(payload).save(buffer, "PNG")
+        png = buffer.getvalue()
+
+        if ruta:
+            # Escritura atómica para que otro worker nunca lea un PNG a medias
+            try:
+                os.makedirs(os.path.dirname(ruta), exist_ok=True)
+                tmp = f"{ruta}.{os.getpid()}.tmp"
+                with open(tmp, "wb") as fh:
+                    fh.write(png)
+                os.replace(tmp, ruta)
+            except OSError:
+                pass
+
+    _qr_cache.set(payload, png)
+    return ImageReader(BytesIO(png))
+
+
+# ===========================
+#  FONDOS DE CREDENCIAL
+# ===========================
+FONDOS_DIR = os.path.join(settings.BASE_DIR, "static", "fondos")
+
+# Fondos disponibles por categoría
+FONDOS = {
+    "EMP": "empresarial_bg.png",
+    "LIB": "empresarial_bg.png",
+    "VET": "veteranos_bg.png",
+    "REF": "refuerzo_bg.png",
+}
+
+# {ruta: (mtime, fondo listo para drawImage)} -> se prepara una vez por worker
+_fondos_cache = {}
+_fondos_lock = threading.Lock()
+
+
+def _preparar_fondo(ruta, mtime):
+    """
+    Convierte el PNG del fondo a un JPEG en el cache de disco y devuelve su ruta.
+
+    reportlab incrusta un JPEG tal cual (DCTDecode) sin decodificarlo ni
+    volver a comprimirlo, así que el costo por PDF ya no depende del tamaño
+    del fondo. Los fondos no usan transparencia, no se pierde nada al aplanarlos.
+    Si no hay cache en disco (o no se puede escribir), regresa un ImageReader
+    ya decodificado.
+    """
+    cache_dir = getattr(settings, "CREDENCIALES_FONDOS_CACHE_DIR", None)
+    if cache_dir:
+        base = os.path.splitext(os.path.basename(ruta))[0]
+        destino = os.path.join(cache_dir, f"{base}-{int(mtime)}.jpg")
+        if os.path.exists(destino):
+            return destino
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            tmp = f"{destino}.{os.getpid()}.tmp"
+            with Image.open(ruta) as img:
+                img.convert("RGB").save(tmp, "JPEG", quality=92, subsampling=0)
+            os.replace(tmp, destino)
+            return destino
+        except OSError:
+            pass
+
+    reader = ImageReader(ruta)
+    reader.getRGBData()  # forzamos la decodificación aquí y no en cada PDF
+    return reader
+
+
+def obtener_fondo(cat):
+    """
+    Fondo de la categoría listo para `drawImage` (o None si no existe).
+    Si el archivo cambia en disco (otro mtime) se vuelve a preparar.
+    """
+    archivo = FONDOS.get(cat)
+    if not archivo:
+        return None
+
+    ruta = os.path.join(FONDOS_DIR, archivo)
+    try:
+        mtime = os.path.getmtime(ruta)
+    except OSError:
+        return None
+
+    with _fondos_lock:
+        cached = _fondos_cache.get(ruta)
+        if cached and cached[0] == mtime:
+            return cached[1]
+
+        fondo = _preparar_fondo(ruta, mtime)
+        _fondos_cache[ruta] = (mtime, fondo)
+        return fondo
+
+
+# ===========================
+#  CACHE DE PDFs DE CREDENCIALES
+# ===========================
+# Súbelo cuando cambie el diseño de la credencial: invalida todos los PDFs guardados
+CREDENCIALES_LAYOUT_VERSION = 2
+
+
+def _nombre_archivo(campo):
+    """Identidad de un FileField: el nombre es el hash del contenido."""
+    return getattr(campo, "name", None) or ""
+
+
+def huella_credenciales(team, jugadores):
+    """
+    Hash de todo lo que se imprime en las credenciales del equipo:
+    versión del diseño, fondos (por mtime), datos del equipo y de cada jugador
+    (incluyendo qué archivo de foto tiene). Si cualquier cosa cambia, cambia la huella.
+    """
+    h = hashlib.sha256()
+
+    def agregar(*valores):
+        for valor in valores:
+            h.update(str(valor).encode("utf-8"))
+            h.update(b"\x1f")
+        h.update(b"\x1e")
+
+    agregar("layout", CREDENCIALES_LAYOUT_VERSION, QR_BASE_URL, QR_RUTA)
+
+    for cat, archivo in sorted(FONDOS.items()):
+        try:
+            mtime = os.path.getmtime(os.path.join(FONDOS_DIR, archivo))
+        except OSError:
+            mtime = None
+        agregar("fondo", cat, archivo, mtime)
+
+    agregar("equipo", team.pk, team.folio, team.name, team.category)
+
+    for j in jugadores:
+        agregar(
+            "jugador",
+            j.pk,
+            j.jersey_number,
+            j.first_name,
+            j.last_name,
+            getattr(j, "curp", ""),
+            getattr(j, "imss_number", ""),
+            getattr(j, "is_reinforcement", False),
+            _nombre_archivo(j.photo),
+            _nombre_archivo(getattr(j, "photo_credencial", None)),
+        )
+
+    return h.hexdigest()
+
+
+def _dir_cache_credenciales(team_id):
+    cache_dir = getattr(settings, "CREDENCIALES_PDF_CACHE_DIR", None)
+    if not cache_dir:
+        return None
+    return os.path.join(cache_dir, str(team_id))
+
+
+def ruta_cache_credenciales(team, huella):
+    """Ruta del PDF ya generado para esa huella (o None si el cache está apagado)."""
+    directorio = _dir_cache_credenciales(team.pk)
+    if directorio is None:
+        return None
+    return os.path.join(directorio, f"{huella}.pdf")
+
+
+def obtener_pdf_credenciales(team, jugadores, huella=None):
+    """
+    Devuelve la ruta del PDF de credenciales del equipo, generándolo solo si
+    no existe uno con la misma huella. Los PDFs viejos del equipo se borran.
+    Regresa None si el cache está desactivado.
+    """
+    if huella is None:
+        huella = huella_credenciales(team, jugadores)
+
+    ruta = ruta_cache_credenciales(team, huella)
+    if ruta is None or os.path.exists(ruta):
+        return ruta
+
+    directorio = os.path.dirname(ruta)
+    os.makedirs(directorio, exist_ok=True)
+
+    # Generamos a un temporal y lo movemos: otro worker nunca ve un PDF a medias
+    tmp = f"{ruta}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        generar_credenciales_pdf(team, jugadores, tmp)
+        os.replace(tmp, ruta)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+    # Limpiamos versiones anteriores del mismo equipo
+    for nombre in os.listdir(directorio):
+        if nombre.endswith(".pdf") and nombre != os.path.basename(ruta):
+            try:
+                os.remove(os.path.join(directorio, nombre))
+            except OSError:
+                pass
+
+    return ruta
+
+
+def invalidar_cache_credenciales(team_id):
+    """Borra todos los PDFs guardados del equipo."""
+    directorio = _dir_cache_credenciales(team_id)
+    if directorio is None or not os.path.isdir(directorio):
+        return
+    for nombre in os.listdir(directorio):
+        try:
+            os.remove(os.path.join(directorio, nombre))
+        except OSError:
+            pass
+
+
+# ===========================
+#  CACHE DEL ROSTER PÚBLICO
+# ===========================
+def clave_cache_roster(equipo):
+    """
+    Clave de la página guardada, con lo que ya trae la consulta del folio: la
+    fila del equipo, su torneo y roster_version. Cualquier cambio da otra
+    clave, así que ningún worker sirve una página vieja aunque su cache (en
+    memoria, por worker) nunca se haya limpiado.
+    """
+    datos = [getattr(equipo, campo.attname) for campo in Team._meta.concrete_fields]
+    datos.append(str(equipo.tournament))
+    huella = hashlib.sha1(repr(datos).encode("utf-8")).hexdigest()
+    return f"roster_publico:{equipo.pk}:{huella}"
+
+
+def invalidar_cache_roster(team_id):
+    """
+    Sube roster_version del equipo: la página guardada deja de usarse en
+    todos los workers. Los cambios del equipo y del torneo ya cambian la
+    clave solos; esto es para los jugadores.
+    """
+    Team.objects.filter(pk=team_id).update(roster_version=F("roster_version") + 1)
+
+
+def invalidar_caches_roster(team_ids):
+    """invalidar_cache_roster() de varios equipos en un solo UPDATE."""
+    Team.objects.filter(pk__in=list(team_ids)).update(roster_version=F("roster_version") + 1)
+
+
+# ===========================
+#  CACHE DE TORNEOS ABIERTOS
+# ===========================
+CLAVE_TORNEOS_ABIERTOS = "torneos_abiertos"
+
+
+def torneos_abiertos():
+    """
+    Torneos con inscripción abierta (lista, en el orden del modelo). Sale del
+    cache; las señales de Tournament la descartan al guardar o borrar uno.
+    """
+    torneos = cache.get(CLAVE_TORNEOS_ABIERTOS)
+    if torneos is None:
+        torneos = list(Tournament.objects.filter(is_open=True))
+        cache.set(CLAVE_TORNEOS_ABIERTOS, torneos, settings.TORNEOS_ABIERTOS_CACHE_TIMEOUT)
+    return torneos
+
+
+def invalidar_cache_torneos():
+    cache.delete(CLAVE_TORNEOS_ABIERTOS)
+
+
+# ===========================
+#  PDF SIN ASCII85
+# ===========================
+# reportlab codifica imágenes y contenidos en ASCII85 por defecto: en Python
+# puro eso es la mayor parte del tiempo de un PDF y además lo hace 25% más
+# grande. La opción (rl_config.useA85) es global para todo el proceso, así
+# que CanvasBinario arma esos objetos sin ASCII85 solo en sus documentos y
+# el resto de reportlab sigue igual. Los PDFs binarios funcionan en
+# cualquier visor/impresora.
+# Usa detalles internos de reportlab (cómo nombra y registra las imágenes):
+# por eso la versión está fija en requirements.txt. Al actualizarla, correr
+# GenerarCredencialesTests.
+class _ImagenBinaria(pdfdoc.PDFImageXObject):
+    """Imagen del PDF sin ASCII85: el JPEG tal cual (DCTDecode) y lo demás con Flate."""
+
+    def __init__(self, name, source, mask=None):
+        super().__init__(name, mask=mask)  # arranca con la imagen de muestra
+        if hasattr(source, "jpeg_fh"):
+            self.loadImageFromSRC(source)
+            return
+
+        ext = os.path.splitext(source)[1].lower()
+        src = open_for_read(source)
+        try:
+            if not (ext in (".jpg", ".jpeg") and self.loadImageFromJPEG(src)):
+                self.loadImageFromRaw(src)
+        finally:
+            src.close()
+
+    def loadImageFromJPEG(self, imageFile):
+        try:
+            try:
+                info = pdfutils.readJPEGInfo(imageFile)
+            finally:
+                imageFile.seek(0)
+        except Exception:
+            return False
+
+        self.width, self.height = info[0], info[1]
+        self.bitsPerComponent = 8
+        self.colorSpace = {1: "DeviceGray", 3: "DeviceRGB"}.get(info[2], "DeviceCMYK")
+        if self.colorSpace == "DeviceCMYK":
+            self._dotrans = 1
+        self.streamContent = imageFile.read()
+        self._filters = ("DCTDecode",)
+        self.mask = None
+        return True
+
+    def loadImageFromSRC(self, im):
+        fp = im.jpeg_fh()
+        if fp:
+            self.loadImageFromJPEG(fp)
+            return
+
+        self.width, self.height = im.getSize()
+        self.streamContent = zlib.compress(im.getRGBData())
+        self._filters = ("FlateDecode",)
+        self.colorSpace = pdfdoc._mode2CS[im.mode]
+        self.bitsPerComponent = 8
+        self._checkTransparency(im)
+
+    def _checkTransparency(self, im):
+        # La máscara de transparencia también es una imagen: que sea binaria
+        if self.mask == "auto" and im._dataA:
+            self.mask = None
+            self._smask = _ImagenBinaria(_digester(im._dataA.getRGBData()), im._dataA)
+            self._smask._decode = [0, 1]
+        else:
+            super()._checkTransparency(im)
+
+
+class CanvasBinario(canvas.Canvas):
+    """
+    canvas.Canvas que escribe sus imágenes, páginas y forms sin ASCII85,
+    sin importar rl_config.useA85.
+    """
+
+    def drawImage(self, image, x, y, width=None, height=None, mask=None, **kwargs):
+        self._registrar_imagen(image, mask)
+        return super().drawImage(image, x, y, width, height, mask=mask, **kwargs)
+
+    def _registrar_imagen(self, image, mask):
+        # Mismo nombre que calcula Canvas.drawImage: si la imagen ya está
+        # registrada, reportlab solo la dibuja y no la vuelve a codificar
+        if isinstance(image, ImageReader):
+            datos = image.getRGBData()
+            alfa = image._dataA
+            datos_mascara = alfa.getRGBData() if mask == "auto" and alfa else str(mask)
+            if isinstance(datos_mascara, str):
+                datos_mascara = datos_mascara.encode("utf8")
+            nombre = _digester(datos + datos_mascara)
+        else:
+            nombre = _digester(f"{image}{mask}".encode("utf-8"))
+
+        registro = self._doc.getXObjectName(nombre)
+        if self._doc.idToObject.get(registro):
+            return
+
+        imagen = _ImagenBinaria(nombre, image, mask=mask)
+        self._setXObjects(imagen)
+        self._doc.Reference(imagen, registro)
+        self._doc.addForm(nombre, imagen)
+
+        smask = getattr(imagen, "_smask", None)
+        if smask:
+            registro_mascara = self._doc.getXObjectName(smask.name)
+            if self._doc.idToObject.get(registro_mascara):
+                imagen.smask = pdfdoc.PDFObjectReference(registro_mascara)
+            else:
+                self._setXObjects(smask)
+                imagen.smask = self._doc.Reference(smask, registro_mascara)
+            del imagen._smask
+
+    def endForm(self, **extra_attributes):
+        nombre = self._formData[0]
+        super().endForm(**extra_attributes)
+        self._contenido_binario(self._doc.idToObject[self._doc.getXObjectName(nombre)])
+
+    def showPage(self):
+        paginas = self._doc.Pages.pages
+        antes = len(paginas)
+        super().showPage()
+        for pagina in paginas[antes:]:
+            self._contenido_binario(pagina)
+
+    @staticmethod
+    def _contenido_binario(objeto):
+        # Con Contents ya armado (y sin `compression`) reportlab ya no elige
+        # los filtros al guardar
+        if objeto.compression and objeto.stream:
+            objeto.Contents = pdfdoc.PDFStream(content=objeto.stream, filters=[pdfdoc.PDFZCompress])
+            objeto.compression = 0
+
+
+class _Cronometro:
+    """
+    Acumula en `fases` el tiempo transcurrido entre marcas
+    (lo usa el benchmark). Si `fases` es None no mide nada.
+    """
+
+    def __init__(self, fases):
+        self.fases = fases
+        self._ultimo = time.perf_counter() if fases is not None else None
+
+    def marca(self, fase):
+        if self.fases is None:
+            return
+        ahora = time.perf_counter()
+        self.fases[fase] = self.fases.get(fase, 0.0) + (ahora - self._ultimo)
+        self._ultimo = ahora
+
+
+def generar_credenciales_pdf(team, jugadores, ruta_salida, fases=None):
+    """
+    Dibuja las credenciales del equipo (8 por hoja carta).
+
+    `ruta_salida` puede ser una ruta o cualquier objeto con `write()`
+    (BytesIO, SpooledTemporaryFile, respuesta HTTP...).
+    Si se pasa un dict en `fases`, se llena con segundos por fase
+    (fondo, foto, texto, qr, pagina, guardado).
+    """
+    generar_credenciales_lote_pdf([(team, jugadores)], ruta_salida, fases=fases)
+
+
+def generar_credenciales_lote_pdf(equipos, ruta_salida, fases=None):
+    """
+    Varios equipos en un solo PDF: `equipos` es una lista de (team, jugadores).
+    Cada equipo empieza en hoja nueva y los fondos se comparten entre todos.
+    """
+    inicio = time.perf_counter()
+    with medir("pdf"):
+        reloj = _Cronometro(fases)
+        c = CanvasBinario(ruta_salida, pagesize=letter)
+        plantillas = set()
+        for team, jugadores in equipos:
+            _dibujar_equipo(c, team, jugadores, plantillas, reloj)
+        c.save()
+        reloj.marca("guardado")
+    DURACION_PDF.observar(
+        time.perf_counter() - inicio,
+        tipo="equipo" if len(equipos) == 1 else "lote",
+    )
+
+
+def _dibujar_equipo(c, team, jugadores, plantillas, reloj):
+    """
+    Dibuja las hojas de credenciales de un equipo en el canvas `c`.
+    `plantillas` son los form XObject ya definidos en ese documento.
+    """
 
     # Hoja tamaño carta
     PAGE_WIDTH, PAGE_HEIGHT = letter
@@ -23,21 +565,6 @@ def generar_credenciales_pdf(team, jugadores, ruta_salida):
     X_GAP = 8 * mm
     Y_GAP = 8 * mm
 
-    # Fondos disponibles
-    fondos = {
-        "EMP": os.path.join(settings.BASE_DIR, "static", "fondos", "empresarial_bg.png"),
-        "LIB": os.path.join(settings.BASE_DIR, "static", "fondos", "empresarial_bg.png"),
-        "VET": os.path.join(settings.BASE_DIR, "static", "fondos", "veteranos_bg.png"),
-        "REF": os.path.join(settings.BASE_DIR, "static", "fondos", "refuerzo_bg.png"),
-    }
-
-    # Cache de imágenes
-    fondos_img = {
-        key: ImageReader(path)
-        for key, path in fondos.items()
-        if os.path.exists(path)
-    }
-
     # ---- helpers de categoría ----
     def es_refuerzo(j):
         """Detecta si el jugador es refuerzo según varios posibles campos."""
@@ -76,11 +603,48 @@ def generar_credenciales_pdf(team, jugadores, ruta_salida):
 
         base = getattr(team, "category", "EMP") or "EMP"
         base = str(base).upper()
-        if base in fondos:
+        if base in FONDOS:
             return base
         return "EMP"
 
-    c = canvas.Canvas(ruta_salida, pagesize=letter)
+    # ---- plantillas (fondo + borde) como form XObject ----
+    def plantilla_para(cat):
+        """
+        Devuelve el nombre del form XObject con el fondo y el borde punteado
+        de la categoría. Se define una sola vez por documento y cada
+        credencial solo lo referencia, en lugar de volver a dibujar la imagen.
+        """
+        nombre = f"credencial_{cat}"
+        if nombre in plantillas:
+            return nombre
+
+        c.beginForm(nombre, lowerx=0, lowery=0, upperx=CARD_WIDTH, uppery=CARD_HEIGHT)
+
+        # ===== FONDO =====
+        fondo_img = obtener_fondo(cat) or obtener_fondo("EMP")
+        if fondo_img is not None:
+            c.drawImage(fondo_img, 0, 0, CARD_WIDTH, CARD_HEIGHT, mask="auto")
+
+        # ===== LÍNEA PUNTEADA =====
+        c.setDash(2, 2)
+        c.rect(0, 0, CARD_WIDTH, CARD_HEIGHT)
+        c.setDash()
+
+        c.endForm()
+        plantillas.add(nombre)
+        return nombre
+
+    # El QR es el mismo para todo el equipo: lo pedimos una sola vez y lo
+    # dejamos como form XObject (drawImage vuelve a hashear la imagen cada vez)
+    QR_SIZE = 9 * mm
+    qr_payload = QR_BASE_URL + QR_RUTA.format(folio=team.folio)
+    qr_form = "qr_" + hashlib.sha1(qr_payload.encode("utf-8")).hexdigest()[:16]
+    if qr_form not in plantillas:
+        c.beginForm(qr_form, lowerx=0, lowery=0, upperx=QR_SIZE, uppery=QR_SIZE)
+        c.drawImage(obtener_qr(qr_payload), 0, 0, width=QR_SIZE, height=QR_SIZE, mask="auto")
+        c.endForm()
+        plantillas.add(qr_form)
+    reloj.marca("qr")
 
     col_count = 2  # 2 credenciales por fila
     row_count = 4  # 4 filas por página
@@ -101,22 +665,22 @@ def generar_credenciales_pdf(team, jugadores, ruta_salida):
                 x = X_MARGIN + col * (CARD_WIDTH + X_GAP)
                 y = PAGE_HEIGHT - Y_MARGIN - (fila + 1) * CARD_HEIGHT - fila * Y_GAP
 
-                # ===== FONDO (por jugador) =====
-                cat = categoria_para(jugador)
-                fondo_img = fondos_img.get(cat, fondos_img.get("EMP"))
-                c.drawImage(fondo_img, x, y, CARD_WIDTH, CARD_HEIGHT, mask="auto")
-
-                # ===== LÍNEA PUNTEADA =====
-                c.setDash(2, 2)
-                c.rect(x, y, CARD_WIDTH, CARD_HEIGHT)
-                c.setDash()
+                # ===== FONDO + BORDE (por jugador) =====
+                plantilla = plantilla_para(categoria_para(jugador))
+                c.saveState()
+                c.translate(x, y)
+                c.doForm(plantilla)
+                c.restoreState()
+                reloj.marca("fondo")
 
                 # ===== FOTO =====
                 # un poquito más ABAJO (vs el último ajuste)
-                if jugador.photo:
+                # Preferimos la derivada a tamaño credencial; si no existe, la original
+                foto = getattr(jugador, "photo_credencial", None) or jugador.photo
+                if foto:
                     try:
                         c.drawImage(
-                            jugador.photo.path,
+                            foto.path,
                             x + 9.5 * mm,      # misma X
                             y + 15.5 * mm,     # antes 15.5 mm → medio mm más abajo
                             width=15 * mm,
@@ -126,6 +690,7 @@ def generar_credenciales_pdf(team, jugadores, ruta_salida):
                         )
                     except Exception:
                         pass
+                reloj.marca("foto")
 
                 # ===== TEXTOS =====
                 valor_x = x + 39.5 * mm
@@ -181,29 +746,19 @@ def generar_credenciales_pdf(team, jugadores, ruta_salida):
                 c.rotate(90)  # se lee al derecho
                 c.drawCentredString(0, 0, folio_jugador)
                 c.restoreState()
+                reloj.marca("texto")
 
                 # ===== QR =====
-                qr_data = f"https://liga-life.onrender.com/equipo/{team.folio}/jugadores/"
-                qr_img = qrcode.make(qr_data)
-                buffer = BytesIO()
-                qr_img.save(buffer, "PNG")
-                buffer.seek(0)
-
-                QR_SIZE = 9 * mm
                 qr_x = x + (CARD_WIDTH - QR_SIZE) / 2 - 5 * mm
                 qr_y = y + 5 * mm
 
-                c.drawImage(
-                    ImageReader(buffer),
-                    qr_x,
-                    qr_y,
-                    width=QR_SIZE,
-                    height=QR_SIZE,
-                    mask="auto",
-                )
+                c.saveState()
+                c.translate(qr_x, qr_y)
+                c.doForm(qr_form)
+                c.restoreState()
+                reloj.marca("qr")
 
                 jugador_index += 1
 
         c.showPage()
-
-    c.save()
+        reloj.marca("pagina")
@@ -1,14 +1,41 @@
 # inscripciones/views.py
-from datetime import timedelta
+import hashlib
+import os
 import tempfile
 
-from django.http import FileResponse
+from django.conf import settings
+from django.contrib import messages
+from django.db import IntegrityError
+from django.core.cache import cache
+from django.http import FileResponse, HttpResponse, JsonResponse
 from django.shortcuts import render, redirect, get_object_or_404
-from django.utils import timezone
+from django.template.loader import render_to_string
+from django.urls import reverse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
 
-from .forms import TeamForm, PaymentProofForm, PlayerFormSet
-from .models import Tournament, Team, PaymentProof, Player
-from .utils import generar_credenciales_pdf
+from liga_life.metricas import TAMANO_SUBIDA
+
+from .forms import TeamForm, PaymentProofForm, PlayerFormSet, ImportarJugadoresForm
+from .importacion import ErrorImportacion, importar_jugadores as importar_roster
+from .models import Team, Player, normalizar_folio
+from .servicios import crear_equipo, guardar_roster, registrar_comprobante
+from .trabajos import consultar_credenciales, encolar_credenciales, marcar_listo, sin_worker
+from .utils import (
+    clave_cache_roster,
+    generar_credenciales_pdf,
+    huella_credenciales,
+    obtener_pdf_credenciales,
+    ruta_cache_credenciales,
+    torneos_abiertos,
+)
+
+
+def _medir_subidas(request):
+    """Tamaño de cada archivo recibido, por campo (players-3-photo cuenta como photo)."""
+    for nombre, archivos in request.FILES.lists():
+        for archivo in archivos:
+            TAMANO_SUBIDA.observar(archivo.size, campo=nombre.rsplit('-', 1)[-1])
 
 
 def redirect_to_inscripcion(request):
@@ -16,39 +43,31 @@ def redirect_to_inscripcion(request):
 
 
 def inscripcion(request):
-    open_tournaments = Tournament.objects.filter(is_open=True)
+    # Lista cacheada (se descarta al guardar/borrar un torneo): sin consultas
+    torneos = torneos_abiertos()
 
-    if not open_tournaments.exists():
+    if not torneos:
         return render(request, 'inscripciones/inscripcion_cerrada.html')
 
     if request.method == 'POST':
-        form = TeamForm(request.POST, request.FILES)
-        form.fields['tournament'].queryset = open_tournaments
+        _medir_subidas(request)
+        form = TeamForm(request.POST, request.FILES, torneos=torneos)
         if form.is_valid():
-            # No guardamos todavía, para poder llenar folio y fecha límite
-            team = form.save(commit=False)
-
-            # Fecha límite de pago: 7 días naturales a partir de hoy
-            team.payment_deadline = timezone.now().date() + timedelta(days=7)
-
-            # Generar folio tipo LIFE-<id_torneo>-<consecutivo>
-            if not team.folio:
-                consecutivo = (
-                    Team.objects.filter(tournament=team.tournament).count() + 1
-                )
-                team.folio = f"LIFE-{team.tournament.id:02d}-{consecutivo:04d}"
-
-            team.save()
+            # Folio y fecha límite (7 días) se asignan antes del único INSERT
+            team = crear_equipo(form)
             return render(
                 request,
                 'inscripciones/inscripcion_exitosa.html',
                 {'team': team},
             )
     else:
-        form = TeamForm()
-        form.fields['tournament'].queryset = open_tournaments
+        form = TeamForm(torneos=torneos)
 
-    return render(request, 'inscripciones/inscripcion.html', {'form': form})
+    return render(
+        request,
+        'inscripciones/inscripcion.html',
+        {'form': form, 'fragmentos_timeout': settings.FRAGMENTOS_CACHE_TIMEOUT},
+    )
 
 
 def subir_comprobante(request):
@@ -57,24 +76,16 @@ def subir_comprobante(request):
     Cada envío crea un NUEVO PaymentProof para tener historial.
     """
     if request.method == 'POST':
+        _medir_subidas(request)
         form = PaymentProofForm(request.POST, request.FILES)
         if form.is_valid():
-            folio = form.cleaned_data['folio'].strip().upper()
-
-            team = get_object_or_404(Team, folio=folio)
-
-            payment = form.save(commit=False)
-            payment.team = team
-            payment.save()
-
-            # Actualizar status del equipo cuando envían comprobante
-            team.status = 'COMPROBANTE_ENVIADO'
-            team.save(update_fields=['status'])
+            # Inserta el comprobante y actualiza el status del equipo juntos
+            comprobante = registrar_comprobante(form)
 
             return render(
                 request,
                 'inscripciones/comprobante_enviado.html',
-                {'team': team},
+                {'team': comprobante.team},
             )
     else:
         initial = {}
@@ -93,7 +104,7 @@ def registrar_jugadores(request, folio):
     - Si el equipo NO está aprobado => muestra pantalla de 'pendiente de aprobación'.
     - Si está aprobado => permite capturar / editar jugadores con un formset.
     """
-    team = get_object_or_404(Team, folio=folio)
+    team = get_object_or_404(Team, folio=normalizar_folio(folio))
 
     # Si no está aprobado, bloqueamos el registro
     if team.status != 'APROBADO':
@@ -106,12 +117,22 @@ def registrar_jugadores(request, folio):
     guardado = False
 
     if request.method == 'POST':
+        _medir_subidas(request)
         formset = PlayerFormSet(request.POST, request.FILES, instance=team)
         if formset.is_valid():
-            formset.save()
-            guardado = True
-            # recargamos formset con los datos ya guardados
-            formset = PlayerFormSet(instance=team)
+            try:
+                guardar_roster(formset)
+            except IntegrityError:
+                # Otra captura del mismo equipo se guardó mientras tanto
+                messages.error(
+                    request,
+                    "Otro registro del equipo se guardó al mismo tiempo y hay un número "
+                    "o nombre repetido. Revisa la lista y vuelve a guardar.",
+                )
+            else:
+                guardado = True
+                # recargamos formset con los datos ya guardados
+                formset = PlayerFormSet(instance=team)
     else:
         formset = PlayerFormSet(instance=team)
 
@@ -122,24 +143,217 @@ def registrar_jugadores(request, folio):
             'team': team,
             'formset': formset,
             'guardado': guardado,
+            'importar_form': ImportarJugadoresForm(),
+        },
+    )
+
+
+# Más que suficiente para 20 jugadores (encabezado, filas en blanco...)
+MAX_FILAS_IMPORTACION = 100
+
+
+def importar_jugadores(request, folio):
+    """
+    Carga el roster desde un CSV/XLSX con las mismas reglas que el formulario
+    de jugadores. Si alguna fila tiene errores no se guarda nada y se muestran
+    en la página de registro.
+    """
+    team = get_object_or_404(Team, folio=normalizar_folio(folio))
+
+    if request.method != 'POST' or team.status != 'APROBADO':
+        return redirect('registrar_jugadores', folio=team.folio)
+
+    _medir_subidas(request)
+    form = ImportarJugadoresForm(request.POST, request.FILES)
+    errores = []
+    if form.is_valid():
+        archivo = form.cleaned_data['archivo']
+        try:
+            resultado = importar_roster(
+                archivo, archivo.name, team=team, max_filas=MAX_FILAS_IMPORTACION
+            )
+        except ErrorImportacion as exc:
+            errores = [str(exc)]
+        except IntegrityError:
+            errores = [
+                "Otro registro del equipo se guardó al mismo tiempo y hay un número "
+                "o nombre repetido. Revisa la lista y vuelve a importar."
+            ]
+        else:
+            errores = [
+                f"Fila {fila}: {mensaje}" if fila else mensaje
+                for _folio, fila, mensaje in resultado['errores']
+            ]
+
+    if form.is_valid() and not errores:
+        cuenta = resultado['equipos'].get(team.folio, {})
+        messages.success(
+            request,
+            f"Archivo importado: {cuenta.get('creados', 0)} jugadores nuevos, "
+            f"{cuenta.get('actualizados', 0)} actualizados.",
+        )
+        return redirect('registrar_jugadores', folio=team.folio)
+
+    return render(
+        request,
+        'inscripciones/registro_jugadores.html',
+        {
+            'team': team,
+            'formset': PlayerFormSet(instance=team),
+            'guardado': False,
+            'importar_form': form,
+            'importar_errores': errores,
         },
     )
 
 
+def roster_equipo(request, folio):
+    """
+    Roster de solo lectura del equipo: es a donde lleva el QR de la credencial
+    y lo consultan los árbitros en la cancha.
+
+    La página ya armada se guarda en el cache con una clave que sale del
+    equipo, su torneo y su roster_version (ver clave_cache_roster): si algo
+    cambió, no se encuentra y se vuelve a armar. Se sirve con ETag: con cache
+    caliente cuesta una consulta (el folio) y si el teléfono ya la tiene, un 304.
+    """
+    equipo = get_object_or_404(
+        Team.objects.select_related('tournament'), folio=normalizar_folio(folio)
+    )
+
+    clave = clave_cache_roster(equipo)
+    guardado = cache.get(clave)
+    if guardado is None:
+        jugadores = Player.objects.filter(team=equipo).order_by('jersey_number')
+        html = render_to_string(
+            'jugadores_equipo.html',
+            {'equipo': equipo, 'jugadores': jugadores},
+        )
+        etag = '"%s"' % hashlib.sha1(html.encode('utf-8')).hexdigest()
+        guardado = (etag, html)
+        cache.set(clave, guardado, settings.CREDENCIALES_ROSTER_CACHE_TIMEOUT)
+
+    etag, html = guardado
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = HttpResponse(html)
+    response['ETag'] = etag
+    # Es pública, pero el teléfono siempre revalida (un 304 no trae cuerpo)
+    patch_cache_control(response, public=True, no_cache=True)
+    return response
+
+
+def _abrir_pdf(ruta):
+    """
+    Abre el PDF ya generado, o None si no existe. Se abre en lugar de
+    preguntar si existe: otro proceso puede borrarlo en cualquier momento
+    (señales, limpieza de huellas viejas) y un archivo abierto ya no se pierde.
+    """
+    if ruta is None:
+        return None
+    try:
+        return open(ruta, "rb")
+    except FileNotFoundError:
+        return None
+
+
 def descargar_credenciales(request, folio):
     """
     Genera y devuelve el PDF de credenciales para el equipo con ese folio.
+
+    El PDF se guarda por huella de contenido: mientras no cambie el equipo,
+    sus jugadores o el diseño, se sirve el mismo archivo (con ETag y
+    Last-Modified para que el navegador pueda recibir un 304).
     """
-    equipo = get_object_or_404(Team, folio=folio)
+    equipo = get_object_or_404(Team, folio=normalizar_folio(folio))
     # Ordenados por número de playera
-    jugadores = Player.objects.filter(team=equipo).order_by("jersey_number")
+    jugadores = list(Player.objects.filter(team=equipo).order_by("jersey_number"))
+
+    huella = huella_credenciales(equipo, jugadores)
+    etag = f'"{huella}"'
 
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp:
-        generar_credenciales_pdf(equipo, jugadores, tmp.name)
-        tmp.seek(0)
+    ruta = ruta_cache_credenciales(equipo, huella)
+    archivo = _abrir_pdf(ruta)
+    last_modified = int(os.fstat(archivo.fileno()).st_mtime) if archivo else None
 
-        return FileResponse(
-            open(tmp.name, "rb"),
+    no_modificado = get_conditional_response(
+        request, etag=etag, last_modified=last_modified
+    )
+    if no_modificado is not None:
+        if archivo:
+            archivo.close()
+        no_modificado["ETag"] = etag
+        return no_modificado
+
+    job = None
+    if settings.CREDENCIALES_PDF_ASYNC and ruta and archivo is None:
+        job = encolar_credenciales(equipo, huella)
+        if not sin_worker(job):
+            # No está generado: lo hace el worker y el navegador espera en otra página
+            return render(
+                request,
+                'inscripciones/credenciales_pendiente.html',
+                {'team': equipo, 'job': job},
+                status=202,
+            )
+        # Ningún worker lo tomó a tiempo: lo generamos aquí mismo
+
+    if archivo is None and ruta is not None:
+        # Si lo borran entre que se genera y se abre, se genera otra vez
+        for _intento in range(2):
+            archivo = _abrir_pdf(obtener_pdf_credenciales(equipo, jugadores, huella))
+            if archivo is not None:
+                break
+        if job is not None and archivo is not None:
+            marcar_listo(job)
+
+    if archivo is None:
+        # Cache desactivado (o el archivo se sigue borrando): generamos en
+        # memoria (solo se va a disco si el PDF pasa del umbral) y el archivo
+        # se borra al cerrar la respuesta
+        buffer = tempfile.SpooledTemporaryFile(
+            max_size=settings.CREDENCIALES_PDF_SPOOL_MAX_SIZE
+        )
+        generar_credenciales_pdf(equipo, jugadores, buffer)
+        tamano = buffer.tell()
+        buffer.seek(0)
+
+        response = FileResponse(
+            buffer,
+            content_type="application/pdf",
+            filename=f"credenciales_{equipo.folio}.pdf",
+        )
+        response["Content-Length"] = str(tamano)
+    else:
+        response = FileResponse(
+            archivo,
             content_type="application/pdf",
             filename=f"credenciales_{equipo.folio}.pdf",
         )
+        response["Last-Modified"] = http_date(os.fstat(archivo.fileno()).st_mtime)
+
+    response["ETag"] = etag
+    # El navegador puede guardarlo, pero siempre debe revalidar con el ETag
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def estado_credenciales(request, folio, job_id):
+    """
+    Estado del trabajo que encoló la descarga, en JSON, para la página de
+    espera: {"estado": "listo" | "pendiente" | "error", "url": <descarga>}.
+
+    Una sola consulta (ver consultar_credenciales); no relee el roster. Si el
+    archivo ya no está o el roster cambió, la descarga lo resuelve: lo vuelve
+    a encolar o lo genera.
+    """
+    folio = normalizar_folio(folio)
+    url = reverse('credenciales_pdf', args=[folio])
+
+    job = consultar_credenciales(job_id, folio)
+    if job is None or job.status == 'LISTO' or sin_worker(job):
+        # Purgado, terminado o sin worker: la descarga lo sirve o lo genera
+        return JsonResponse({'estado': 'listo', 'url': url})
+
+    estado = 'error' if job.status == 'ERROR' else 'pendiente'
+    return JsonResponse({'estado': estado, 'url': url})
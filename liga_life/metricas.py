@@ -0,0 +1,374 @@
+# liga_life/metricas.py
+"""
+Métricas en formato de texto de Prometheus, expuestas en /metrics.
+
+Cada proceso (worker de gunicorn, worker de credenciales, comando) acumula
+sus contadores e histogramas en memoria y cada METRICAS_INTERVALO segundos
+los guarda en METRICAS_DIR/<pid>-<token>.json (escritura atómica; el token
+distingue a dos procesos que reciben el mismo pid). /metrics suma los
+archivos de todos los procesos, así que da lo mismo qué worker atiende la
+petición.
+
+Son acumulados: cuando un proceso termina, el siguiente scrape suma su
+archivo a METRICAS_DIR/acumulado.json y lo borra, así los contadores nunca
+bajan y el directorio no crece con cada worker reciclado. Para saber si un
+proceso terminó se revisa su pid, por eso METRICAS_DIR debe ser local al
+host (no compartido entre máquinas o contenedores).
+
+Los procesos auxiliares (pool de la exportación) llaman a desactivar():
+no registran ni escriben nada.
+
+Uso:
+
+    from liga_life.metricas import TAMANO_SUBIDA
+    TAMANO_SUBIDA.observar(archivo.size, campo="comprobante")
+"""
+import atexit
+import contextlib
+import hmac
+import json
+import math
+import os
+import re
+import secrets
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin bloqueo entre procesos, no se fusiona nada
+    fcntl = None
+
+from django.conf import settings
+from django.http import Http404, HttpResponse
+
+
+_lock = threading.Lock()
+# {(nombre, (valores de etiquetas...)): número o [buckets..., suma, cuenta]}
+_valores = {}
+_metricas = {}
+_temporizador = None
+_activo = True
+_archivo_propio = None  # (pid, nombre del archivo)
+
+
+class _Metrica:
+    tipo = None
+
+    def __init__(self, nombre, ayuda, etiquetas=()):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        _metricas[nombre] = self
+
+    def _clave(self, etiquetas):
+        return (self.nombre, tuple(str(etiquetas.get(e, "")) for e in self.etiquetas))
+
+
+class Contador(_Metrica):
+    tipo = "counter"
+
+    def inc(self, valor=1, **etiquetas):
+        clave = self._clave(etiquetas)
+        with _lock:
+            if not _activo:
+                return
+            _valores[clave] = _valores.get(clave, 0) + valor
+        _programar_guardado()
+
+
+class Histograma(_Metrica):
+    tipo = "histogram"
+
+    def __init__(self, nombre, ayuda, etiquetas=(), buckets=()):
+        super().__init__(nombre, ayuda, etiquetas)
+        self.buckets = tuple(sorted(buckets))
+
+    def observar(self, valor, **etiquetas):
+        clave = self._clave(etiquetas)
+        with _lock:
+            if not _activo:
+                return
+            # Conteo por bucket (no acumulado); el acumulado se arma al exponer
+            datos = _valores.setdefault(clave, [0] * len(self.buckets) + [0, 0])
+            for i, limite in enumerate(self.buckets):
+                if valor <= limite:
+                    datos[i] += 1
+                    break
+            datos[-2] += valor
+            datos[-1] += 1
+        _programar_guardado()
+
+
+# ===========================
+#  MÉTRICAS DE LA LIGA
+# ===========================
+BUCKETS_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+BUCKETS_BYTES = tuple(2 ** n * 1024 for n in range(4, 16))  # 16 KB ... 32 MB
+
+DURACION_PETICION = Histograma(
+    "liga_http_request_duration_seconds",
+    "Duración de las peticiones por nombre de URL.",
+    ("vista", "metodo"),
+    BUCKETS_SEGUNDOS,
+)
+PETICIONES = Contador(
+    "liga_http_requests_total",
+    "Peticiones por nombre de URL y código de respuesta.",
+    ("vista", "metodo", "codigo"),
+)
+DURACION_PDF = Histograma(
+    "liga_pdf_render_seconds",
+    "Tiempo de dibujar un PDF de credenciales (equipo o lote).",
+    ("tipo",),
+    (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+)
+TAMANO_SUBIDA = Histograma(
+    "liga_upload_size_bytes",
+    "Tamaño de los archivos recibidos, por campo (como llegan, antes de recomprimir).",
+    ("campo",),
+    BUCKETS_BYTES,
+)
+TRANSICIONES_ESTADO = Contador(
+    "liga_team_status_transitions_total",
+    "Cambios de estado de los equipos.",
+    ("desde", "hacia"),
+)
+
+
+# ===========================
+#  ARCHIVOS POR PROCESO
+# ===========================
+ACUMULADO = "acumulado.json"
+_ARCHIVO_PROCESO = re.compile(r"^(\d+)(?:-[0-9a-f]+)?\.json$")
+
+
+def _directorio():
+    return settings.METRICAS_DIR
+
+
+def _nombre_propio():
+    """<pid>-<token>.json de este proceso (uno nuevo si es un fork)."""
+    global _archivo_propio
+    pid = os.getpid()
+    if _archivo_propio is None or _archivo_propio[0] != pid:
+        _archivo_propio = (pid, f"{pid}-{secrets.token_hex(4)}.json")
+    return _archivo_propio[1]
+
+
+def desactivar():
+    """
+    Para procesos auxiliares (p. ej. el pool de la exportación): no registran
+    ni guardan nada. Descarta lo heredado con fork, que ya guarda el padre.
+    """
+    global _activo
+    with _lock:
+        _activo = False
+        _valores.clear()
+
+
+def _programar_guardado():
+    """Guarda este proceso dentro de METRICAS_INTERVALO segundos (un solo timer a la vez)."""
+    global _temporizador
+    if settings.METRICAS_INTERVALO <= 0:
+        guardar()
+        return
+    with _lock:
+        if _temporizador is not None:
+            return
+        _temporizador = threading.Timer(settings.METRICAS_INTERVALO, guardar)
+        _temporizador.daemon = True
+        _temporizador.start()
+
+
+def _escribir(ruta, datos):
+    tmp = f"{ruta}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(datos, f)
+    os.replace(tmp, ruta)
+
+
+def _leer(ruta):
+    try:
+        with open(ruta, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def guardar():
+    """Escribe los valores de este proceso en METRICAS_DIR/<pid>-<token>.json."""
+    global _temporizador
+    with _lock:
+        _temporizador = None
+        if not _activo:
+            return
+        # Copia de los histogramas: se siguen modificando mientras se escribe
+        datos = [
+            [nombre, list(etiquetas), list(valor) if isinstance(valor, list) else valor]
+            for (nombre, etiquetas), valor in _valores.items()
+        ]
+    if not datos:
+        return
+
+    directorio = _directorio()
+    os.makedirs(directorio, exist_ok=True)
+    _escribir(os.path.join(directorio, _nombre_propio()), datos)
+
+
+atexit.register(guardar)
+
+
+def _sumar(total, datos):
+    for nombre, etiquetas, valor in datos:
+        clave = (nombre, tuple(etiquetas))
+        anterior = total.get(clave)
+        if anterior is None:
+            total[clave] = valor
+        elif isinstance(valor, list):
+            total[clave] = [a + b for a, b in zip(anterior, valor)]
+        else:
+            total[clave] = anterior + valor
+    return total
+
+
+def _proceso_terminado(nombre_archivo):
+    encontrado = _ARCHIVO_PROCESO.match(nombre_archivo)
+    if not encontrado:
+        return False
+    pid = int(encontrado.group(1))
+    if pid == os.getpid():
+        # Mismo pid, otro token: un proceso anterior que ya terminó
+        return nombre_archivo != _nombre_propio()
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return True
+    except OSError:  # existe, pero es de otro usuario
+        return False
+    return False
+
+
+@contextlib.contextmanager
+def _bloqueo(directorio):
+    """Un scrape a la vez puede fusionar (si no, dos sumarían el mismo archivo)."""
+    with open(os.path.join(directorio, ".bloqueo"), "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _fusionar_terminados(directorio, nombres, acumulado):
+    """
+    Suma a `acumulado` los archivos de procesos que ya terminaron y los borra.
+    "fusionados" recuerda los nombres ya sumados hasta confirmar que se
+    borraron: si el borrado falla, no se cuentan dos veces.
+    """
+    fusionados = [n for n in acumulado["fusionados"] if n in nombres]
+    nuevos = [n for n in nombres if n not in fusionados and _proceso_terminado(n)]
+    if nuevos or fusionados != acumulado["fusionados"]:
+        total = _sumar({}, acumulado["valores"])
+        for nombre_archivo in nuevos:
+            datos = _leer(os.path.join(directorio, nombre_archivo))
+            if datos is not None:
+                _sumar(total, datos)
+        acumulado = {
+            "fusionados": fusionados + nuevos,
+            "valores": [
+                [nombre, list(etiquetas), valor] for (nombre, etiquetas), valor in total.items()
+            ],
+        }
+        _escribir(os.path.join(directorio, ACUMULADO), acumulado)
+
+    for nombre_archivo in acumulado["fusionados"]:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(os.path.join(directorio, nombre_archivo))
+    return acumulado
+
+
+def _leer_todos():
+    """Suma el acumulado y los archivos de los procesos vivos: {(nombre, etiquetas): valor}."""
+    directorio = _directorio()
+    if not os.path.isdir(directorio):
+        return {}
+
+    fusionar = fcntl is not None and os.name == "posix"
+    with _bloqueo(directorio) if fusionar else contextlib.nullcontext():
+        acumulado = _leer(os.path.join(directorio, ACUMULADO)) or {"fusionados": [], "valores": []}
+        nombres = [n for n in os.listdir(directorio) if _ARCHIVO_PROCESO.match(n)]
+        if fusionar:
+            acumulado = _fusionar_terminados(directorio, nombres, acumulado)
+
+        total = _sumar({}, acumulado["valores"])
+        for nombre_archivo in nombres:
+            if nombre_archivo in acumulado["fusionados"]:
+                continue
+            datos = _leer(os.path.join(directorio, nombre_archivo))
+            if datos is not None:
+                _sumar(total, datos)
+    return total
+
+
+# ===========================
+#  FORMATO DE TEXTO
+# ===========================
+def _escapar(valor):
+    return valor.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _etiquetas(nombres, valores, extra=()):
+    pares = [f'{n}="{_escapar(v)}"' for n, v in zip(nombres, valores)]
+    pares += [f'{n}="{v}"' for n, v in extra]
+    return "{" + ",".join(pares) + "}" if pares else ""
+
+
+def _numero(valor):
+    if isinstance(valor, float) and math.isinf(valor):
+        return "+Inf"
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+def exponer():
+    """Texto en formato de exposición de Prometheus (versión 0.0.4)."""
+    guardar()
+    valores = _leer_todos()
+
+    lineas = []
+    for metrica in _metricas.values():
+        lineas.append(f"# HELP {metrica.nombre} {metrica.ayuda}")
+        lineas.append(f"# TYPE {metrica.nombre} {metrica.tipo}")
+        series = sorted(
+            (etiquetas, valor) for (nombre, etiquetas), valor in valores.items()
+            if nombre == metrica.nombre
+        )
+        for etiquetas, valor in series:
+            if metrica.tipo == "counter":
+                lineas.append(f"{metrica.nombre}{_etiquetas(metrica.etiquetas, etiquetas)} {_numero(valor)}")
+                continue
+
+            acumulado = 0
+            for limite, cuenta in zip(metrica.buckets + (math.inf,), valor[:-2] + [None]):
+                # El último bucket (+Inf) es el total de observaciones
+                acumulado = valor[-1] if cuenta is None else acumulado + cuenta
+                extra = [("le", _numero(float(limite)))]
+                lineas.append(
+                    f"{metrica.nombre}_bucket{_etiquetas(metrica.etiquetas, etiquetas, extra)} {acumulado}"
+                )
+            lineas.append(f"{metrica.nombre}_sum{_etiquetas(metrica.etiquetas, etiquetas)} {_numero(valor[-2])}")
+            lineas.append(f"{metrica.nombre}_count{_etiquetas(metrica.etiquetas, etiquetas)} {valor[-1]}")
+    return "\n".join(lineas) + "\n"
+
+
+def vista_metricas(request):
+    """
+    /metrics: con `Authorization: Bearer <METRICAS_TOKEN>` (para el scraper)
+    o con sesión de staff. Para cualquier otro, la URL no existe.
+    """
+    token = settings.METRICAS_TOKEN
+    encabezado = request.headers.get("Authorization", "")
+    con_token = bool(token) and hmac.compare_digest(encabezado, f"Bearer {token}")
+    if not (con_token or request.user.is_staff):
+        raise Http404
+
+    return HttpResponse(exponer(), content_type="text/plain; version=0.0.4; charset=utf-8")
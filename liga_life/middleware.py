@@ -0,0 +1,121 @@
+# liga_life/middleware.py
+import logging
+import time
+
+from django.conf import settings
+from django.db import connection
+
+from . import tiempos
+from .metricas import DURACION_PETICION, PETICIONES
+
+logger = logging.getLogger("liga_life.tiempos")
+
+# Cualquier otro método cuenta como "otro" (cada valor sería una serie nueva)
+METODOS = {"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"}
+
+# Control de transacciones: no se cuentan como consultas. Dependen del motor
+# y del contexto (BEGIN en SQLite, SAVEPOINT/RELEASE dentro de un TestCase),
+# así el presupuesto de una vista es el mismo en producción y en las pruebas.
+CONTROL_TRANSACCION = ("BEGIN", "COMMIT", "ROLLBACK", "SAVEPOINT", "RELEASE SAVEPOINT")
+
+
+class PresupuestoConsultasExcedido(AssertionError):
+    """La vista hizo más consultas que su presupuesto (solo en modo estricto)."""
+
+
+class TiemposPeticionMiddleware:
+    """
+    Mide cada petición: tiempo total, tiempo y número de consultas a la BD,
+    render de plantillas y de PDFs (ver liga_life.tiempos).
+
+    - Con TIEMPOS_SERVER_TIMING, lo reporta en el encabezado Server-Timing
+      (lo muestran las herramientas del navegador y lo lee el ensayo de carga).
+    - Las peticiones de más de TIEMPOS_LENTA_MS se registran en el log con
+      sus consultas más lentas.
+    - TIEMPOS_PRESUPUESTOS = {nombre de la URL: máximo de consultas}: si una
+      vista se pasa, se avisa en el log; con TIEMPOS_PRESUPUESTO_ESTRICTO
+      (para pruebas) se lanza PresupuestoConsultasExcedido.
+    - La duración y el código de respuesta van a las métricas de /metrics
+      (ver liga_life.metricas).
+
+    En respuestas que se generan al enviarse (StreamingHttpResponse) solo se
+    mide hasta que la vista regresa la respuesta.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with tiempos.registrar() as registro:
+            # La conexión es por hilo: cada petición mide solo sus consultas
+            with connection.execute_wrapper(self._medir_consulta(registro)):
+                response = self.get_response(request)
+            total = registro.total
+
+        # Por nombre de URL (no por ruta: cada folio sería una serie distinta)
+        match = getattr(request, "resolver_match", None)
+        vista = (match.view_name if match else None) or "sin_ruta"
+
+        metodo = request.method if request.method in METODOS else "otro"
+        DURACION_PETICION.observar(total, vista=vista, metodo=metodo)
+        PETICIONES.inc(vista=vista, metodo=metodo, codigo=response.status_code)
+
+        self._revisar_presupuesto(vista, registro)
+
+        if total * 1000 >= settings.TIEMPOS_LENTA_MS:
+            self._registrar_lenta(request, vista, total, registro)
+
+        if settings.TIEMPOS_SERVER_TIMING:
+            response["Server-Timing"] = self._server_timing(total, registro)
+        return response
+
+    @staticmethod
+    def _medir_consulta(registro):
+        def medir(execute, sql, params, many, context):
+            if sql.lstrip().upper().startswith(CONTROL_TRANSACCION):
+                return execute(sql, params, many, context)
+            inicio = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                registro.consultas.append((time.perf_counter() - inicio, sql))
+
+        return medir
+
+    @staticmethod
+    def _server_timing(total, registro):
+        metricas = [
+            f"total;dur={total * 1000:.1f}",
+            f'db;dur={registro.tiempo_bd * 1000:.1f};desc="{len(registro.consultas)} consultas"',
+        ]
+        for fase, segundos in registro.fases.items():
+            metricas.append(f"{fase};dur={segundos * 1000:.1f}")
+        return ", ".join(metricas)
+
+    @staticmethod
+    def _revisar_presupuesto(vista, registro):
+        presupuesto = settings.TIEMPOS_PRESUPUESTOS.get(vista)
+        if presupuesto is None or len(registro.consultas) <= presupuesto:
+            return
+
+        mensaje = (
+            f"{vista}: {len(registro.consultas)} consultas, "
+            f"el presupuesto es {presupuesto}"
+        )
+        if settings.TIEMPOS_PRESUPUESTO_ESTRICTO:
+            raise PresupuestoConsultasExcedido(mensaje)
+        logger.warning(mensaje)
+
+    @staticmethod
+    def _registrar_lenta(request, vista, total, registro):
+        fases = "".join(
+            f", {fase} {segundos * 1000:.0f} ms" for fase, segundos in registro.fases.items()
+        )
+        lineas = [
+            f"Petición lenta: {request.method} {request.path} ({vista}) "
+            f"{total * 1000:.0f} ms, BD {registro.tiempo_bd * 1000:.0f} ms "
+            f"en {len(registro.consultas)} consultas{fases}"
+        ]
+        for segundos, sql in registro.consultas_mas_lentas():
+            lineas.append(f"  {segundos * 1000:7.1f} ms  {sql[:300]}")
+        logger.warning("\n".join(lineas))
@@ -1,4 +1,5 @@
 import os
+import tempfile
 from pathlib import Path
 
 import dj_database_url  # 👈 IMPORTANTE
@@ -34,6 +35,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "liga_life.middleware.TiemposPeticionMiddleware",  # primero: mide todo lo demás
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",  # para servir estáticos
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -48,7 +50,8 @@ ROOT_URLCONF = "liga_life.urls"
 
 TEMPLATES = [
     {
-        "BACKEND": "django.template.backends.django.DjangoTemplates",
+        # El de Django, midiendo el tiempo de render (ver liga_life.tiempos)
+        "BACKEND": "liga_life.tiempos.PlantillasMedidas",
         "DIRS": [],
         "APP_DIRS": True,
         "OPTIONS": {
@@ -82,10 +85,50 @@ else:
         "default": {
             "ENGINE": "django.db.backends.sqlite3",
             "NAME": BASE_DIR / "db.sqlite3",
+            # BD de pruebas en archivo (no en memoria): admite varias
+            # conexiones, así las pruebas de concurrencia también corren aquí
+            "TEST": {"NAME": BASE_DIR / "test_db.sqlite3"},
         }
     }
 
 
+# ================== CACHE ==================
+# CACHE_BACKEND:
+# - "memoria" (default): en memoria de cada proceso. Con varios workers cada
+#   uno tiene su copia y las invalidaciones no llegan a los demás (solo
+#   expiran por tiempo); sirve en local o con un solo worker.
+# - "archivo": directorio CACHE_UBICACION, compartido por los workers del
+#   mismo servidor.
+# - "bd": tabla CACHE_UBICACION en la base de datos, compartida por todos;
+#   se crea con `python manage.py createcachetable`.
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memoria")
+CACHE_BACKENDS = {
+    "memoria": ("django.core.cache.backends.locmem.LocMemCache", "liga-life"),
+    "archivo": (
+        "django.core.cache.backends.filebased.FileBasedCache",
+        os.path.join(tempfile.gettempdir(), "liga_life_cache"),
+    ),
+    "bd": ("django.core.cache.backends.db.DatabaseCache", "liga_life_cache"),
+}
+if CACHE_BACKEND not in CACHE_BACKENDS:
+    raise ValueError(f"CACHE_BACKEND debe ser uno de {sorted(CACHE_BACKENDS)}")
+
+CACHES = {
+    "default": {
+        "BACKEND": CACHE_BACKENDS[CACHE_BACKEND][0],
+        "LOCATION": os.getenv("CACHE_UBICACION", CACHE_BACKENDS[CACHE_BACKEND][1]),
+        "TIMEOUT": int(os.getenv("CACHE_TIMEOUT", "300")),
+    }
+}
+
+# Lista de torneos abiertos (la descartan las señales de Tournament; con
+# CACHE_BACKEND=memoria y varios workers, esto es lo que tarda en verse un cambio)
+TORNEOS_ABIERTOS_CACHE_TIMEOUT = int(os.getenv("TORNEOS_ABIERTOS_CACHE_TIMEOUT", "300"))
+
+# Fragmentos de plantilla que no cambian (partes fijas de la ficha de inscripción)
+FRAGMENTOS_CACHE_TIMEOUT = int(os.getenv("FRAGMENTOS_CACHE_TIMEOUT", "86400"))
+
+
 AUTH_PASSWORD_VALIDATORS = []
 
 LANGUAGE_CODE = "es-mx"
@@ -108,11 +151,142 @@ if static_dir.exists():
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
 
+# La media se guarda por hash de contenido (ver inscripciones/almacenamiento.py):
+# un archivo repetido se guarda una sola vez. La media anterior se mueve con
+# `python manage.py reubicar_media`.
+STORAGES = {
+    "default": {
+        "BACKEND": "inscripciones.almacenamiento.AlmacenamientoPorContenido",
+    },
+    # WhiteNoise: compresión + hash para producción (requiere collectstatic)
+    "staticfiles": {
+        "BACKEND": "whitenoise.storage.CompressedManifestStaticFilesStorage",
+    },
+}
 
-DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
-# WhiteNoise: compresión + hash para producción
-STATICFILES_STORAGE = "whitenoise.storage.CompressedManifestStaticFilesStorage"
+# ================== SUBIDAS ==================
+
+# Tamaño máximo por archivo subido (INE, comprobantes, fotos). Lo que pase de
+# aquí ya no se escribe a disco y el formulario marca el error.
+SUBIDAS_MAX_MB = int(os.getenv("SUBIDAS_MAX_MB", "10"))
+SUBIDAS_MAX_BYTES = SUBIDAS_MAX_MB * 1024 * 1024
+
+FILE_UPLOAD_HANDLERS = [
+    "django.core.files.uploadhandler.MemoryFileUploadHandler",
+    "inscripciones.subidas.LimiteTamanoUploadHandler",
+]
+
+# Las imágenes de INE y comprobantes se guardan recomprimidas a este lado
+# máximo (en pixeles) y calidad JPEG; los PDF se guardan tal cual
+SUBIDAS_IMAGEN_LADO_MAX = int(os.getenv("SUBIDAS_IMAGEN_LADO_MAX", "2000"))
+SUBIDAS_IMAGEN_CALIDAD = int(os.getenv("SUBIDAS_IMAGEN_CALIDAD", "80"))
+
+
+# ================== CREDENCIALES ==================
+
+# Cuántos QR distintos guarda en memoria cada worker
+CREDENCIALES_QR_CACHE_SIZE = int(os.getenv("CREDENCIALES_QR_CACHE_SIZE", "256"))
+
+# Cache en disco de los QR (vacío en la variable de entorno = desactivado)
+CREDENCIALES_QR_DISK_CACHE_DIR = os.getenv(
+    "CREDENCIALES_QR_DISK_CACHE_DIR",
+    str(MEDIA_ROOT / "cache" / "qr"),
+) or None
+
+# Fondos de credencial ya convertidos a JPEG (vacío = se usan los PNG decodificados)
+CREDENCIALES_FONDOS_CACHE_DIR = os.getenv(
+    "CREDENCIALES_FONDOS_CACHE_DIR",
+    str(MEDIA_ROOT / "cache" / "fondos"),
+) or None
+
+# PDFs de credenciales ya generados, por huella de contenido (vacío = desactivado)
+CREDENCIALES_PDF_CACHE_DIR = os.getenv(
+    "CREDENCIALES_PDF_CACHE_DIR",
+    str(MEDIA_ROOT / "cache" / "credenciales"),
+) or None
+
+# Si el cache está desactivado, el PDF se arma en memoria hasta este tamaño
+# (en bytes) y solo después se pasa a un temporal en disco
+CREDENCIALES_PDF_SPOOL_MAX_SIZE = int(
+    os.getenv("CREDENCIALES_PDF_SPOOL_MAX_SIZE", str(5 * 1024 * 1024))
+)
+
+
+# Segundos que se guarda la página de roster de solo lectura (la del QR).
+# Un cambio del equipo o sus jugadores cambia la clave (nunca se sirve una
+# página vieja); esto solo libera la memoria de las que ya no se usan.
+CREDENCIALES_ROSTER_CACHE_TIMEOUT = int(os.getenv("CREDENCIALES_ROSTER_CACHE_TIMEOUT", "3600"))
+
+
+# Si es True, los PDFs que no están en cache los genera el worker
+# `procesar_credenciales` y no el proceso web (requiere el cache de PDFs).
+# El worker escribe en CREDENCIALES_PDF_CACHE_DIR y la web lee de ahí: deben
+# ver el mismo disco. Por eso el Procfile lo arranca dentro del dyno web (el
+# disco de cada dyno es propio y efímero) y lo vuelve a levantar si se cae; en
+# un proceso o máquina aparte, CREDENCIALES_PDF_CACHE_DIR tiene que ser un
+# volumen compartido.
+CREDENCIALES_PDF_ASYNC = os.getenv("CREDENCIALES_PDF_ASYNC", "False") == "True"
+
+# Segundos que un trabajo puede esperar en la cola sin que un worker lo tome.
+# Pasado ese tiempo la descarga genera el PDF en el proceso web (por si el
+# worker no está corriendo) en lugar de dejar la página de espera colgada.
+CREDENCIALES_PDF_ESPERA_WORKER = int(os.getenv("CREDENCIALES_PDF_ESPERA_WORKER", "20"))
+
+
+# ================== TIEMPOS POR PETICIÓN ==================
+# Ver liga_life.middleware.TiemposPeticionMiddleware.
+# Encabezado Server-Timing (total, BD y consultas, plantillas, PDF). Por
+# defecto solo en local: en producción muestra detalles internos.
+TIEMPOS_SERVER_TIMING = os.getenv("TIEMPOS_SERVER_TIMING", str(DEBUG)) == "True"
+
+# Peticiones más lentas que esto (ms) se registran con sus consultas más lentas
+TIEMPOS_LENTA_MS = int(os.getenv("TIEMPOS_LENTA_MS", "1000"))
+
+# Máximo de consultas por vista (nombre de la URL). Si se pasa se avisa en el
+# log; con TIEMPOS_PRESUPUESTO_ESTRICTO=True (pruebas) la petición falla.
+# No cuentan BEGIN/COMMIT/SAVEPOINT. Medidos con CACHE_BACKEND=memoria y
+# cache frío (con "bd" las lecturas del cache también son consultas), más un
+# margen; los comprueba inscripciones.tests.PresupuestoConsultasTests.
+TIEMPOS_PRESUPUESTOS = {
+    "inscripcion": 5,
+    "subir_comprobante": 4,
+    "registrar_jugadores": 10,
+    "importar_jugadores": 8,
+    "roster_equipo": 4,
+    "credenciales_pdf": 5,
+    "credenciales_estado": 2,  # 1 por consulta; 2 si reencola un trabajo con error
+    "admin:inscripciones_team_changelist": 8,
+    "admin:inscripciones_paymentproof_changelist": 8,
+}
+TIEMPOS_PRESUPUESTO_ESTRICTO = os.getenv("TIEMPOS_PRESUPUESTO_ESTRICTO", "False") == "True"
+
+# ================== MÉTRICAS ==================
+# Ver liga_life.metricas. Cada proceso guarda sus métricas en este directorio
+# (debe ser el mismo para todos los workers) cada METRICAS_INTERVALO segundos.
+METRICAS_DIR = os.getenv(
+    "METRICAS_DIR",
+    os.path.join(tempfile.gettempdir(), "liga_life_metricas"),
+)
+METRICAS_INTERVALO = float(os.getenv("METRICAS_INTERVALO", "5"))
+
+# Token para el scraper: Authorization: Bearer <token>. Sin token, /metrics
+# solo lo ve el staff con sesión en el admin.
+METRICAS_TOKEN = os.getenv("METRICAS_TOKEN", "")
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {"class": "logging.StreamHandler"},
+    },
+    "loggers": {
+        "liga_life": {"handlers": ["console"], "level": "INFO"},
+    },
+}
+
+
+DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 # 👇 Forzamos tema claro en el admin para evitar el bug de Render
 DJANGO_ADMIN_FORCE_THEME = "light"
@@ -0,0 +1,97 @@
+# liga_life/tiempos.py
+"""
+Tiempos de cada petición, por fase: BD, plantillas y PDF.
+
+TiemposPeticionMiddleware abre un registro por petición (en un ContextVar,
+así cada hilo/petición tiene el suyo) y el código que quiera reportar una
+fase la envuelve en `with medir("pdf"):`. Fuera de una petición (comandos,
+el worker de credenciales) medir() no hace nada.
+"""
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.template import TemplateDoesNotExist
+from django.template.backends.django import DjangoTemplates, Template, reraise
+
+
+_actual = ContextVar("tiempos_peticion", default=None)
+
+
+class Registro:
+    """Lo medido en una petición: segundos por fase y cada consulta (segundos, sql)."""
+
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.fases = defaultdict(float)
+        self.consultas = []
+        self._abiertas = set()
+
+    @property
+    def total(self):
+        return time.perf_counter() - self.inicio
+
+    @property
+    def tiempo_bd(self):
+        return sum(segundos for segundos, _sql in self.consultas)
+
+    def consultas_mas_lentas(self, cuantas=5):
+        return sorted(self.consultas, key=lambda c: c[0], reverse=True)[:cuantas]
+
+
+def actual():
+    return _actual.get()
+
+
+@contextmanager
+def registrar():
+    """Abre el registro de una petición (lo usa el middleware)."""
+    registro = Registro()
+    token = _actual.set(registro)
+    try:
+        yield registro
+    finally:
+        _actual.reset(token)
+
+
+@contextmanager
+def medir(fase):
+    """Suma a `fase` el tiempo del bloque; si la fase ya está abierta no cuenta doble."""
+    registro = _actual.get()
+    if registro is None or fase in registro._abiertas:
+        yield
+        return
+
+    registro._abiertas.add(fase)
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        registro.fases[fase] += time.perf_counter() - inicio
+        registro._abiertas.discard(fase)
+
+
+# ===========================
+#  PLANTILLAS
+# ===========================
+class _PlantillaMedida(Template):
+    def render(self, context=None, request=None):
+        with medir("plantillas"):
+            return super().render(context, request)
+
+
+class PlantillasMedidas(DjangoTemplates):
+    """
+    El backend de plantillas de Django, midiendo cada render de primer nivel
+    (render(), render_to_string(), el admin); los {% include %} quedan dentro.
+    """
+
+    def from_string(self, template_code):
+        return _PlantillaMedida(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return _PlantillaMedida(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            reraise(exc, self)
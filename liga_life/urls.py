@@ -4,14 +4,19 @@ from django.conf import settings
 from django.conf.urls.static import static
 
 from inscripciones import views
+from liga_life.metricas import vista_metricas
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('metrics', vista_metricas, name='metricas'),
     path('', views.redirect_to_inscripcion, name='home'),
     path('inscripcion/', views.inscripcion, name='inscripcion'),
     path('comprobante/', views.subir_comprobante, name='subir_comprobante'),
     path('equipo/<str:folio>/jugadores/', views.registrar_jugadores, name='registrar_jugadores'),
+    path('equipo/<str:folio>/jugadores/importar/', views.importar_jugadores, name='importar_jugadores'),
+    path('equipo/<str:folio>/roster/', views.roster_equipo, name='roster_equipo'),
     path("equipo/<str:folio>/credenciales/pdf/", views.descargar_credenciales, name="credenciales_pdf"),
+    path("equipo/<str:folio>/credenciales/estado/<int:job_id>/", views.estado_credenciales, name="credenciales_estado"),
 ]
 
 if settings.DEBUG: